@@ -12,6 +12,28 @@ import math
 import filecmp
 import time
 import glob
+import hashlib
+import gzip
+import json
+import shutil
+import threading
+import collections
+import re
+import multiprocessing
+import socket
+import sys
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+try:
+    import numpy
+except ImportError:
+    numpy = None
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
 
 LINUX_PLATFORM_STR    = "Linux"
 WINDOWS_PLATFORM_STR  = "Windows"
@@ -34,12 +56,63 @@ ENC_PATH = "encoders"
 BIN_PATH = "bitstreams"
 YUV_PATH = "yuvs"
 
-TEST_CONFIGURATION = 1 # 0 - Validation Test, 1 - Speed Test (Refer to Validation/Speed Test specific configurations)
+TEST_CONFIGURATION = 1 # 0 - Validation Test, 1 - Speed Test, 2 - ASM Benchmark Test, 3 - Kernel Benchmark Test, 4 - Live Test, 5 - Synthetic Test, 6 - Soak Test, 7 - Chunked Encoding Test, 8 - Trend Report, 9 - Capacity Report, 10 - Timed Speed Test (Refer to Validation/Speed/ASM/Kernel Benchmark/Live/Synthetic/Soak/Chunked Encoding Test/Results Database/Capacity Planner specific configurations)
 SQ_OQ_MODE = 0 # 0 - Both OQ and SQ, 1 - SQ Only, 2 - OQ Only
 
+#------------- Artifact Store Specific -------------#
+ARTIFACT_STORE_MODE = 0 # 0 - Keep outputs in BIN_PATH, 1 - Move outputs into the content-addressed artifact store
+ARTIFACT_PATH = "artifacts"
+ARTIFACT_STORE_MAX_SIZE = 10*1024*1024*1024 # In bytes, passing artifacts are evicted first (least recently used)
+
+#------------- Dashboard Specific -------------#
+DASHBOARD_MODE = 0 # 0 - Off, 1 - Live terminal dashboard of all running encodes (Speed Test: monitors the speed script outputs)
+DASHBOARD_REFRESH_INTERVAL = 1.0 # In seconds
+
 #------------- Validation Test Specific -------------#
 VALIDATION_TEST_MODE = 0 # 0 - Fast Test, 1 - Overnight Test, 2- Full Test
 QP_VBR_MODE = 0 # 0 - Both QP and VBR, 1 - QP Only, 2 - VBR Only
+VALIDATION_TIME_BUDGET = 0 # In seconds, 0 - Run every test in order, otherwise run the highest priority jobs that fit in the budget
+BUDGET_NUM_JOBS = 2 # Number of jobs running at the same time when a time budget is set
+TEST_HISTORY_FILE = "Test_History.json" # Past runtimes and results, used to predict job cost and priority
+RECON_CHECK_MODE = 0 # 0 - Off, 1 - Compare tests also write recon (-o), on a mismatch locate the first divergent frame, plane and LCU (requires numpy)
+BATCH_MODE = 0 # 0 - Off, 1 - Run small functional test encodes as the channels of one -nch encode, channels that fail run again on their own
+BATCH_MAX_CHANNELS = 6 # Up to the app MAX_CHANNEL_NUMBER (6)
+BATCH_MAX_PIXELS = 864*480 # Larger encodes always run on their own
+RANDOM_SEED = None # Seed of the random QPs, bitrates and test conditions of each test, None - New matrix every run (0 in Golden Digest modes)
+JOURNAL_MODE = 0 # 0 - Off, 1 - Journal the start and finish of every job, 2 - Resume: replay the journal and run only the jobs that never finished
+JOURNAL_FILE = "Test_Journal.jsonl"
+JOURNAL_SYNC_INTERVAL = 5 # In seconds between syncs of the journal to disk
+
+#------------- Golden Digests Specific -------------#
+# Validation encodes are looked up by their config (without paths) to tell whether a build changed their output,
+# no reference encoder binary needed
+GOLDEN_MODE = 0 # 0 - Off, 1 - Record the digests of this build, 2 - Compare with the recorded digests
+GOLDEN_DB_FILE = "Golden_Digests.json" # Bitstream hash, bytes per frame and PSNR (from recon, requires numpy) of each config
+GOLDEN_DB_VERSION = 1 # Digests recorded with another version are ignored
+GOLDEN_PSNR_TOLERANCE = 0.01 # In dB, changed bitstreams within it are Size Drift, beyond it Quality Change
+
+#------------- Results Database Specific -------------#
+# Validation encode results of every run are kept to follow the fps of each config, without its random QP, bitrate and test conditions, across builds (Trend Report: TEST_CONFIGURATION 8)
+RESULTS_DB_MODE = 0 # 0 - Off, 1 - Store exit status, fps, latency, CPU time, max RSS and bitstream digest of every validation and Timed Speed Test encode (requires sqlite3)
+RESULTS_DB_FILE = "Test_Results.db"
+RESULTS_DB_BATCH = 64 # Results buffered before a bulk insert
+TREND_MIN_DROP = 0.05 # Fraction of the fps lost at a change point to report a regression
+TREND_MIN_T = 4.0 # Welch t of the fps before and after the change point, rules out noisy series
+TREND_MIN_SEGMENT = 3 # Results needed on each side of a change point
+TREND_MAX_SAMPLES = 200 # Latest results per config used for the detection
+
+#------------- Capacity Planner Specific -------------#
+# Real-time channels of a mix per host class, from the fps, CPU time and max RSS in the results database (requires numpy)
+# Capacity Report: TEST_CONFIGURATION 9, single query: python SVT_FunctionalTests.py capacity 1920x1080@60:8bit:M9:SQ:VBR[:share] ... [host=<host class>]
+CAPACITY_MIX = [
+{'width': 1920, 'height': 1080, 'bit_depth': 8, 'frame_rate': 60, 'enc_mode': 9, 'tune': 0, 'rc': 1, 'share': 1},
+]
+CAPACITY_HOST_CLASS = None # CPU name and logical processors as listed in the Capacity Report, None - Every host class
+CAPACITY_MIN_SAMPLES = 30 # Results of a host class needed to fit its models
+CAPACITY_CPU_UTILIZATION = 0.9 # Fraction of the logical processors the channels may use
+CAPACITY_MEMORY_UTILIZATION = 0.8 # Fraction of the host memory the channels may use
+CAPACITY_CONFIDENCE = 1.96 # Standard errors of the bounds, 1.96 - 95%
+CAPACITY_MAX_ERROR = 0.25 # Configs measured further (fraction) from their prediction are listed for targeted speed runs (Timed Speed Test)
 
 VALIDATION_TEST_SEQUENCES = [
 'Netflix_FoodMarket2_4096x2160_10bit_60Hz_P420',
@@ -51,6 +124,7 @@ VALIDATION_TEST_SEQUENCES = [
 
 #-------------  Speed Test Specific -------------#
 # Number of channels is enc_mode and resolution specific
+# The Timed Speed Test runs the same encodes from the harness one at a time, measuring their CPU time and max RSS for the results database
 SPEED_ENC_MODES = [0,6,9]
 
 # Speed Test Sequences, use 'qp' and 'tbr' to specify to run in Fixed QP or VBR Mode
@@ -63,6 +137,82 @@ SPEED_TEST_SEQUENCES = [
 {'name': 'DucksTakeOff_1280x720_8bit_50Hz_P420', 'qp': 34},
 {'name': 'ParkJoy_864x480_10bit_50Hz_P420_2bitspacked', 'qp': 34}
 ]
+
+#-------------  ASM Benchmark Test Specific -------------#
+# Runs the Speed Test sequences and enc modes once per -asm level, level 0 uses the C_DEFAULT kernels only,
+# level 1 lets the encoder dispatch to the fastest kernels the CPU supports (ASM_SSE2 up to ASM_SSE4_1, ASM_AVX2, AVX512)
+ASM_LEVELS = [0, 1]
+##--------------------------------------------------------##
+
+#-------------  Kernel Benchmark Test Specific -------------#
+# Calls single encoder kernels through SVT_KernelShim.c with random input blocks (requires numpy), C_DEFAULT table entries against the ASM ones
+KERNEL_SHIM_NAME = "SvtHevcKernelShim" # Loaded from ENC_PATH, built there from the sources and the CMake build directory below when missing (Linux only)
+KERNEL_SOURCE_PATH = ".." # SVT-HEVC source tree, relative to the folder of this script
+KERNEL_BUILD_PATH = "../Build/linux/release" # CMake build directory holding the SvtHevcEnc objects and the C_DEFAULT/ASM_* libraries, relative to the folder of this script
+KERNEL_MIN_TIME = 0.1 # In seconds, minimum measured time per kernel, block size and implementation
+KERNEL_EXACT_TRIALS = 8 # Random inputs checked for bit-exactness per kernel and block size
+KERNEL_SEED = 0
+KERNEL_RESULTS_FILE = "Kernel_Results.json" # Results of every run, kernels slower than the previous run on the same CPU are flagged
+KERNEL_REGRESSION_THRESHOLD = 0.1 # Fraction of the previous ns per call
+##--------------------------------------------------------##
+
+#-------------  Live Test Specific -------------#
+# Feeds the Speed Test sequences at their nominal frame rate through the injector (-inj), then searches the densest -nch per enc mode
+LIVE_ENC_MODES = [6, 9, 11]
+LIVE_SPEED_CONTROL = [0, 1] # -speed-ctrl values run with a single channel, the -nch search always runs without speed control
+LIVE_LATENCY_MODE = 0 # -latency-mode, 0 - Normal, 1 - Low delay
+LIVE_NUM_FRAMES = 300
+LIVE_MAX_CHANNELS = 16
+LIVE_DEADLINE_TOLERANCE = 0.2 # In seconds, a frame is late when it comes out later than this after its slot (first output + frame index / frame rate)
+LIVE_MAX_MISS_RATIO = 0.0 # Fraction of late frames still considered real time
+##--------------------------------------------------------##
+
+#-------------  Synthetic Test Specific -------------#
+# Content generated with numpy and streamed to the encoder, nothing is read from or written to YUV_PATH (requires numpy)
+# Each sequence is encoded twice with the same seed, the two bitstreams have to match
+SYNTH_TEST_SEQUENCES = [
+{'width': 3840, 'height': 2160, 'bit_depth': 10, 'packed': 1, 'frame_rate': 60, 'qp': 34},
+{'width': 1920, 'height': 1080, 'bit_depth': 10, 'packed': 0, 'frame_rate': 60, 'qp': 34},
+{'width': 1920, 'height': 1080, 'bit_depth': 8, 'packed': 0, 'frame_rate': 60, 'tbr': 5000},
+{'width': 1280, 'height': 720, 'bit_depth': 8, 'packed': 0, 'frame_rate': 50, 'qp': 34}
+]
+SYNTH_ENC_MODES = [9]
+SYNTH_NUM_FRAMES = 240
+SYNTH_SEED = 1
+SYNTH_SCENE_LENGTH = 48 # Frames between scene cuts
+SYNTH_TRANSPORT = 0 # 0 - Encoder stdin (-i stdin), 1 - Named pipe in YUV_PATH (Linux only)
+##--------------------------------------------------------##
+
+#-------------  Soak Test Specific -------------#
+# Encodes each config for hours with the input file looped, or synthesized (dicts as in the Synthetic Test, one named pipe per channel),
+# samples the encoder memory, threads, file descriptors and fps from /proc and fits trends to flag leaks and throughput drift (Linux only)
+SOAK_TEST_SEQUENCES = [
+{'name': 'Fallout4_1920x1080_8bit_60Hz_P420', 'qp': 34, 'enc_mode': 9, 'nch': 4},
+{'width': 1920, 'height': 1080, 'bit_depth': 10, 'packed': 0, 'frame_rate': 60, 'qp': 34, 'enc_mode': 9, 'nch': 2}
+]
+SOAK_DURATION = 4*3600 # In seconds per config
+SOAK_INJECTOR = 1 # 0 - Encode as fast as possible until SOAK_DURATION runs out, 1 - Feed frames at the nominal frame rate (-inj)
+SOAK_SAMPLE_INTERVAL = 5 # In seconds, doubled every time the series is compacted
+SOAK_MAX_SAMPLES = 1024 # Adjacent samples are averaged when the series is full
+SOAK_WARMUP = 0.1 # Fraction of the duration left out of the trends
+SOAK_MAX_RSS_GROWTH = 16 # In MB per hour
+SOAK_MAX_FPS_DRIFT = 0.02 # Fraction of the mean fps lost per hour
+SOAK_SERIES_FILE = "Soak_Test_Series.json" # Compacted time series of every config
+##--------------------------------------------------------##
+
+#-------------  Chunked Encoding Test Specific -------------#
+# Splits each sequence at closed GOP boundaries (-irefresh-type 2), encodes the chunks in parallel instances fed over stdin and
+# stitches them into one stream, then compares wall time, size and PSNR (from recon, requires numpy) with a single instance encode
+CHUNK_ENC_MODES = [0, 3]
+CHUNK_TEST_SEQUENCES = [
+{'name': 'Fallout4_1920x1080_8bit_60Hz_P420', 'tbr': 5000000},
+{'name': 'DucksTakeOff_1280x720_8bit_50Hz_P420', 'qp': 32},
+{'name': 'ParkJoy_864x480_10bit_50Hz_P420', 'tbr': 2000000}
+]
+CHUNK_GOPS = 2 # Closed GOPs per chunk
+CHUNK_JOBS = 4 # Chunks encoded at the same time
+CHUNK_LP = 0 # -lp of each chunk instance, 0 - Logical processors / CHUNK_JOBS
+CHUNK_NUM_FRAMES = 0 # 0 - Whole sequence
 ##--------------------------------------------------------##
 
 ##-------------- TEST MODE SPECIFIC SETTINGS -------------##
@@ -96,6 +246,8 @@ SA_ITER                         = 1 # Search Area WidthxHeight per test
 LAD_ITER                        = 3 # LAD per test
 INTRA_PERIOD_ITER               = 3 # Intra Period per test
 WH_ITER                         = 3 # WidthxHeight per test
+DEFAULT_PIXEL_RATE              = 10000000 # Pixels per second assumed for encodes without any history
+HISTORY_RESULTS                 = 5 # Results kept per job in the history
 ##--------------------------------------------------------##
 
 if QP_VBR_MODE == 0:
@@ -112,28 +264,870 @@ elif SQ_OQ_MODE == 1:
 elif SQ_OQ_MODE == 2:
     SQ_OQ_COMBINATION = [1]
 
+class EB_ArtifactStore(object):
+    # Bitstreams are stored once per content hash, logs are stored compressed per test
+    def __init__(self,
+                 artifact_path,
+                 max_size):
+
+        self.artifact_path  = artifact_path
+        self.max_size       = max_size
+        self.index_file     = artifact_path + slash + 'index.json'
+        self.lock           = threading.RLock()
+        # bitstream name -> number of running jobs that still compare against it
+        self.pinned         = {}
+
+        for folder in [artifact_path, artifact_path + slash + 'objects', artifact_path + slash + 'logs']:
+            if not os.path.exists(folder):
+                os.mkdir(folder)
+
+        # objects: hash -> size and reference count, artifacts: bitstream name -> stored outputs
+        self.index = {'objects': {}, 'artifacts': {}}
+        if os.path.exists(self.index_file):
+            with open(self.index_file, 'r') as index_file:
+                self.index = json.load(index_file)
+
+    def get_file_hash(self, file_name):
+        sha = hashlib.sha256()
+        with open(file_name, 'rb') as in_file:
+            chunk = in_file.read(1 << 20)
+            while chunk:
+                sha.update(chunk)
+                chunk = in_file.read(1 << 20)
+        return sha.hexdigest()
+
+    def get_object_path(self, digest):
+        return self.artifact_path + slash + 'objects' + slash + digest[:2] + slash + digest + '.265'
+
+    def save_index(self):
+        # Write to a temporary file first so an interrupted run never leaves a truncated index
+        with open(self.index_file + '.tmp', 'w') as index_file:
+            json.dump(self.index, index_file)
+        if os.path.exists(self.index_file):
+            os.remove(self.index_file)
+        os.rename(self.index_file + '.tmp', self.index_file)
+
+    def get_total_size(self):
+        total_size = 0
+        for digest in self.index['objects']:
+            total_size = total_size + self.index['objects'][digest]['size']
+        for name in self.index['artifacts']:
+            total_size = total_size + self.index['artifacts'][name]['log_size']
+        return total_size
+
+    def release(self, name):
+        artifact = self.index['artifacts'].pop(name, None)
+        if artifact is None:
+            return
+        for log_file in artifact['logs']:
+            if os.path.exists(log_file):
+                os.remove(log_file)
+        digest = artifact['hash']
+        if digest in self.index['objects']:
+            self.index['objects'][digest]['refs'] = self.index['objects'][digest]['refs'] - 1
+            if self.index['objects'][digest]['refs'] <= 0:
+                if os.path.exists(self.get_object_path(digest)):
+                    os.remove(self.get_object_path(digest))
+                del self.index['objects'][digest]
+
+    # Move the bitstream, error log and output log of a test into the store
+    def store(self, bitstream_dir, bitstream_name, passed):
+        with self.lock:
+            self.store_outputs(bitstream_dir, bitstream_name, passed)
+
+    def store_outputs(self, bitstream_dir, bitstream_name, passed):
+        self.release(bitstream_name)
+        artifact = {'hash': '', 'logs': [], 'log_size': 0, 'passed': passed, 'last_access': time.time()}
+
+        bitstream_file = bitstream_dir + slash + bitstream_name + '.265'
+        if os.path.exists(bitstream_file):
+            digest = self.get_file_hash(bitstream_file)
+            object_path = self.get_object_path(digest)
+            if digest in self.index['objects'] and os.path.exists(object_path):
+                os.remove(bitstream_file)
+                self.index['objects'][digest]['refs'] = self.index['objects'][digest]['refs'] + 1
+            else:
+                if not os.path.exists(os.path.dirname(object_path)):
+                    os.mkdir(os.path.dirname(object_path))
+                shutil.move(bitstream_file, object_path)
+                self.index['objects'][digest] = {'size': os.path.getsize(object_path), 'refs': 1}
+            artifact['hash'] = digest
+
+        for extension in ['.errlog', '.txt']:
+            log_file = bitstream_dir + slash + bitstream_name + extension
+            if not os.path.exists(log_file):
+                continue
+            if os.path.getsize(log_file) == 0:
+                os.remove(log_file)
+                continue
+            compressed_file = self.artifact_path + slash + 'logs' + slash + bitstream_name + extension + '.gz'
+            with open(log_file, 'rb') as in_file:
+                with gzip.open(compressed_file, 'wb') as out_file:
+                    shutil.copyfileobj(in_file, out_file)
+            os.remove(log_file)
+            artifact['logs'].append(compressed_file)
+            artifact['log_size'] = artifact['log_size'] + os.path.getsize(compressed_file)
+
+        self.index['artifacts'][bitstream_name] = artifact
+        self.evict([bitstream_name])
+        self.save_index()
+
+    def mark_failed(self, bitstream_name):
+        with self.lock:
+            if bitstream_name in self.index['artifacts']:
+                self.index['artifacts'][bitstream_name]['passed'] = False
+                self.save_index()
+
+    def get_hash(self, bitstream_name):
+        with self.lock:
+            if bitstream_name not in self.index['artifacts']:
+                return ""
+            # Kept in memory, saved with the next store or at close so the least recently used order holds across runs
+            self.index['artifacts'][bitstream_name]['last_access'] = time.time()
+            return self.index['artifacts'][bitstream_name]['hash']
+
+    def close(self):
+        with self.lock:
+            self.save_index()
+
+    # Keep the outputs of a running job out of eviction until it releases them
+    def pin(self, bitstream_names):
+        with self.lock:
+            for name in bitstream_names:
+                self.pinned[name] = self.pinned.get(name, 0) + 1
+
+    def unpin(self, bitstream_names):
+        with self.lock:
+            for name in bitstream_names:
+                self.pinned[name] = self.pinned.get(name, 0) - 1
+                if self.pinned[name] <= 0:
+                    del self.pinned[name]
+
+    def get_bitstream_path(self, bitstream_name):
+        digest = self.get_hash(bitstream_name)
+        if digest == "":
+            return ""
+        return self.get_object_path(digest)
+
+    # Evict least recently used passing artifacts first, failing artifacts only if the store is still too large
+    def evict(self, keep_list):
+        total_size = self.get_total_size()
+        if total_size <= self.max_size:
+            return
+        candidates = []
+        for name in self.index['artifacts']:
+            if name in keep_list or name in self.pinned:
+                continue
+            artifact = self.index['artifacts'][name]
+            candidates.append((not artifact['passed'], artifact['last_access'], name))
+        candidates.sort()
+        for candidate in candidates:
+            if total_size <= self.max_size:
+                break
+            self.release(candidate[2])
+            total_size = self.get_total_size()
+
+class EB_Dashboard(object):
+    # Tails the output files of running encodes at a fixed rate, the harness never blocks on them
+    def __init__(self,
+                 refresh_interval):
+
+        self.refresh_interval   = refresh_interval
+        self.lock               = threading.Lock()
+        self.encodes            = collections.OrderedDict()
+        self.failures           = collections.deque(maxlen=5)
+        self.plan_frames        = 0
+        self.done_frames        = 0
+        self.start_time         = time.time()
+        self.cpu_times          = None
+        self.stop_event         = threading.Event()
+        self.thread             = None
+
+    def start(self):
+        self.start_time = time.time()
+        self.thread = threading.Thread(target=self.refresh_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.refresh()
+
+    def set_plan(self, plan_frames):
+        with self.lock:
+            self.plan_frames = plan_frames
+
+    # watch - encode is started outside of the harness, its state is read from the output file
+    def add_encode(self, name, output_file, total_frames, watch = False):
+        with self.lock:
+            self.encodes[name] = {'output_file'     : output_file,
+                                  'total_frames'    : total_frames,
+                                  'watch'           : watch,
+                                  'state'           : 'waiting' if watch else 'running',
+                                  'position'        : 0,
+                                  'leftover'        : '',
+                                  'frames'          : 0,
+                                  'fps'             : 0.0,
+                                  'last_frames'     : 0,
+                                  'last_time'       : time.time(),
+                                  }
+
+    def remove_encode(self, name, passed):
+        with self.lock:
+            encode = self.encodes.pop(name, None)
+            if encode is None:
+                return
+            self.done_frames = self.done_frames + encode['total_frames']
+            if not passed:
+                self.failures.append(name)
+
+    def is_finished(self):
+        with self.lock:
+            for name in self.encodes:
+                if self.encodes[name]['state'] in ['waiting', 'running']:
+                    return False
+            return True
+
+    # Read the bytes written since the last refresh and keep the last progress counter
+    def read_progress(self, encode):
+        output_file = encode['output_file']
+        if not os.path.exists(output_file):
+            return
+        if encode['watch'] and encode['state'] == 'waiting':
+            # Ignore outputs left over from an older run
+            if os.path.getmtime(output_file) < self.start_time:
+                return
+            encode['state'] = 'running'
+            encode['last_time'] = time.time()
+        with open(output_file, 'rb') as in_file:
+            in_file.seek(encode['position'])
+            data = in_file.read()
+        encode['position'] = encode['position'] + len(data)
+        text = encode['leftover'] + data.decode('latin-1')
+        # Progress is printed as "\b\b\b\b\b\b\b\b\b%9d", the last field may still be incomplete
+        fields = text.split('\b')
+        encode['leftover'] = fields[-1] if len(fields[-1]) < 9 else ''
+        for field in reversed(fields):
+            if len(field) >= 9 and field[:9].strip().isdigit():
+                encode['frames'] = int(field[:9].strip())
+                break
+        if encode['watch']:
+            # An encode that errors out may still print its closing line
+            if 'Error' in text:
+                encode['state'] = 'failed'
+                self.failures.append(os.path.basename(output_file))
+            elif 'Encoder finished' in text:
+                encode['state'] = 'done'
+
+    def get_cpu_idle(self):
+        if not os.path.exists('/proc/stat'):
+            return -1
+        with open('/proc/stat', 'r') as stat_file:
+            cpu_times = [float(x) for x in stat_file.readline().split()[1:]]
+        idle = -1
+        if self.cpu_times is not None:
+            total_delta = sum(cpu_times) - sum(self.cpu_times)
+            if total_delta > 0:
+                idle = (cpu_times[3] + cpu_times[4] - self.cpu_times[3] - self.cpu_times[4])/total_delta*100
+        self.cpu_times = cpu_times
+        return idle
+
+    def get_memory(self):
+        memory = {}
+        if not os.path.exists('/proc/meminfo'):
+            return -1, -1
+        with open('/proc/meminfo', 'r') as meminfo_file:
+            for line in meminfo_file:
+                tokens = line.split()
+                memory[tokens[0].rstrip(':')] = float(tokens[1])/(1024*1024)
+        return memory.get('MemAvailable', -1), memory.get('MemTotal', -1)
+
+    def get_duration(self, seconds):
+        seconds = int(seconds)
+        return str(seconds//3600) + ':' + str((seconds//60)%60).zfill(2) + ':' + str(seconds%60).zfill(2)
+
+    def refresh(self):
+        now = time.time()
+        lines = []
+        with self.lock:
+            total_fps = 0.0
+            active_frames = 0
+            for name in self.encodes:
+                encode = self.encodes[name]
+                self.read_progress(encode)
+                if encode['state'] == 'running':
+                    encode['fps'] = (encode['frames'] - encode['last_frames'])/max(now - encode['last_time'], 1e-3)
+                    total_fps = total_fps + encode['fps']
+                else:
+                    encode['fps'] = 0.0
+                encode['last_frames'] = encode['frames']
+                encode['last_time'] = now
+                if encode['state'] == 'done':
+                    active_frames = active_frames + encode['total_frames']
+                else:
+                    active_frames = active_frames + encode['frames']
+            cpu_idle = self.get_cpu_idle()
+            mem_available, mem_total = self.get_memory()
+            remaining_frames = self.plan_frames - self.done_frames - active_frames
+            if self.plan_frames != 0 and total_fps > 0:
+                eta = self.get_duration(max(remaining_frames, 0)/total_fps)
+            else:
+                eta = 'n/a'
+
+            lines.append('SVT-HEVC Test Dashboard' + ' '*30 + 'Elapsed: ' + self.get_duration(now - self.start_time))
+            lines.append('CPU Idle: ' + ('n/a' if cpu_idle < 0 else '%5.1f%%' % cpu_idle) +
+                         '    Memory Available: ' + ('n/a' if mem_total < 0 else '%.1f GB / %.1f GB' % (mem_available, mem_total)))
+            # Without a plan the dashboard only counts the frames encoded so far
+            plan = '%d/%d frames' % (self.done_frames + active_frames, self.plan_frames) if self.plan_frames != 0 else '%d frames' % (self.done_frames + active_frames)
+            lines.append('Aggregate: %.1f fps    Plan: %s    ETA: %s' % (total_fps, plan, eta))
+            lines.append('-'*80)
+            lines.append('%-56s%14s%10s' % ('Encode', 'Frames', 'fps'))
+            for name in self.encodes:
+                encode = self.encodes[name]
+                if encode['state'] != 'running':
+                    continue
+                lines.append('%-56s%14s%10.1f' % (name[-56:], str(encode['frames']) + '/' + str(encode['total_frames']), encode['fps']))
+            lines.append('-'*80)
+            lines.append('Recent Failures:')
+            for name in self.failures:
+                lines.append('    ' + name)
+        # Clear the screen and redraw in one write
+        sys.stdout.write('\033[2J\033[H' + '\n'.join(lines) + '\n')
+        sys.stdout.flush()
+
+    def refresh_loop(self):
+        while not self.stop_event.wait(self.refresh_interval):
+            self.refresh()
+
+class EB_SyntheticSource(object):
+    # Synthetic 4:2:0 frames made with numpy: panning gradients, noise, scene cuts and a scrolling ticker.
+    # A frame only depends on the seed and its index, so the same seed always gives the same content.
+    # 10 bit frames are the same in the unpacked and 2bitspacked formats: the gradients and the ticker are
+    # multiples of 4, so the 2 LSBs only come from the noise and are packed once per noise pool
+    def __init__(self,
+                 width,
+                 height,
+                 bit_depth,
+                 compressed_ten_bit_format,
+                 seed):
+
+        self.width                      = width
+        self.height                     = height
+        self.bit_depth                  = bit_depth
+        self.compressed_ten_bit_format  = compressed_ten_bit_format if bit_depth > 8 else 0
+        self.seed                       = seed
+        self.max_value                  = (1 << bit_depth) - 1
+        self.lsb_mask                   = 3 if bit_depth > 8 else 0
+        # Packed frames are generated as their 8 bit planes
+        self.shift                      = 2 if self.compressed_ten_bit_format == 1 else 0
+        self.sample_type                = numpy.uint8 if bit_depth == 8 or self.shift != 0 else numpy.dtype('<u2')
+        self.luma_size                  = width * height
+        self.chroma_size                = self.luma_size // 4
+        if self.compressed_ten_bit_format == 1:
+            self.frame_size = self.luma_size * 3 // 2 + self.luma_size * 3 // 8
+        else:
+            self.frame_size = self.luma_size * 3 // 2 * (1 if bit_depth == 8 else 2)
+        # Writer queue holds 2 frames, 1 more is being written and 1 generated
+        self.buffers                    = [numpy.zeros(self.frame_size, dtype = numpy.uint8) for x in range(4)]
+        self.noise_pools                = {}
+        self.scene                      = -1
+        self.init_ticker()
+
+    # Noise is sliced from a pool at a frame dependent offset instead of being drawn for every frame
+    # Returns the pool shifted like the frame samples and, for packed frames, its 2 LSBs packed
+    def get_noise_pool(self, level):
+        if level not in self.noise_pools:
+            rng = numpy.random.RandomState((self.seed * 104729 + level) % (1 << 32))
+            noise = rng.randint(0, 1 << (self.bit_depth - 8 + level), self.luma_size + self.luma_size // 4).astype(numpy.uint16)
+            packed_lsb = None
+            if self.shift != 0:
+                lsb = (noise & 3).astype(numpy.uint8).reshape(-1, 4)
+                packed_lsb = (lsb[:, 0] << 6) | (lsb[:, 1] << 4) | (lsb[:, 2] << 2) | lsb[:, 3]
+            self.noise_pools[level] = ((noise >> self.shift).astype(self.sample_type), packed_lsb)
+        return self.noise_pools[level]
+
+    # Block letters from a 5x7 grid on a dark band, the strip is repeated at the end so a scrolled window never wraps
+    def init_ticker(self):
+        rng = numpy.random.RandomState(self.seed % (1 << 32))
+        self.ticker_height = max(16, (self.height // 16) & ~1)
+        scale = max(1, self.ticker_height // 10)
+        glyphs = [numpy.kron(rng.rand(7, 5) < 0.4, numpy.ones((scale, scale), dtype = bool)) for x in range(40)]
+        glyph_height, glyph_width = glyphs[0].shape
+        strip = numpy.zeros((self.ticker_height, 2 * self.width + glyph_width * 2), dtype = bool)
+        top = (self.ticker_height - glyph_height) // 2
+        x = 0
+        while x + glyph_width <= 2 * self.width:
+            if rng.rand() > 0.15:
+                strip[top:top + glyph_height, x:x + glyph_width] = glyphs[rng.randint(len(glyphs))]
+            x = x + glyph_width + scale
+        strip = strip[:, :2 * self.width]
+        strip = numpy.concatenate((strip, strip[:, :self.width]), axis = 1)
+        # Ink and background leave room for the largest noise
+        ink = (self.max_value * 3 // 4) & ~self.lsb_mask
+        background = (self.max_value // 10) & ~self.lsb_mask
+        self.ticker = numpy.where(strip, ink >> self.shift, background >> self.shift).astype(self.sample_type)
+        self.ticker_speed = max(1, self.width // 240)
+        self.ticker_top = self.height - self.ticker_height - (self.height // 32 & ~1)
+
+    # Gradient planes of a scene, larger than the frame by the distance they pan during the scene
+    def init_scene(self, scene):
+        rng = numpy.random.RandomState((self.seed * 7919 + scene) % (1 << 32))
+        self.scene = scene
+        self.scene_start = scene * SYNTH_SCENE_LENGTH
+        self.noise_level = rng.randint(0, 4)
+        self.speed_x = rng.randint(-8, 9)
+        self.speed_y = rng.randint(-4, 5)
+        self.margin_x = abs(self.speed_x) * SYNTH_SCENE_LENGTH
+        self.margin_y = abs(self.speed_y) * SYNTH_SCENE_LENGTH
+        # Room left for the noise so the sum never overflows the sample range
+        peak = self.max_value - (1 << (self.bit_depth - 8 + self.noise_level))
+        self.planes = []
+        for shift in [0, 1, 1]:
+            cols = numpy.arange((self.width + self.margin_x) >> shift, dtype = numpy.float32)
+            rows = numpy.arange((self.height + self.margin_y) >> shift, dtype = numpy.float32)
+            col_term = rng.uniform(0.2, 0.5) * (1 + numpy.sin(cols * rng.uniform(0.005, 0.2) + rng.uniform(0, 6.3)))
+            row_term = rng.uniform(0.2, 0.5) * (1 + numpy.cos(rows * rng.uniform(0.005, 0.2) + rng.uniform(0, 6.3)))
+            plane = numpy.clip((row_term[:, None] + col_term[None, :]) * (peak / 2.0), 0, peak).astype(numpy.uint16) & (self.max_value ^ self.lsb_mask)
+            self.planes.append((plane >> self.shift).astype(self.sample_type))
+
+    # Frame as a flat uint8 array in the input file layout, only valid until 3 more frames are generated
+    def get_frame(self, frame_index):
+        scene = frame_index // SYNTH_SCENE_LENGTH
+        if scene != self.scene:
+            self.init_scene(scene)
+        scene_frame = frame_index - self.scene_start
+        offset_x = scene_frame * self.speed_x if self.speed_x >= 0 else self.margin_x + scene_frame * self.speed_x
+        offset_y = scene_frame * self.speed_y if self.speed_y >= 0 else self.margin_y + scene_frame * self.speed_y
+        out_buffer = self.buffers[frame_index % len(self.buffers)]
+        samples = out_buffer[:self.luma_size * 3 // 2 * numpy.dtype(self.sample_type).itemsize].view(self.sample_type)
+        noise_pool, packed_lsb = self.get_noise_pool(self.noise_level)
+        # Multiple of 4 so the packed LSBs of the pool line up with the frame
+        noise_offset = (frame_index * 7919) % max(1, self.luma_size // 256) * 64
+        ticker_offset = (frame_index * self.ticker_speed) % (self.ticker.shape[1] - self.width)
+
+        plane_offset = 0
+        for plane_index in range(3):
+            shift = 0 if plane_index == 0 else 1
+            plane_width = self.width >> shift
+            plane_height = self.height >> shift
+            plane_size = plane_width * plane_height
+            view = self.planes[plane_index][offset_y >> shift:(offset_y >> shift) + plane_height, offset_x >> shift:(offset_x >> shift) + plane_width]
+            noise = noise_pool[noise_offset:noise_offset + plane_size].reshape(plane_height, plane_width)
+            out_plane = samples[plane_offset:plane_offset + plane_size].reshape(plane_height, plane_width)
+            numpy.add(view, noise, out = out_plane)
+            # Ticker near the bottom on neutral chroma, keeps scrolling across scene cuts
+            top = self.ticker_top >> shift
+            bottom = (self.ticker_top + self.ticker_height) >> shift
+            if plane_index == 0:
+                numpy.add(self.ticker[:, ticker_offset:ticker_offset + self.width], noise[top:bottom], out = out_plane[top:bottom])
+            else:
+                numpy.add(((self.max_value + 1) // 2) >> self.shift, noise[top:bottom], out = out_plane[top:bottom], casting = 'unsafe')
+            plane_offset = plane_offset + plane_size
+
+        if self.shift != 0:
+            # 2 bit planes (Y, U then V) follow the 8 bit planes
+            lsb_offset = self.luma_size * 3 // 2
+            for plane_size in [self.luma_size, self.chroma_size, self.chroma_size]:
+                out_buffer[lsb_offset:lsb_offset + plane_size // 4] = packed_lsb[noise_offset // 4:(noise_offset + plane_size) // 4]
+                lsb_offset = lsb_offset + plane_size // 4
+        return out_buffer
+
+    # Frames generated per second, without writing them anywhere
+    def get_generation_fps(self, num_frames):
+        start_time = time.time()
+        for frame_index in range(num_frames):
+            self.get_frame(frame_index)
+        elapsed = time.time() - start_time
+        return num_frames / elapsed if elapsed > 0 else 0
+
+    # Generate frames while a writer thread writes the previous ones, returns False if the reader went away
+    def write_frames(self, out_file, num_frames):
+        frame_queue = queue.Queue(maxsize = 2)
+        errors = []
+        def writer():
+            while True:
+                frame = frame_queue.get()
+                if frame is None:
+                    break
+                if len(errors) != 0:
+                    continue
+                try:
+                    out_file.write(frame)
+                except (IOError, OSError) as error:
+                    errors.append(error)
+        writer_thread = threading.Thread(target = writer)
+        writer_thread.daemon = True
+        writer_thread.start()
+        for frame_index in range(num_frames):
+            if len(errors) != 0:
+                break
+            frame_queue.put(self.get_frame(frame_index))
+        frame_queue.put(None)
+        writer_thread.join()
+        try:
+            out_file.close()
+        except (IOError, OSError) as error:
+            errors.append(error)
+        return len(errors) == 0
+
+class EB_Journal(object):
+    # JSON Lines record of the jobs of a validation run, written through one buffered handle and synced to disk periodically
+    def __init__(self,
+                 journal_file,
+                 sync_interval,
+                 resume):
+
+        self.journal_file   = journal_file
+        self.sync_interval  = sync_interval
+        self.resumed        = resume and os.path.exists(journal_file)
+        self.lock           = threading.Lock()
+
+        # Replayed from the journal: job key -> (tests, passed) of the finished jobs, their test name and log lines in finishing order,
+        # the tests that finished and the seed of the run
+        self.finished_jobs  = {}
+        self.job_logs       = collections.OrderedDict()
+        self.finished_tests = []
+        self.seed           = None
+        if self.resumed:
+            self.replay()
+
+        self.journal = open(journal_file, 'a' if self.resumed else 'w')
+        self.last_sync = time.time()
+
+    def replay(self):
+        with open(self.journal_file, 'r') as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # The last record of a crashed run can be cut short
+                    continue
+                if record['event'] == 'run':
+                    self.seed = record['seed']
+                elif record['event'] == 'finish':
+                    self.finished_jobs[record['job']] = (record['tests'], record['passed'])
+                    self.job_logs[record['job']] = (record['job'].split(':', 1)[0], record.get('log', []))
+                elif record['event'] == 'test_end':
+                    self.finished_tests.append(record['test_name'])
+
+    def write(self, record, sync = False):
+        record['time'] = time.time()
+        with self.lock:
+            self.journal.write(json.dumps(record, sort_keys = True) + '\n')
+            # A crash loses at most the records of the last interval, their jobs run again on resume
+            if sync or record['time'] - self.last_sync >= self.sync_interval:
+                self.sync()
+
+    def sync(self):
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        self.last_sync = time.time()
+
+    def close(self):
+        with self.lock:
+            self.sync()
+            self.journal.close()
+
+class EB_ResultsDB(object):
+    # Every encode result of every run in one SQLite file, rows are buffered and inserted in bulk
+    columns = ['run_id', 'time', 'test_name', 'name', 'config_hash', 'build', 'host', 'enc_mode', 'width', 'height', 'frames', 'channels', 'jobs',
+               'exit_code', 'passed', 'run_time', 'fps', 'avg_latency', 'max_latency', 'cpu_time', 'max_rss', 'byte_count', 'digest', 'params']
+
+    def __init__(self,
+                 db_file,
+                 batch_size):
+
+        self.db_file        = db_file
+        self.batch_size     = batch_size
+        self.rows           = []
+        self.run_id         = None
+        self.lock           = threading.Lock()
+
+        self.connection = sqlite3.connect(db_file, check_same_thread = False)
+        # Results are cheap to lose on a crash, inserts should not wait on the disk
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS runs (run_id INTEGER PRIMARY KEY, time REAL, build TEXT, host TEXT, cpu_name TEXT, num_cpus INTEGER, test_configuration INTEGER, memory REAL)')
+        # Databases created before the host memory was recorded
+        if 'memory' not in [column[1] for column in self.connection.execute('PRAGMA table_info(runs)')]:
+            self.connection.execute('ALTER TABLE runs ADD COLUMN memory REAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS results (id INTEGER PRIMARY KEY, run_id INTEGER, time REAL, test_name TEXT, name TEXT, config_hash TEXT, build TEXT, host TEXT, '
+                                'enc_mode INTEGER, width INTEGER, height INTEGER, frames INTEGER, channels INTEGER, jobs INTEGER, exit_code INTEGER, passed INTEGER, '
+                                'run_time REAL, fps REAL, avg_latency REAL, max_latency REAL, cpu_time REAL, max_rss REAL, byte_count INTEGER, digest TEXT, params TEXT)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS results_config ON results (config_hash, time)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS results_build ON results (build)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS results_host ON results (host)')
+        self.connection.commit()
+
+    def start_run(self, build, host, cpu_name, num_cpus, memory, test_configuration):
+        with self.lock:
+            cursor = self.connection.execute('INSERT INTO runs (time, build, host, cpu_name, num_cpus, memory, test_configuration) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                             (time.time(), build, host, cpu_name, num_cpus, memory, test_configuration))
+            self.connection.commit()
+            self.run_id = cursor.lastrowid
+
+    def add_result(self, result):
+        result['run_id'] = self.run_id
+        with self.lock:
+            self.rows.append(tuple(result.get(column) for column in self.columns))
+            if len(self.rows) >= self.batch_size:
+                self.flush()
+
+    # Insert the buffered rows in one transaction, called with the lock held
+    def flush(self):
+        if len(self.rows) == 0:
+            return
+        self.connection.executemany('INSERT INTO results (' + ', '.join(self.columns) + ') VALUES (' + ', '.join(['?'] * len(self.columns)) + ')', self.rows)
+        self.connection.commit()
+        self.rows = []
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            self.connection.close()
+
+    # Passing results with the host they ran on, CPU time per frame and the config the capacity planner models, encodes that shared
+    # the host with other jobs would skew the fps and are left out. The CPU time of a result is the share of its channel, as are its frames
+    def get_capacity_rows(self):
+        with self.lock:
+            self.flush()
+            rows = self.connection.execute('SELECT results.config_hash, results.name, results.enc_mode, results.width, results.height, results.frames, results.channels, '
+                                           'results.fps, results.cpu_time, results.max_rss, results.params, runs.cpu_name, runs.num_cpus, runs.memory '
+                                           'FROM results JOIN runs ON results.run_id = runs.run_id WHERE results.passed = 1 AND results.jobs = 1').fetchall()
+        capacity_rows = []
+        for row in rows:
+            params = json.loads(row[10])
+            config = {'width': row[3], 'height': row[4], 'bit_depth': int(params.get('encoder_bit_depth', 8)), 'enc_mode': row[2], 'tune': int(params.get('tune', 0)),
+                      'rc': int(params.get('rc', 0)), 'channels': row[6], 'lp': int(params.get('logical_processors', 0)) or row[12]}
+            capacity_rows.append({'config_hash': row[0], 'name': row[1], 'config': config, 'fps': row[7], 'cpu': row[8] / row[5] if row[8] is not None and row[5] > 0 else None,
+                                  'rss': row[9], 'cpu_name': row[11], 'num_cpus': row[12], 'memory': row[13]})
+        return capacity_rows
+
+    # Split of a series with the lowest total squared error around the two means: (index, mean before, mean after, Welch t), None if too short
+    def find_change_point(self, values, min_segment):
+        count = len(values)
+        if count < 2 * min_segment:
+            return None
+        sums = [0.0]
+        squares = [0.0]
+        for value in values:
+            sums.append(sums[-1] + value)
+            squares.append(squares[-1] + value * value)
+        def error(start, end):
+            return max(squares[end] - squares[start] - (sums[end] - sums[start]) ** 2 / (end - start), 0.0)
+        split = min(range(min_segment, count - min_segment + 1), key = lambda index: error(0, index) + error(index, count))
+        mean_before = sums[split] / split
+        mean_after = (sums[count] - sums[split]) / (count - split)
+        variance = error(0, split) / max(split - 1, 1) / split + error(split, count) / max(count - split - 1, 1) / (count - split)
+        if variance == 0:
+            t_value = float('inf') if mean_before != mean_after else 0.0
+        else:
+            t_value = abs(mean_before - mean_after) / math.sqrt(variance)
+        return split, mean_before, mean_after, t_value
+
+    # Configs whose fps series (per host, channels and concurrent jobs) dropped by min_drop or more at a change point,
+    # with the build and time of the first result after it. Only the last max_samples results of a series are used
+    def get_regressions(self, min_drop, min_t, min_segment, max_samples):
+        with self.lock:
+            self.flush()
+            rows = self.connection.execute('SELECT config_hash, host, channels, jobs, time, fps, build, name FROM results WHERE passed = 1 AND fps IS NOT NULL '
+                                           'ORDER BY config_hash, host, channels, jobs, time').fetchall()
+        regressions = []
+        for key, series in itertools.groupby(rows, key = lambda row: row[:4]):
+            series = list(series)[-max_samples:]
+            change_point = self.find_change_point([row[5] for row in series], min_segment)
+            if change_point is None:
+                continue
+            split, mean_before, mean_after, t_value = change_point
+            drop = 1 - mean_after / mean_before if mean_before > 0 else 0.0
+            if drop >= min_drop and t_value >= min_t:
+                regressions.append({'config_hash': key[0], 'host': key[1], 'channels': key[2], 'jobs': key[3], 'name': series[-1][7],
+                                    'fps_before': mean_before, 'fps_after': mean_after, 'drop': drop, 't_value': t_value,
+                                    'since_build': series[split][6], 'since_time': series[split][4], 'samples': len(series)})
+        return sorted(regressions, key = lambda regression: -regression['drop'])
+
+class EB_CapacityPlanner(object):
+    # Log-linear models of the fps per channel, CPU seconds per frame and max RSS of an encode, one set per host class (CPU name and
+    # logical processors), fitted by least squares on the results database. Features: enc_mode and tune (one per value), log pixels,
+    # 10 bit, rc, log channels and log -lp. Only results without concurrent jobs are fitted (Timed Speed Test and single job validation runs)
+    targets = ['fps', 'cpu', 'rss']
+
+    def __init__(self,
+                 rows,
+                 min_samples):
+
+        # host class -> num_cpus, memory (MB), enc_modes, tunes and the fit of each target
+        self.models = {}
+        # host class -> feature and measured targets of every result, to find the configs the models miss
+        self.samples = {}
+        for row in rows:
+            host_class = self.get_host_class(row['cpu_name'], row['num_cpus'])
+            self.samples.setdefault(host_class, []).append(row)
+        for host_class in self.samples:
+            samples = self.samples[host_class]
+            model = {'num_cpus': samples[-1]['num_cpus'], 'memory': samples[-1]['memory'], 'samples': len(samples), 'fits': {},
+                     'enc_modes': sorted(set(row['config']['enc_mode'] for row in samples)),
+                     'tunes': sorted(set(row['config']['tune'] for row in samples))}
+            for target in self.targets:
+                target_samples = [row for row in samples if row[target] is not None and row[target] > 0]
+                if len(target_samples) < min_samples:
+                    continue
+                features = numpy.array([self.get_features(model, row['config']) for row in target_samples])
+                values = numpy.log(numpy.array([row[target] for row in target_samples]))
+                model['fits'][target] = self.fit(features, values)
+            self.models[host_class] = model
+
+    def get_host_class(self, cpu_name, num_cpus):
+        return cpu_name + ' x' + str(num_cpus)
+
+    # config: width, height, bit_depth, enc_mode, tune, rc, channels and lp
+    def get_features(self, model, config):
+        features = [1.0 if config['enc_mode'] == enc_mode else 0.0 for enc_mode in model['enc_modes']]
+        # The first tune is part of the enc_mode terms
+        features.extend([1.0 if config['tune'] == tune else 0.0 for tune in model['tunes'][1:]])
+        features.extend([math.log(config['width'] * config['height']), 1.0 if config['bit_depth'] > 8 else 0.0, float(config['rc']),
+                         math.log(config['channels']), math.log(config['lp'])])
+        return features
+
+    # Least squares through the SVD, directions the samples never varied (a single channel count, ...) get no weight
+    def fit(self, features, values):
+        u, s, vt = numpy.linalg.svd(features, full_matrices = False)
+        rank = int(numpy.sum(s > s[0] * 1e-10))
+        basis = vt[:rank]
+        coefficients = basis.T.dot(u[:, :rank].T.dot(values) / s[:rank])
+        residuals = values - features.dot(coefficients)
+        return {'coefficients': coefficients, 'basis': basis,
+                # (X'X)^+, scales the residual variance into the variance of a prediction
+                'covariance': basis.T.dot(basis / (s[:rank] ** 2)[:, None]),
+                'variance': residuals.dot(residuals) / max(len(values) - rank, 1),
+                'r2': 1 - residuals.var() / values.var() if values.var() > 0 else 1.0,
+                'samples': len(values)}
+
+    # (prediction, lower bound, upper bound, extrapolated), the bounds are z standard errors of a new measurement
+    def predict(self, host_class, target, config, z):
+        model = self.models[host_class]
+        fit = model['fits'][target]
+        if config['enc_mode'] not in model['enc_modes'] or config['tune'] not in model['tunes']:
+            return None
+        features = numpy.array(self.get_features(model, config))
+        mean = features.dot(fit['coefficients'])
+        error = math.sqrt(fit['variance'] * (1 + features.dot(fit['covariance']).dot(features)))
+        # Part of the config outside of what the samples span, the bounds do not cover it
+        outside = features - fit['basis'].T.dot(fit['basis'].dot(features))
+        extrapolated = numpy.linalg.norm(outside) > 1e-6 * numpy.linalg.norm(features)
+        return math.exp(mean), math.exp(mean - z * error), math.exp(mean + z * error), extrapolated
+
+    # Max real-time channels of a mix (entries with a share of the channels), with bounds. A channel needs the fps of its entry,
+    # the channels share the CPU time and memory of the host
+    def get_capacity(self, host_class, mix, cpu_utilization, memory_utilization, z):
+        model = self.models[host_class]
+        if any(target not in model['fits'] for target in self.targets):
+            return {'error': 'not enough samples'}
+        total_share = float(sum(entry.get('share', 1) for entry in mix))
+        # CPU seconds per second of video and MB of one channel of the mix, as (prediction, lower, upper)
+        cpu_load = [0.0, 0.0, 0.0]
+        memory = [0.0, 0.0, 0.0]
+        real_time = [True, True, True]
+        entries = []
+        extrapolated = False
+        for entry in mix:
+            config = {'width': entry['width'], 'height': entry['height'], 'bit_depth': entry['bit_depth'], 'enc_mode': entry['enc_mode'],
+                      'tune': entry.get('tune', 0), 'rc': entry.get('rc', 0), 'channels': 1, 'lp': entry.get('lp', model['num_cpus'])}
+            predictions = dict((target, self.predict(host_class, target, config, z)) for target in self.targets)
+            if any(prediction is None for prediction in predictions.values()):
+                return {'error': 'no samples of enc_mode ' + str(config['enc_mode']) + ' with tune ' + str(config['tune'])}
+            share = entry.get('share', 1) / total_share
+            for index in range(3):
+                cpu_load[index] = cpu_load[index] + share * predictions['cpu'][index] * entry['frame_rate']
+                memory[index] = memory[index] + share * predictions['rss'][index]
+            real_time = [real_time[index] and predictions['fps'][index] >= entry['frame_rate'] for index in range(3)]
+            extrapolated = extrapolated or any(prediction[3] for prediction in predictions.values())
+            entries.append(dict(entry, predictions = predictions))
+        capacity = {'entries': entries, 'extrapolated': extrapolated, 'cpu_load': cpu_load[0], 'memory': memory[0]}
+        # A higher load gives fewer channels, the lower channel bound comes from the upper load bound
+        for name, index, load_index in [('channels', 0, 0), ('lower', 1, 2), ('upper', 2, 1)]:
+            channels = model['num_cpus'] * cpu_utilization / cpu_load[load_index]
+            capacity['cpu_' + name] = channels
+            if model['memory'] is not None:
+                channels = min(channels, model['memory'] * memory_utilization / memory[load_index])
+            capacity[name] = int(channels) if real_time[index] else 0
+        capacity['limit'] = 'cpu' if model['memory'] is None or capacity['cpu_channels'] * memory[0] <= model['memory'] * memory_utilization else 'memory'
+        if not real_time[0]:
+            capacity['limit'] = 'fps'
+        return capacity
+
+    # Configs whose mean measurement is off the model by more than max_error (fraction), the candidates for targeted speed runs
+    def get_poor_predictions(self, max_error):
+        poor_predictions = []
+        for host_class in self.models:
+            model = self.models[host_class]
+            for target in model['fits']:
+                fit = model['fits'][target]
+                residuals = {}
+                for row in self.samples[host_class]:
+                    if row[target] is None or row[target] <= 0:
+                        continue
+                    prediction = numpy.array(self.get_features(model, row['config'])).dot(fit['coefficients'])
+                    residuals.setdefault(row['config_hash'], (row['name'], []))[1].append(math.log(row[target]) - prediction)
+                for config_hash in residuals:
+                    name, values = residuals[config_hash]
+                    error = math.exp(abs(sum(values) / len(values))) - 1
+                    if error > max_error:
+                        poor_predictions.append({'host_class': host_class, 'target': target, 'name': name, 'samples': len(values), 'error': error,
+                                                 'direction': 'over' if sum(values) < 0 else 'under'})
+        return sorted(poor_predictions, key = lambda poor_prediction: -poor_prediction['error'])
+
 class EB_Test(object):
+    # Test conditions drawn again every run, left out of the history signatures and parameter hashes like the QP and bitrate
+    random_conds = {'me_hme_test'       : ['SearchAreaWidth', 'SearchAreaHeight', 'HmeLevel0TotalSearchAreaWidth', 'HmeLevel0TotalSearchAreaHeight'],
+                    'intra_period_test' : ['intra_period'],
+                    'scene_change_test' : ['LookAheadDistance'],
+                    'width_height_test' : ['width', 'height'],
+                    }
+
     # Initialization parameters for folders
     def __init__(self,
                  encoder_path,
                  bitstream_path,
-                 yuv_path):
+                 yuv_path,
+                 read_only = False):
     
         self.yuv_path       = yuv_path
         self.encoder_path   = encoder_path
         self.bitstream_path = bitstream_path
         
-        if not os.path.exists(bitstream_path):
-            os.mkdir(bitstream_path)
-            
-        if not os.path.exists('qp_files'):
-            os.mkdir('qp_files')
+        # Queries of the results database leave the output folders as they are
+        if not read_only:
+            if not os.path.exists(bitstream_path):
+                os.mkdir(bitstream_path)
+                
+            if not os.path.exists('qp_files'):
+                os.mkdir('qp_files')
+            elif JOURNAL_MODE != 2:
+                files = glob.glob('qp_files' + slash + '*.qpfile')
+                for f in files:
+                    if os.path.exists(f):
+                        os.remove(f)
+
+        self.job_plan = None
+        self.dashboard = None
+        self.results_db = None
+        self.build_hash = None
+        self.num_jobs = 1
+        self.journal = None
+        self.run_seed = None
+        self.log_files = {}
+        self.started_tests = []
+        self.lock = threading.Lock()
+        self.load_history()
+
+        if ARTIFACT_STORE_MODE == 1 and not read_only:
+            self.artifact_store = EB_ArtifactStore(ARTIFACT_PATH, ARTIFACT_STORE_MAX_SIZE)
         else:
-            files = glob.glob('qp_files' + slash + '*.qpfile')
-            for f in files:
-                if os.path.exists(f):
-                    os.remove(f)
-            
+            self.artifact_store = None
+
     def get_default_params(self):
         # Default encoding parameters
         encoder_bit_depth                   = 8
@@ -258,65 +1252,80 @@ class EB_Test(object):
                         'HmeLevel1SearchAreaInHeight'       : '-hme-l1-h',
                         'HmeLevel2SearchAreaInWidth'        : '-hme-l2-w',
                         'HmeLevel2SearchAreaInHeight'       : '-hme-l2-h',
+                        'asm_type'                          : '-asm',
+                        'injector'                          : '-inj',
+                        'injector_frame_rate'               : '-inj-frm-rt',
+                        'speed_control'                     : '-speed-ctrl',
+                        'latency_mode'                      : '-latency-mode',
+                        'recon_file'                        : '-o',
+                        'logical_processors'                : '-lp',
                         }
         return default_tokens
     
     # Assemble the command line
     def get_enc_cmd(self, enc_param, yuv_name, bitstream_name, num_channels = 1):
-        all_tokens = self.get_param_tokens()
-        # command line necessary for the encoder to work
-        enc_cmd =   ( enc_param['encoder_dir'] + slash + exe_name)
-        if num_channels != 1:
-            enc_cmd += (' -nch ') + str(num_channels)
-        enc_cmd +=  (' -i ')
-        for count in range (0, num_channels):
-            enc_cmd += (enc_param['yuv_dir'] + slash + yuv_name + '.yuv ')
-        enc_cmd +=  (' -b ')
+        return self.get_channels_cmd(self.get_enc_channels(enc_param, yuv_name, bitstream_name, num_channels), bitstream_name)
+
+    # Arguments of the encoder without a shell, for encodes the harness has to control directly
+    def get_enc_args(self, enc_param, yuv_name, bitstream_name, num_channels = 1):
+        return self.get_channels_args(self.get_enc_channels(enc_param, yuv_name, bitstream_name, num_channels))
+
+    def get_enc_channels(self, enc_param, yuv_name, bitstream_name, num_channels):
+        # yuv_name can also be a list with one input per channel
+        channels = []
         for count in range (0, num_channels):
+            channel_yuv_name = yuv_name[count] if isinstance(yuv_name, list) else yuv_name
             if count == 0:
-                enc_cmd += (enc_param['bitstream_dir'] + slash + bitstream_name + '.265 ')
+                channels.append((enc_param, channel_yuv_name, bitstream_name))
             else:
-                enc_cmd += (enc_param['bitstream_dir'] + slash + bitstream_name + '_' + str(count) + '.265 ')
-        enc_cmd +=  (' -errlog ')
-        for count in range (0, num_channels):
-            if count == 0:
-                enc_cmd += (enc_param['bitstream_dir'] + slash + bitstream_name + '.errlog ')
+                channels.append((enc_param, channel_yuv_name, bitstream_name + '_' + str(count)))
+        return channels
+
+    # Command line of one encoder instance running a channel per (enc_param, yuv_name, bitstream_name),
+    # every channel has to set the same optional parameters
+    def get_channels_cmd(self, channels, output_name):
+        enc_cmd = ' '.join(self.get_channels_args(channels))
+        # command line to produce output
+        enc_cmd += (' > ' + channels[0][0]['bitstream_dir'] + slash + output_name + '.txt')
+        return enc_cmd
+
+    def get_channels_args(self, channels):
+        all_tokens = self.get_param_tokens()
+        enc_param = channels[0][0]
+        num_channels = len(channels)
+        # arguments necessary for the encoder to work
+        enc_args = [enc_param['encoder_dir'] + slash + exe_name]
+        if num_channels != 1:
+            enc_args += ['-nch', str(num_channels)]
+        enc_args.append('-i')
+        for channel_param, yuv_name, bitstream_name in channels:
+            if yuv_name == 'stdin':
+                enc_args.append('stdin')
             else:
-                enc_cmd += (enc_param['bitstream_dir'] + slash + bitstream_name + '_' + str(count) + '.errlog ')
-        enc_cmd +=  (' -w ')
-        for count in range (0, num_channels):
-            enc_cmd += (str(enc_param['width']) + ' ')
-        enc_cmd +=  (' -h ')
-        for count in range (0, num_channels):
-            enc_cmd += (str(enc_param['height']) + ' ')
-        enc_cmd +=  (' -bit-depth ')
-        for count in range (0, num_channels):
-            enc_cmd += (str(enc_param['encoder_bit_depth']) + ' ')
-        enc_cmd +=  (' -fps ')
-        for count in range (0, num_channels):
-            enc_cmd += (str(enc_param['frame_rate']) + ' ')
-        enc_cmd +=  (' -intra-period ')
-        for count in range (0, num_channels):
-            enc_cmd += (str(enc_param['intra_period']) + ' ')
-        enc_cmd +=  (' -n ')
-        for count in range (0, num_channels):
-            enc_cmd += (str(enc_param['frame_to_be_encoded']) + ' ')
-        
-        # optional command line
+                enc_args.append(channel_param['yuv_dir'] + slash + yuv_name + '.yuv')
+        enc_args.append('-b')
+        for channel_param, yuv_name, bitstream_name in channels:
+            enc_args.append(channel_param['bitstream_dir'] + slash + bitstream_name + '.265')
+        enc_args.append('-errlog')
+        for channel_param, yuv_name, bitstream_name in channels:
+            enc_args.append(channel_param['bitstream_dir'] + slash + bitstream_name + '.errlog')
+        for token, name in [('-w', 'width'), ('-h', 'height'), ('-bit-depth', 'encoder_bit_depth'), ('-fps', 'frame_rate'),
+                            ('-intra-period', 'intra_period'), ('-n', 'frame_to_be_encoded')]:
+            enc_args.append(token)
+            for channel_param, yuv_name, bitstream_name in channels:
+                enc_args.append(str(channel_param[name]))
+
+        # optional arguments
         for tokens in all_tokens:
             if tokens in enc_param:
-                enc_cmd += (' ' + all_tokens[tokens] + ' ')
-                if isinstance(enc_param[tokens], list):
-                    for count in range (0, num_channels):
-                        for items in enc_param[tokens]:
-                            enc_cmd += (str(items) + ' ')
-                else:
-                    for count in range (0, num_channels):
-                        enc_cmd += (str(enc_param[tokens]) + ' ')
-        
-        # command line to produce output
-        enc_cmd += (' > ' + enc_param['bitstream_dir'] + slash + bitstream_name + '.txt')
-        return enc_cmd
+                enc_args.append(all_tokens[tokens])
+                for channel_param, yuv_name, bitstream_name in channels:
+                    if isinstance(channel_param[tokens], list):
+                        for items in channel_param[tokens]:
+                            enc_args.append(str(items))
+                    else:
+                        enc_args.append(str(channel_param[tokens]))
+        return enc_args
         
     def get_test_params(self, seq, combination_test_params):
         test_param = []
@@ -481,16 +1490,351 @@ class EB_Test(object):
         return widths, heights
         
     def generate_qp_file(self, bitstream_name, num_frames):
-        found = 0
         qp_file_name = bitstream_name + '.qpfile'
-        for i in range(num_frames):
-            print(random.randint(MIN_QP,MAX_QP), file=open('qp_files' + slash + qp_file_name, 'a'))
+        with open('qp_files' + slash + qp_file_name, 'w') as qp_file:
+            for i in range(num_frames):
+                print(random.randint(MIN_QP,MAX_QP), file=qp_file)
         return qp_file_name
-    
-    # Test to Compare exactness between bitstreams
-    def run_test(self, test_name, test_params, enc_params, OQ, VBR, COMPARE):
-        total_tests = 0
-        passed_tests = 0
+
+    # Move the outputs of an encode into the artifact store, if enabled
+    def archive_outputs(self, bitstream_dir, bitstream_name, passed):
+        if self.artifact_store is not None:
+            self.artifact_store.store(bitstream_dir, bitstream_name, passed)
+
+    # Compare the bitstream of a previous encode against the one that was just produced
+    def compare_bitstreams(self, bitstream_dir, compare_bitstream, bitstream_name):
+        if self.artifact_store is not None:
+            # Previous bitstream is already in the store, identical content means identical hash
+            compare_hash = self.artifact_store.get_hash(compare_bitstream)
+            bitstream_file = bitstream_dir + slash + bitstream_name + '.265'
+            if compare_hash == "" or not os.path.exists(bitstream_file):
+                return False
+            return compare_hash == self.artifact_store.get_file_hash(bitstream_file)
+        return filecmp.cmp(bitstream_dir + slash + compare_bitstream + '.265', bitstream_dir + slash + bitstream_name + '.265')
+
+    def write_test_log(self, test_name, log_lines):
+        # Lines of one job are written together so concurrent jobs do not interleave
+        with self.lock:
+            if test_name not in self.log_files:
+                self.log_files[test_name] = open(test_name + '.txt', 'a')
+            log_file = self.log_files[test_name]
+            for line in log_lines:
+                print(line, file=log_file)
+            # On disk before the job is journaled as finished
+            log_file.flush()
+
+    # Start the log of a test, False if the test already ran (its log exists). A resumed run rewrites the logs of the tests it did not finish
+    # from the journal, lines of jobs whose finish record was lost are dropped as these jobs run again
+    def start_test_log(self, test_name):
+        resumed = self.journal is not None and self.journal.resumed
+        if os.path.exists(test_name + '.txt') and (not resumed or test_name in self.journal.finished_tests):
+            return False
+        print ("Running Test: " + test_name)
+        self.started_tests.append(test_name)
+        with self.lock:
+            self.log_files[test_name] = open(test_name + '.txt', 'w')
+        self.write_test_log(test_name, ["---------------------------------------", "Test Name: " + test_name])
+        if resumed:
+            for job_test_name, log_lines in self.journal.job_logs.values():
+                if job_test_name == test_name:
+                    self.write_test_log(test_name, log_lines)
+        return True
+
+    def end_test_log(self, test_name):
+        self.write_test_log(test_name, ["---------------------------------------"])
+        # The test log is complete, a resumed run must not write to it again
+        self.write_journal({'event': 'test_end', 'test_name': test_name}, True)
+
+    def close_test_logs(self):
+        with self.lock:
+            for test_name in self.log_files:
+                self.log_files[test_name].close()
+            self.log_files = {}
+
+    def write_journal(self, record, sync = False):
+        if self.journal is not None:
+            self.journal.write(record, sync)
+
+    # Jobs are identified across a crash by their test and encode names, the seed of the run makes them the same on resume
+    def get_job_key(self, job):
+        return job['test_name'] + ':' + ','.join(encode['name'] for encode in job['encodes'])
+
+    def load_history(self):
+        self.history = {'jobs': {}}
+        if os.path.exists(TEST_HISTORY_FILE):
+            with open(TEST_HISTORY_FILE, 'r') as history_file:
+                self.history = json.load(history_file)
+
+    def save_history(self):
+        with self.lock:
+            with open(TEST_HISTORY_FILE + '.tmp', 'w') as history_file:
+                json.dump(self.history, history_file)
+            if os.path.exists(TEST_HISTORY_FILE):
+                os.remove(TEST_HISTORY_FILE)
+            os.rename(TEST_HISTORY_FILE + '.tmp', TEST_HISTORY_FILE)
+
+    def update_history(self, encode, run_time, passed):
+        with self.lock:
+            if encode['signature'] not in self.history['jobs']:
+                self.history['jobs'][encode['signature']] = {'runs': 0, 'sec_per_frame': 0.0, 'results': []}
+            entry = self.history['jobs'][encode['signature']]
+            # Runtime per frame is averaged so recent runs weigh more
+            sec_per_frame = run_time/float(max(encode['frames'], 1))
+            if entry['runs'] == 0:
+                entry['sec_per_frame'] = sec_per_frame
+            else:
+                entry['sec_per_frame'] = 0.5*entry['sec_per_frame'] + 0.5*sec_per_frame
+            entry['runs'] = entry['runs'] + 1
+            entry['enc_mode'] = encode['enc_mode']
+            entry['pixels'] = encode['pixels']
+            entry['results'] = (entry['results'] + [passed])[-HISTORY_RESULTS:]
+            entry['last_run'] = time.time()
+            entry['params_hash'] = self.get_params_hash(encode)
+            entry['build'] = self.get_build_hash()
+
+    # Seed of the test matrix, a journaled run draws one so that it can be resumed. None - Unseeded
+    def get_run_seed(self):
+        if self.journal is not None and self.journal.seed is not None:
+            return self.journal.seed
+        if RANDOM_SEED is not None:
+            return RANDOM_SEED
+        # Digests are kept per config, the configs have to be drawn the same every run
+        if GOLDEN_MODE != 0:
+            return 0
+        if self.journal is not None:
+            return random.randrange(1 << 30)
+        return None
+
+    # Seed the random QPs, bitrates and test conditions of a validation test, so it draws the same matrix whichever tests ran before it
+    def seed_test(self, validation_test):
+        if self.run_seed is not None:
+            random.seed(self.run_seed * 1000003 + int(hashlib.sha256(validation_test.__name__.encode('utf-8')).hexdigest()[:8], 16))
+
+    def load_golden_db(self):
+        self.golden_db = {'version': GOLDEN_DB_VERSION, 'builds': {}, 'entries': {}}
+        if os.path.exists(GOLDEN_DB_FILE):
+            with open(GOLDEN_DB_FILE) as db_file:
+                golden_db = json.load(db_file)
+            if golden_db.get('version') == GOLDEN_DB_VERSION:
+                self.golden_db = golden_db
+            else:
+                print ("Ignoring " + GOLDEN_DB_FILE + ", recorded with digest version " + str(golden_db.get('version')))
+        self.golden_build = self.get_build_hash()
+        self.golden_results = []
+
+    def save_golden_db(self):
+        self.golden_db['builds'][self.golden_build] = {'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'platform': platform}
+        with open(GOLDEN_DB_FILE, 'w') as db_file:
+            json.dump(self.golden_db, db_file, sort_keys = True)
+
+    # The build is identified by its encoder binary
+    def get_build_hash(self):
+        if self.build_hash is None:
+            with open(self.encoder_path + slash + exe_name, 'rb') as exe_file:
+                self.build_hash = hashlib.sha256(exe_file.read()).hexdigest()
+        return self.build_hash
+
+    # Config of an encode without its paths, a QP file is replaced by the hash of its content
+    def get_encode_config(self, encode):
+        config = dict((name, value) for name, value in encode['enc_params'].items() if name not in ['encoder_dir', 'bitstream_dir', 'yuv_dir', 'recon_file'])
+        if 'qp_file_name' in config:
+            with open(config['qp_file_name'], 'rb') as qp_file:
+                config['qp_file_name'] = hashlib.sha256(qp_file.read()).hexdigest()
+        config['seq_name'] = encode['seq_name']
+        return config
+
+    # Config of an encode without the values drawn again every run, the fps series of the results database follow it across runs
+    def get_series_config(self, encode):
+        random_conds = encode.get('random_conds', [])
+        config = dict((name, value) for name, value in encode['enc_params'].items()
+                      if name not in ['encoder_dir', 'bitstream_dir', 'yuv_dir', 'recon_file'] + random_conds and not isinstance(value, list))
+        config['seq_name'] = encode['seq_name']
+        return config
+
+    def get_config_hash(self, config):
+        return hashlib.sha256(json.dumps(config, sort_keys = True).encode('utf-8')).hexdigest()
+
+    # Bytes of each access unit in decoding order, a picture starts at its first slice segment or at the parameter sets,
+    # AUD and prefix SEI in front of it
+    def get_frame_sizes(self, bitstream):
+        frame_sizes = []
+        has_slice = False
+        for nal_unit in self.get_nal_units(bitstream):
+            header = bytearray(nal_unit.lstrip(b'\x00')[1:4])
+            nal_type = (header[0] >> 1) & 0x3f if len(header) != 0 else 63
+            if nal_type < 32:
+                starts_picture = len(header) > 2 and header[2] & 0x80 != 0
+            else:
+                starts_picture = 32 <= nal_type <= 35 or nal_type == 39 or 41 <= nal_type <= 44 or 48 <= nal_type <= 55
+            if len(frame_sizes) == 0 or (starts_picture and has_slice):
+                frame_sizes.append(0)
+                has_slice = False
+            has_slice = has_slice or nal_type < 32
+            frame_sizes[-1] = frame_sizes[-1] + len(nal_unit)
+        return frame_sizes
+
+    # How a digest differs from the recorded one: Identical, Size Drift (PSNR within GOLDEN_PSNR_TOLERANCE),
+    # Quality Change, Changed (no PSNR to tell) or New
+    def classify_golden(self, golden, digest):
+        if golden is None:
+            return {'status': 'New'}
+        if golden['sha256'] == digest['sha256']:
+            return {'status': 'Identical', 'size_change': 0.0, 'psnr_change': 0.0}
+        result = {'size_change': digest['size'] / float(max(golden['size'], 1)) - 1,
+                  'frames_changed': sum(1 for x, y in zip(golden['frame_sizes'], digest['frame_sizes']) if x != y) + abs(len(golden['frame_sizes']) - len(digest['frame_sizes']))}
+        if golden.get('psnr') is None or digest['psnr'] is None:
+            result['status'] = 'Changed'
+        else:
+            result['psnr_change'] = digest['psnr'][1] - golden['psnr'][1]
+            result['status'] = 'Size Drift' if abs(result['psnr_change']) <= GOLDEN_PSNR_TOLERANCE else 'Quality Change'
+        return result
+
+    # Record the digest of a passing encode, or classify it against the recorded one. Returns the log lines
+    def check_golden(self, encode):
+        config = self.get_encode_config(encode)
+        key = self.get_config_hash(config)
+        with open(encode['bitstream_dir'] + slash + encode['name'] + '.265', 'rb') as bitstream_file:
+            bitstream = bitstream_file.read()
+        digest = {'sha256': hashlib.sha256(bitstream).hexdigest(), 'size': len(bitstream), 'frame_sizes': self.get_frame_sizes(bitstream), 'psnr': None}
+        if encode.get('recon') is not None:
+            enc_params = encode['enc_params']
+            psnr = self.get_psnr(enc_params['yuv_dir'] + slash + encode['seq_name'] + '.yuv', encode['recon']['file'], encode['frames'],
+                                 int(enc_params['width']), int(enc_params['height']), int(enc_params['encoder_bit_depth']), enc_params.get('compressed_ten_bit_format', 0))
+            if psnr is not None:
+                digest['psnr'] = [round(x, 4) for x in psnr]
+        result = {'name': encode['name'], 'preset': encode['enc_mode']}
+        with self.lock:
+            if GOLDEN_MODE == 1:
+                digest.update({'build': self.golden_build, 'config': config})
+                self.golden_db['entries'][key] = digest
+                result['status'] = 'Recorded'
+            else:
+                golden = self.golden_db['entries'].get(key)
+                result.update(self.classify_golden(golden, digest))
+                if golden is not None:
+                    result['build'] = golden['build']
+            self.golden_results.append(result)
+        log_line = 'Golden: ' + result['status']
+        if 'size_change' in result and result['status'] != 'Identical':
+            log_line = log_line + ', size %+.2f%%, %d frame(s) changed' % (result['size_change'] * 100, result['frames_changed'])
+        if 'psnr_change' in result and result['status'] != 'Identical':
+            log_line = log_line + ', YUV PSNR %+.3f dB' % result['psnr_change']
+        return [log_line]
+
+    # Digest results per preset (enc mode) and the encodes that changed
+    def write_golden_summary(self, file_name):
+        with open(file_name + '.txt', 'w') as results_file:
+            print ("---------------------------------------------------------", file=results_file)
+            print ("Build: " + self.golden_build[:16] + ", digest database: " + GOLDEN_DB_FILE + " (" + str(len(self.golden_db['entries'])) + " entries)", file=results_file)
+            if GOLDEN_MODE == 1:
+                print ("Recorded: " + str(len(self.golden_results)), file=results_file)
+                print ("---------------------------------------------------------", file=results_file)
+                return
+            reference_builds = sorted(set(x['build'][:16] for x in self.golden_results if 'build' in x))
+            print ("Compared against build(s): " + (', '.join(reference_builds) if reference_builds else 'none'), file=results_file)
+            print ("---------------------------------------------------------", file=results_file)
+            statuses = ['Identical', 'Size Drift', 'Quality Change', 'Changed', 'New']
+            print ("%-8s%9s%11s%12s%16s%9s%6s%10s%10s" % ('Preset', 'Encodes', 'Identical', 'Size Drift', 'Quality Change', 'Changed', 'New', 'Avg Size', 'Avg dPSNR'), file=results_file)
+            for preset in sorted(set(x['preset'] for x in self.golden_results)):
+                results = [x for x in self.golden_results if x['preset'] == preset]
+                counts = [sum(1 for x in results if x['status'] == status) for status in statuses]
+                size_changes = [x['size_change'] for x in results if 'size_change' in x]
+                psnr_changes = [x['psnr_change'] for x in results if 'psnr_change' in x]
+                average_size = "%+.2f%%" % (sum(size_changes) / len(size_changes) * 100) if size_changes else '-'
+                average_psnr = "%+.3f" % (sum(psnr_changes) / len(psnr_changes)) if psnr_changes else '-'
+                print ("%-8s%9d%11d%12d%16d%9d%6d%10s%10s" % ('M' + str(preset), len(results), counts[0], counts[1], counts[2], counts[3], counts[4], average_size, average_psnr), file=results_file)
+            for status in statuses[1:]:
+                results = [x for x in self.golden_results if x['status'] == status]
+                if len(results) == 0:
+                    continue
+                print ("---------------------------------------------------------", file=results_file)
+                print (status + ":", file=results_file)
+                for result in results:
+                    details = ''
+                    if 'size_change' in result:
+                        details = ' (size %+.2f%%' % (result['size_change'] * 100) + (', YUV PSNR %+.3f dB' % result['psnr_change'] if 'psnr_change' in result else '') + ')'
+                    print ("    " + result['name'] + details, file=results_file)
+            print ("---------------------------------------------------------", file=results_file)
+
+    # Average encoding speed in pixels per second for each enc_mode seen in the history
+    def get_pixel_rates(self):
+        rate_sum = {}
+        rate_count = {}
+        for signature in self.history['jobs']:
+            entry = self.history['jobs'][signature]
+            if entry['sec_per_frame'] <= 0:
+                continue
+            for key in [entry['enc_mode'], 'all']:
+                rate_sum[key] = rate_sum.get(key, 0.0) + entry['pixels']/entry['sec_per_frame']
+                rate_count[key] = rate_count.get(key, 0) + 1
+        pixel_rates = {}
+        for key in rate_sum:
+            pixel_rates[key] = rate_sum[key]/rate_count[key]
+        return pixel_rates
+
+    # Predicted runtime of a job in seconds
+    def get_job_cost(self, job, pixel_rates):
+        cost = 0.0
+        for encode in job['encodes']:
+            entry = self.history['jobs'].get(encode['signature'])
+            if entry is not None and entry['sec_per_frame'] > 0:
+                cost = cost + entry['sec_per_frame']*encode['frames']
+            else:
+                pixel_rate = pixel_rates.get(encode['enc_mode'], pixel_rates.get('all', DEFAULT_PIXEL_RATE))
+                cost = cost + float(encode['pixels'])*encode['frames']/pixel_rate
+        return cost
+
+    # Hash of the parameter values of an encode without its paths and the values drawn again every run
+    # (QP, bitrate, QP file, the search region splits and the random test conditions)
+    def get_params_hash(self, encode):
+        random_conds = encode.get('random_conds', [])
+        params = dict((name, value) for name, value in encode['enc_params'].items()
+                      if name not in ['encoder_dir', 'bitstream_dir', 'yuv_dir', 'recon_file', 'qp', 'tbr', 'qp_file_name'] + random_conds and not isinstance(value, list))
+        return self.get_config_hash(params)
+
+    # Expected value of running a job: never run, recently failing and changed parameters or encoder build rank first
+    def get_job_value(self, job, build_hash):
+        job_value = 0.0
+        now = time.time()
+        for encode in job['encodes']:
+            value = 0.1
+            entry = self.history['jobs'].get(encode['signature'])
+            if entry is None:
+                value = value + 3.0
+            else:
+                age = 0
+                for result in reversed(entry['results']):
+                    if not result:
+                        value = value + 2.0*math.pow(0.5, age)
+                    age = age + 1
+                # Jobs that have not run for a week get back some priority
+                value = value + 0.5*min(1.0, (now - entry.get('last_run', now))/(7*24*3600.0))
+                # Entries written before the hashes were recorded count as unchanged
+                params_hash = self.get_params_hash(encode)
+                if entry.get('params_hash', params_hash) != params_hash or entry.get('build', build_hash) != build_hash:
+                    value = value + 1.5
+            job_value = max(job_value, value)
+        return job_value
+
+    # Normalized name of an encode without the randomly drawn QP/bitrate and test conditions, used to look up its history
+    def get_job_signature(self, test_name, seq_name, enc_params, VBR, OQ, test_cond):
+        signature = test_name + '_M' + str(enc_params['enc_mode']) + '_' + seq_name
+        if VBR == 0:
+            signature = signature + '_Q'
+        else:
+            signature = signature + '_TBR'
+        if OQ == 0:
+            signature = signature + '_SQ'
+        else:
+            signature = signature + '_OQ'
+        for cond in test_cond:
+            if not isinstance(test_cond[cond], list) and cond not in self.random_conds.get(test_name, []):
+                signature = signature + '_' + str(test_cond[cond])
+        return signature
+
+    # Build the encodes of a test, each job is a single encode or a group of encodes compared with each other
+    def get_test_jobs(self, test_name, test_params, enc_params, OQ, VBR, COMPARE):
+        jobs = []
         if VBR == 0:
             iter_list = [random.randint(MIN_QP,MAX_QP) for x in range(QP_ITERATIONS)]
         else:
@@ -498,8 +1842,7 @@ class EB_Test(object):
             
         for enc_mode in ENC_MODES:
             for iter in iter_list: # QP or Bitrate
-                compare_bitstream = ""
-                bitstream_name = ""
+                encodes = []
                 for params in test_params:
                     seq_name = params[0]
                     test_cond = params[1]
@@ -521,6 +1864,9 @@ class EB_Test(object):
                         enc_params.update({cond: test_cond[cond]})
                         if not isinstance(test_cond[cond], list):
                             bitstream_name = bitstream_name + '_' + str(test_cond[cond])
+                    # Identical encodes (run_to_run_test) need their own outputs to be compared
+                    if any(encode['name'] == bitstream_name for encode in encodes):
+                        bitstream_name = bitstream_name + '_Run' + str(len(encodes) + 1)
                     # Check if sequence is supported with given combinations
                     error = self.check_seq_support(test_name, seq_name, enc_params)
                     if error != 0:
@@ -537,37 +1883,345 @@ class EB_Test(object):
                     elif test_name == 'qp_file_test':
                         qp_file_name = self.generate_qp_file(bitstream_name, enc_params['frame_to_be_encoded'])
                         enc_params.update({'qp_file_name': 'qp_files' + slash + qp_file_name})
+                    recon = None
+                    if numpy is not None and ((COMPARE != 0 and RECON_CHECK_MODE == 1) or GOLDEN_MODE != 0):
+                        recon = {'file'         : enc_params['bitstream_dir'] + slash + bitstream_name + '_recon.yuv',
+                                 'width'        : int(enc_params['width']),
+                                 'height'       : int(enc_params['height']),
+                                 'bit_depth'    : int(enc_params['encoder_bit_depth']),
+                                 }
+                        enc_params.update({'recon_file': recon['file']})
                     enc_cmd = self.get_enc_cmd(enc_params, seq_name, bitstream_name)
-                    print(enc_cmd, file=open(test_name + '.txt', 'a'))
-                    if DEBUG_MODE == 0:
-                        exit_code = subprocess.call(enc_cmd, shell = True)
-                    else:
-                        continue
-                    if COMPARE == 0:
-                        total_tests = total_tests + 1
-                        if exit_code == 0:
-                            print('------------Passed-------------', file=open(test_name + '.txt', 'a'))
-                            passed_tests = passed_tests + 1
-                        else:
-                            print('------------Failed-------------', file=open(test_name + '.txt', 'a'))
-                            continue
-                    else:
-                        if exit_code != 0:
-                            print('----------Enc Error------------', file=open(test_name + '.txt', 'a'))
-                            continue
-                        if compare_bitstream != "":
-                            exit_code = filecmp.cmp(enc_params['bitstream_dir'] + slash + compare_bitstream + '.265', enc_params['bitstream_dir'] + slash + bitstream_name + '.265')
-                            if exit_code == True:
-                                print('------------Passed-------------', file=open(test_name + '.txt', 'a'))
-                                passed_tests = passed_tests + 1
-                            else:
-                                print('------------Failed-------------', file=open(test_name + '.txt', 'a'))
-                                break
-                        else:
-                            total_tests = total_tests + 1
-                    # TODO: COPY BITSTREAM TO NEW LOCATION
-                    if bitstream_name != "":
-                        compare_bitstream = bitstream_name
+                    enc_params.pop('recon_file', None)
+                    encodes.append({'name'          : bitstream_name,
+                                    'cmd'           : enc_cmd,
+                                    'seq_name'      : seq_name,
+                                    'enc_params'    : enc_params.copy(),
+                                    'bitstream_dir' : enc_params['bitstream_dir'],
+                                    'signature'     : self.get_job_signature(test_name, seq_name, enc_params, VBR, OQ, test_cond),
+                                    'random_conds'  : ['qp', 'tbr', 'qp_file_name'] + self.random_conds.get(test_name, []),
+                                    'enc_mode'      : enc_mode,
+                                    'frames'        : int(enc_params['frame_to_be_encoded']),
+                                    'pixels'        : int(enc_params['width']*enc_params['height']),
+                                    'recon'         : recon,
+                                    })
+                if COMPARE == 0:
+                    for encode in encodes:
+                        jobs.append({'test_name': test_name, 'compare': 0, 'encodes': [encode]})
+                elif len(encodes) != 0:
+                    jobs.append({'test_name': test_name, 'compare': 1, 'encodes': encodes})
+        return jobs
+
+    # Wait for a process, returns its exit code, CPU time in seconds and max RSS in MB (None where os.wait4 is not available)
+    def wait_process(self, process):
+        if not hasattr(os, 'wait4'):
+            return process.wait(), None, None
+        pid, status, usage = os.wait4(process.pid, 0)
+        if os.WIFSIGNALED(status):
+            process.returncode = -os.WTERMSIG(status)
+        else:
+            process.returncode = os.WEXITSTATUS(status)
+        # ru_maxrss is in bytes on macOS, KB elsewhere
+        max_rss = usage.ru_maxrss / (1024.0 * 1024.0 if platform == 'Darwin' else 1024.0)
+        return process.returncode, usage.ru_utime + usage.ru_stime, max_rss
+
+    # Returns the exit code, CPU time and max RSS of the encode
+    def run_encode(self, encode):
+        if self.dashboard is not None:
+            self.dashboard.add_encode(encode['name'], encode['bitstream_dir'] + slash + encode['name'] + '.txt', encode['frames'])
+        exit_code, cpu_time, max_rss = self.wait_process(subprocess.Popen(encode['cmd'], shell = True))
+        if self.dashboard is not None:
+            self.dashboard.remove_encode(encode['name'], exit_code == 0)
+        return exit_code, cpu_time, max_rss
+
+    # Store the result of an encode in the results database, before its outputs are archived
+    def record_result(self, test_name, encode, exit_code, passed, run_time, cpu_time, max_rss, channels = 1):
+        if self.results_db is None:
+            return
+        bitstream_file = encode['bitstream_dir'] + slash + encode['name'] + '.265'
+        summary = list(self.get_enc_summary(encode['bitstream_dir'] + slash + encode['name'] + '.txt').values())
+        stats = summary[0] if len(summary) != 0 else {}
+        config = self.get_encode_config(encode)
+        digest = None
+        if passed and os.path.exists(bitstream_file):
+            with open(bitstream_file, 'rb') as in_file:
+                digest = hashlib.sha256(in_file.read()).hexdigest()
+        enc_params = encode['enc_params']
+        self.results_db.add_result({'time': time.time(), 'test_name': test_name, 'name': encode['name'], 'config_hash': self.get_config_hash(self.get_series_config(encode)),
+                                    'build': self.get_build_hash(), 'host': socket.gethostname(), 'enc_mode': encode['enc_mode'],
+                                    'width': int(enc_params['width']), 'height': int(enc_params['height']), 'frames': encode['frames'],
+                                    'channels': channels, 'jobs': self.num_jobs, 'exit_code': exit_code, 'passed': int(passed), 'run_time': run_time,
+                                    'fps': stats.get('fps'), 'avg_latency': stats.get('avg_latency'), 'max_latency': stats.get('max_latency'),
+                                    'cpu_time': cpu_time, 'max_rss': max_rss, 'byte_count': stats.get('byte_count'), 'digest': digest,
+                                    'params': json.dumps(config, sort_keys = True)})
+
+    # Run the encodes of a job and check the results
+    def run_job(self, job):
+        if 'batch' in job:
+            return self.run_batch_job(job)
+        self.write_journal({'event': 'start', 'job': self.get_job_key(job)})
+        test_name = job['test_name']
+        total_tests = 0
+        passed_tests = 0
+        compare_bitstream = ""
+        compare_encode = None
+        # The reference bitstream of a compare job must stay in the store until the job is done with it
+        pinned = [encode['name'] for encode in job['encodes']] if self.artifact_store is not None and job['compare'] != 0 else []
+        if len(pinned) != 0:
+            self.artifact_store.pin(pinned)
+        # Logged once the job is done, together with its finish record
+        job_lines = []
+        for encode in job['encodes']:
+            bitstream_name = encode['name']
+            bitstream_dir = encode['bitstream_dir']
+            log_lines = [encode['cmd']]
+            if DEBUG_MODE != 0:
+                job_lines.extend(log_lines)
+                continue
+            start_time = time.time()
+            exit_code, cpu_time, max_rss = self.run_encode(encode)
+            run_time = time.time() - start_time
+            passed = exit_code == 0
+            mismatch = False
+            if job['compare'] == 0:
+                total_tests = total_tests + 1
+                if passed:
+                    log_lines.append('------------Passed-------------')
+                    passed_tests = passed_tests + 1
+                else:
+                    log_lines.append('------------Failed-------------')
+            elif not passed:
+                log_lines.append('----------Enc Error------------')
+            elif compare_bitstream != "":
+                passed = self.compare_bitstreams(bitstream_dir, compare_bitstream, bitstream_name)
+                if passed:
+                    log_lines.append('------------Passed-------------')
+                    passed_tests = passed_tests + 1
+                else:
+                    log_lines.append('------------Failed-------------')
+                    mismatch = True
+                    if encode['recon'] is not None and RECON_CHECK_MODE == 1:
+                        log_lines.extend(self.check_recon(compare_encode['recon'], encode['recon']))
+                    # Keep both sides of the mismatch available for inspection
+                    if self.artifact_store is not None:
+                        self.artifact_store.mark_failed(compare_bitstream)
+            else:
+                total_tests = total_tests + 1
+            if passed and GOLDEN_MODE != 0:
+                log_lines.extend(self.check_golden(encode))
+            self.record_result(test_name, encode, exit_code, passed, run_time, cpu_time, max_rss)
+            self.update_history(encode, run_time, passed)
+            self.archive_outputs(bitstream_dir, bitstream_name, passed)
+            job_lines.extend(log_lines)
+            if mismatch:
+                break
+            if passed:
+                compare_bitstream = bitstream_name
+                compare_encode = encode
+        if len(pinned) != 0:
+            self.artifact_store.unpin(pinned)
+        # Recon files are only kept for the check
+        for encode in job['encodes']:
+            if encode.get('recon') is not None and os.path.exists(encode['recon']['file']):
+                os.remove(encode['recon']['file'])
+        self.write_test_log(test_name, job_lines)
+        self.write_journal({'event': 'finish', 'job': self.get_job_key(job), 'tests': total_tests, 'passed': passed_tests, 'log': job_lines})
+        return total_tests, passed_tests
+
+    # Jobs with the same key can run as the channels of one encoder instance, None if the job runs on its own
+    def get_batch_key(self, job):
+        if BATCH_MODE == 0 or job['compare'] != 0 or len(job['encodes']) != 1:
+            return None
+        encode = job['encodes'][0]
+        enc_params = encode['enc_params']
+        if encode['pixels'] > BATCH_MAX_PIXELS:
+            return None
+        # The app splits list values (ME/HME search regions) between channels by their region counts, keep them apart
+        if any(isinstance(enc_params[name], list) for name in enc_params):
+            return None
+        # Every channel has to set the same parameters
+        tokens = self.get_param_tokens()
+        return (enc_params['encoder_dir'], enc_params['bitstream_dir'], tuple(sorted(name for name in enc_params if name in tokens)))
+
+    # Group the single encode jobs that share a batch key into batches of up to BATCH_MAX_CHANNELS,
+    # a batch takes the place of its first job
+    def get_batched_jobs(self, jobs):
+        batched_jobs = []
+        open_batches = {}
+        for job in jobs:
+            key = self.get_batch_key(job)
+            if key is None:
+                batched_jobs.append(job)
+                continue
+            if key not in open_batches:
+                open_batches[key] = {'test_name': job['test_name'], 'compare': 0, 'batch': 1, 'jobs': [], 'encodes': []}
+                batched_jobs.append(open_batches[key])
+            batch = open_batches[key]
+            batch['jobs'].append(job)
+            batch['encodes'].extend(job['encodes'])
+            if len(batch['jobs']) == BATCH_MAX_CHANNELS:
+                del open_batches[key]
+        return [job['jobs'][0] if 'batch' in job and len(job['jobs']) == 1 else job for job in batched_jobs]
+
+    # Write the output of each channel of a batch to the .txt of its encode, numbered as channel 1 like a single run
+    # Returns whether each channel finished
+    def split_batch_output(self, batch_output, encodes):
+        text = ''
+        if os.path.exists(batch_output):
+            with open(batch_output, 'rb') as in_file:
+                text = in_file.read().decode('latin-1')
+        # The progress counter counts the frames of all channels
+        text = re.sub('\b{9}[ 0-9]{9}', '', text)
+        channel_lines = [[] for encode in encodes]
+        finished = [False for encode in encodes]
+        owner = None
+        remaining = 0
+        for line in text.splitlines():
+            match = re.search('([Cc]hannel|[Ii]nstance) ([0-9]+)', line)
+            if match is not None and 0 < int(match.group(2)) <= len(encodes):
+                owner = int(match.group(2)) - 1
+                # SUMMARY is followed by a header and the values, "Channel N" by the speed and latencies
+                if line.startswith('SUMMARY'):
+                    remaining = 2
+                elif line.strip() == match.group(0):
+                    remaining = 3
+                else:
+                    remaining = 0
+                channel_lines[owner].append(line[:match.start(2)] + '1' + line[match.end(2):])
+            elif remaining > 0:
+                remaining = remaining - 1
+                channel_lines[owner].append(line)
+                if line.startswith('Average Speed:'):
+                    finished[owner] = True
+            else:
+                for lines in channel_lines:
+                    lines.append(line)
+        for encode, lines in zip(encodes, channel_lines):
+            with open(encode['bitstream_dir'] + slash + encode['name'] + '.txt', 'w') as out_file:
+                out_file.write('\n'.join(lines) + '\n')
+        return finished
+
+    # Run the jobs of a batch as the channels of one -nch encode, the encodes that do not finish in the batch run again on their own
+    def run_batch_job(self, batch):
+        encodes = batch['encodes']
+        bitstream_dir = encodes[0]['bitstream_dir']
+        batch_name = encodes[0]['name'] + '_Batch' + str(len(encodes))
+        channels = []
+        for encode in encodes:
+            enc_params = encode['enc_params']
+            if encode.get('recon') is not None:
+                enc_params = dict(enc_params, recon_file = encode['recon']['file'])
+            channels.append((enc_params, encode['seq_name'], encode['name']))
+        enc_cmd = self.get_channels_cmd(channels, batch_name)
+        if DEBUG_MODE != 0:
+            for job in batch['jobs']:
+                self.write_test_log(job['test_name'], [enc_cmd])
+            return 0, 0
+        batch_output = bitstream_dir + slash + batch_name + '.txt'
+        if self.dashboard is not None:
+            self.dashboard.add_encode(batch_name, batch_output, sum(encode['frames'] for encode in encodes))
+        for job in batch['jobs']:
+            self.write_journal({'event': 'start', 'job': self.get_job_key(job)})
+        start_time = time.time()
+        exit_code, cpu_time, max_rss = self.wait_process(subprocess.Popen(enc_cmd, shell = True))
+        run_time = time.time() - start_time
+        if self.dashboard is not None:
+            self.dashboard.remove_encode(batch_name, exit_code == 0)
+        finished = self.split_batch_output(batch_output, encodes)
+        os.remove(batch_output)
+
+        total_tests = 0
+        passed_tests = 0
+        # Channels share the run time by their number of pixels to encode
+        total_pixels = float(sum(encode['frames'] * encode['pixels'] for encode in encodes))
+        for index in range(len(encodes)):
+            job = batch['jobs'][index]
+            encode = encodes[index]
+            if exit_code != 0 or not finished[index]:
+                num_tests, num_passed = self.run_job(job)
+            else:
+                log_lines = [encode['cmd'], 'Channel ' + str(index + 1) + ' of ' + str(len(encodes)) + ' in ' + batch_name, '------------Passed-------------']
+                if GOLDEN_MODE != 0:
+                    log_lines.extend(self.check_golden(encode))
+                # The max RSS is the one of the whole instance
+                share = encode['frames'] * encode['pixels'] / total_pixels
+                self.record_result(job['test_name'], encode, exit_code, True, run_time * share, cpu_time * share if cpu_time is not None else None, max_rss, len(encodes))
+                self.update_history(encode, run_time * share, True)
+                self.archive_outputs(bitstream_dir, encode['name'], True)
+                self.write_test_log(job['test_name'], log_lines)
+                self.write_journal({'event': 'finish', 'job': self.get_job_key(job), 'tests': 1, 'passed': 1, 'log': log_lines})
+                num_tests = 1
+                num_passed = 1
+            total_tests = total_tests + num_tests
+            passed_tests = passed_tests + num_passed
+        for encode in encodes:
+            if encode.get('recon') is not None and os.path.exists(encode['recon']['file']):
+                os.remove(encode['recon']['file'])
+        return total_tests, passed_tests
+
+    # Locate the first frame, plane and LCU where two recon files differ (8 bit or 16 bit little endian 4:2:0 samples)
+    # and return the log lines, with a per LCU map of the differing samples of that frame
+    def check_recon(self, reference_recon, recon):
+        for recon_file in [reference_recon['file'], recon['file']]:
+            if not os.path.exists(recon_file) or os.path.getsize(recon_file) == 0:
+                return ['Recon Check: cannot find ' + recon_file]
+        width = reference_recon['width']
+        height = reference_recon['height']
+        if (recon['width'], recon['height']) != (width, height):
+            # e.g. defield_test, field recons do not map onto the LCUs of a frame recon
+            return ['Recon Check: skipped, recon dimensions differ (' + str(width) + 'x' + str(height) + ' and ' + str(recon['width']) + 'x' + str(recon['height']) + ')']
+        dtype = numpy.uint8 if reference_recon['bit_depth'] == 8 else numpy.dtype('<u2')
+        luma_size = width * height
+        frame_size = luma_size * 3 // 2
+        reference_samples = numpy.memmap(reference_recon['file'], dtype = dtype, mode = 'r')
+        samples = numpy.memmap(recon['file'], dtype = dtype, mode = 'r')
+        num_frames = min(reference_samples.size, samples.size) // frame_size
+        lcu_cols = (width + 63) // 64
+        lcu_rows = (height + 63) // 64
+        planes = [('Y', 0, width, height, 64), ('U', luma_size, width // 2, height // 2, 32), ('V', luma_size * 5 // 4, width // 2, height // 2, 32)]
+        for frame in range(num_frames):
+            start = frame * frame_size
+            if numpy.array_equal(reference_samples[start:start + frame_size], samples[start:start + frame_size]):
+                continue
+            lcu_map = numpy.zeros((lcu_rows, lcu_cols), dtype = numpy.int64)
+            plane_maps = []
+            for plane, offset, plane_width, plane_height, lcu_size in planes:
+                plane_start = start + offset
+                plane_end = plane_start + plane_width * plane_height
+                diff = numpy.zeros((lcu_rows * lcu_size, lcu_cols * lcu_size), dtype = bool)
+                diff[:plane_height, :plane_width] = (reference_samples[plane_start:plane_end] != samples[plane_start:plane_end]).reshape(plane_height, plane_width)
+                plane_maps.append((plane, diff.reshape(lcu_rows, lcu_size, lcu_cols, lcu_size).sum(axis = (1, 3))))
+                lcu_map += plane_maps[-1][1]
+            # Raster order, same as the LCU processing order of the encoder
+            lcu_index = int(numpy.flatnonzero(lcu_map)[0])
+            lcu_x = lcu_index % lcu_cols
+            lcu_y = lcu_index // lcu_cols
+            first_plane = [plane for plane, plane_map in plane_maps if plane_map[lcu_y, lcu_x] != 0][0]
+            log_lines = ['Recon Check: first divergent frame ' + str(frame) + ', plane ' + first_plane + ', LCU (' + str(lcu_x) + ', ' + str(lcu_y) + ') at x=' + str(lcu_x * 64) + ' y=' + str(lcu_y * 64),
+                         'Differing LCUs in frame ' + str(frame) + ': ' + str(int(numpy.count_nonzero(lcu_map))) + '/' + str(lcu_map.size),
+                         'Per LCU difference map (. identical, 0-9 tenths of the LCU samples that differ):']
+            for lcu_row in lcu_map:
+                log_lines.append('    ' + ''.join(['.' if count == 0 else str(min(9, int(count) * 10 // (64 * 64 * 3 // 2))) for count in lcu_row]))
+            return log_lines
+        if reference_samples.size != samples.size:
+            return ['Recon Check: identical for ' + str(num_frames) + ' frames, recon lengths differ (' + str(reference_samples.size // frame_size) + ' and ' + str(samples.size // frame_size) + ' frames)']
+        return ['Recon Check: recon files are identical, the bitstreams differ outside of the coded samples']
+
+    # Test to Compare exactness between bitstreams
+    def run_test(self, test_name, test_params, enc_params, OQ, VBR, COMPARE):
+        total_tests = 0
+        passed_tests = 0
+        jobs = self.get_test_jobs(test_name, test_params, enc_params, OQ, VBR, COMPARE)
+        if self.journal is not None:
+            jobs = [job for job in jobs if self.get_job_key(job) not in self.journal.finished_jobs]
+        # Only collect the jobs when the plan of the whole run is built first
+        if self.job_plan is not None:
+            self.job_plan.append((test_name, jobs))
+            return total_tests, passed_tests
+        for job in self.get_batched_jobs(jobs):
+            num_tests, num_passed = self.run_job(job)
+            total_tests = total_tests + num_tests
+            passed_tests = passed_tests + num_passed
         return total_tests, passed_tests
     
     def run_functional_tests(self, seq_list, test_name, combination_test_params):
@@ -576,11 +2230,8 @@ class EB_Test(object):
         # Print Test Information:
         total_test = 0
         total_passed = 0
-        if os.path.exists(test_name + '.txt'):
+        if not self.start_test_log(test_name):
             return 0, 0
-        print ("Running Test: " + test_name)
-        print ("---------------------------------------", file=open(test_name + '.txt', 'w'))
-        print ("Test Name: " + test_name, file=open(test_name + '.txt', 'a'))
         for seq in seq_list:
             # Run test
             test_params = self.get_test_params(seq, combination_test_params)
@@ -591,7 +2242,8 @@ class EB_Test(object):
                     num_tests, num_passed = self.run_test(test_name, test_params, enc_params, OQ, VBR, 0)
                     total_test = total_test + num_tests
                     total_passed = total_passed + num_passed
-        print ("---------------------------------------", file=open(test_name + '.txt', 'a'))
+        if self.job_plan is None:
+            self.end_test_log(test_name)
         return total_test, total_passed
     
 ## -------------- COMPARE TESTS -------------- ##
@@ -601,11 +2253,8 @@ class EB_Test(object):
         test_name = 'buffered_test'
         # Get default encoding params
         enc_params = self.get_default_params().copy()
-        if os.path.exists(test_name + '.txt'):
+        if not self.start_test_log(test_name):
             return 0, 0
-        print ("Running Test: " + test_name)
-        print ("---------------------------------------", file=open(test_name + '.txt', 'w'))
-        print ("Test Name: " + test_name, file=open(test_name + '.txt', 'a'))
         total_test = 0
         total_passed = 0
         for seq in seq_list:
@@ -619,7 +2268,8 @@ class EB_Test(object):
                     num_tests, num_passed = self.run_test(test_name, test_params, enc_params, OQ, VBR, not VBR)
                     total_test = total_test + num_tests
                     total_passed = total_passed + num_passed
-        print ("---------------------------------------", file=open(test_name + '.txt', 'a'))
+        if self.job_plan is None:
+            self.end_test_log(test_name)
         return total_test, total_passed
         
     def run_to_run_test(self, seq_list):
@@ -627,11 +2277,8 @@ class EB_Test(object):
         test_name = 'run_to_run_test'
         # Get default encoding params
         enc_params = self.get_default_params().copy()
-        if os.path.exists(test_name + '.txt'):
+        if not self.start_test_log(test_name):
             return 0, 0
-        print ("Running Test: " + test_name)
-        print ("---------------------------------------", file=open(test_name + '.txt', 'w'))
-        print ("Test Name: " + test_name, file=open(test_name + '.txt', 'a'))
         total_test = 0
         total_passed = 0
         for seq in seq_list:
@@ -644,7 +2291,8 @@ class EB_Test(object):
                 num_tests, num_passed = self.run_test(test_name, test_params, enc_params, OQ, 0, 1)
                 total_test = total_test + num_tests
                 total_passed = total_passed + num_passed
-        print ("---------------------------------------", file=open(test_name + '.txt', 'a'))
+        if self.job_plan is None:
+            self.end_test_log(test_name)
         return total_test, total_passed
         
     def unpacked_test(self, seq_list):
@@ -652,11 +2300,8 @@ class EB_Test(object):
         test_name = 'unpacked_test'
         # Get default encoding params
         enc_params = self.get_default_params().copy()
-        if os.path.exists(test_name + '.txt'):
+        if not self.start_test_log(test_name):
             return 0, 0
-        print ("Running Test: " + test_name)
-        print ("---------------------------------------", file=open(test_name + '.txt', 'w'))
-        print ("Test Name: " + test_name, file=open(test_name + '.txt', 'a'))
         total_test = 0
         total_passed = 0
         for seq in seq_list:
@@ -671,7 +2316,8 @@ class EB_Test(object):
                     num_tests, num_passed = self.run_test(test_name, test_params, enc_params, OQ, VBR, not VBR)
                     total_test = total_test + num_tests
                     total_passed = total_passed + num_passed
-        print ("---------------------------------------", file=open(test_name + '.txt', 'a'))
+        if self.job_plan is None:
+            self.end_test_log(test_name)
         return total_test, total_passed
         
     def defield_test(self, seq_list):
@@ -679,11 +2325,8 @@ class EB_Test(object):
         test_name = 'defield_test'
         # Get default encoding params
         enc_params = self.get_default_params().copy()
-        if os.path.exists(test_name + '.txt'):
+        if not self.start_test_log(test_name):
             return 0, 0
-        print ("Running Test: " + test_name)
-        print ("---------------------------------------", file=open(test_name + '.txt', 'w'))
-        print ("Test Name: " + test_name, file=open(test_name + '.txt', 'a'))
         total_test = 0
         total_passed = 0
         for seq in seq_list:
@@ -706,7 +2349,8 @@ class EB_Test(object):
                     num_tests, num_passed = self.run_test(test_name, test_params_2, enc_params, OQ, VBR, not VBR)
                     total_test = total_test + num_tests
                     total_passed = total_passed + num_passed
-        print ("---------------------------------------", file=open(test_name + '.txt', 'a'))
+        if self.job_plan is None:
+            self.end_test_log(test_name)
         return total_test, total_passed
 ## ------------------------------------------- ##
 
@@ -821,7 +2465,7 @@ class EB_Test(object):
             time_str = time_str + str(hours) + " hour(s), "
         if minutes != 0:
             time_str = time_str + str(minutes) + " minute(s), "
-        if minutes != 0:
+        if seconds != 0 or time_str == "":
             time_str = time_str + str(seconds) + " second(s)"
         
         return time_str
@@ -850,69 +2494,192 @@ class EB_Test(object):
             print ("10 bits sequences need to have the 2bitspacked counterpart")
         return exit_code
     
+    def get_validation_tests(self):
+        return [self.defield_test,
+                self.intra_period_test,
+                self.width_height_test,
+                self.buffered_test,
+                self.run_to_run_test,
+                self.qp_file_test,
+                self.enc_struct_test,
+                self.unpacked_test,
+                self.dlf_test,
+                self.sao_test,
+                self.constrained_intra_test,
+                self.scene_change_test,
+                self.me_hme_test]
+
+    def run_job_thread(self, job, results):
+        results.append(self.run_job(job))
+
+    # Collect the jobs of all validation tests and run them by priority until the time budget runs out
+    # Jobs of every validation test in test order, grouped as each test builds them: (test name, jobs)
+    def get_job_plan(self, seq_list):
+        self.job_plan = []
+        for validation_test in self.get_validation_tests():
+            self.seed_test(validation_test)
+            validation_test(seq_list)
+        job_groups = self.job_plan
+        self.job_plan = None
+        if self.dashboard is not None:
+            plan_frames = 0
+            for test_name, jobs in job_groups:
+                for job in jobs:
+                    for encode in job['encodes']:
+                        plan_frames = plan_frames + encode['frames']
+            self.dashboard.set_plan(plan_frames)
+        return job_groups
+
+    # Run the jobs of every validation test one after another, in the order and batches of the tests
+    def run_sequential_test(self, seq_list):
+        job_groups = self.get_job_plan(seq_list)
+        total_tests = 0
+        total_passed = 0
+        for test_name in self.started_tests:
+            for group_test_name, jobs in job_groups:
+                if group_test_name != test_name:
+                    continue
+                for job in self.get_batched_jobs(jobs):
+                    num_tests, num_passed = self.run_job(job)
+                    total_tests = total_tests + num_tests
+                    total_passed = total_passed + num_passed
+            self.end_test_log(test_name)
+        return total_tests, total_passed
+
+    def run_planned_test(self, seq_list, time_budget):
+        jobs = [job for test_name, group in self.get_job_plan(seq_list) for job in group]
+
+        ranked_jobs = []
+        deadline = time.time() + time_budget
+        num_jobs = BUDGET_NUM_JOBS
+        pixel_rates = self.get_pixel_rates()
+        build_hash = self.get_build_hash()
+        for job in jobs:
+            cost = self.get_job_cost(job, pixel_rates)
+            value = self.get_job_value(job, build_hash)
+            ranked_jobs.append((value/max(cost, 1.0), cost, job))
+        ranked_jobs.sort(key=lambda ranked_job: ranked_job[0], reverse=True)
+        self.num_jobs = num_jobs
+        if BATCH_MODE == 1:
+            # A batch keeps the rank of its first job and costs the sum of its jobs
+            ranks = dict((id(ranked_job[2]), ranked_job) for ranked_job in ranked_jobs)
+            batched_jobs = self.get_batched_jobs([ranked_job[2] for ranked_job in ranked_jobs])
+            ranked_jobs = []
+            for job in batched_jobs:
+                members = job['jobs'] if 'batch' in job else [job]
+                ranked_jobs.append((ranks[id(members[0])][0], sum(ranks[id(member)][1] for member in members), job))
+
+        results = []
+        skipped_jobs = []
+        running = []
+        while len(ranked_jobs) != 0 or len(running) != 0:
+            # Start the highest ranked jobs predicted to finish before the deadline, the others will never fit
+            while len(running) < num_jobs and len(ranked_jobs) != 0:
+                ranked_job = ranked_jobs.pop(0)
+                if ranked_job[1] > deadline - time.time():
+                    skipped_jobs.append((ranked_job[2], ranked_job[1]))
+                    continue
+                thread = threading.Thread(target=self.run_job_thread, args=(ranked_job[2], results))
+                thread.start()
+                running.append(thread)
+            time.sleep(0.2)
+            running = [thread for thread in running if thread.is_alive()]
+
+        total_tests = 0
+        total_passed = 0
+        for num_tests, num_passed in results:
+            total_tests = total_tests + num_tests
+            total_passed = total_passed + num_passed
+        for test_name in self.started_tests:
+            self.end_test_log(test_name)
+        return total_tests, total_passed, skipped_jobs
+
     def run_validation_test(self, seq_list):
         if self.error_check(seq_list) != 0:
             return
+        if RECON_CHECK_MODE == 1 and numpy is None:
+            print ("Recon Check requires numpy, compare tests will run without it")
         file_name = "Test_Results"
-        print ("---------------------------------------------------------", file=open(file_name + '.txt', 'w'))
-        print ("Test Begin... ", file=open(file_name + '.txt', 'a'))
+        with open(file_name + '.txt', 'w') as results_file:
+            print ("---------------------------------------------------------", file=results_file)
+            print ("Test Begin... ", file=results_file)
         start_time = time.time()
         total_tests = 0
         total_passed = 0
-        num_tests, num_passed = self.defield_test(seq_list)
-        total_tests = total_tests + num_tests
-        total_passed = total_passed + num_passed
-        num_tests, num_passed = self.intra_period_test(seq_list)
-        total_tests = total_tests + num_tests
-        total_passed = total_passed + num_passed
-        num_tests, num_passed = self.width_height_test(seq_list)
-        total_tests = total_tests + num_tests
-        total_passed = total_passed + num_passed
-        num_tests, num_passed = self.buffered_test(seq_list)
-        total_tests = total_tests + num_tests
-        total_passed = total_passed + num_passed
-        num_tests, num_passed = self.run_to_run_test(seq_list)
-        total_tests = total_tests + num_tests
-        total_passed = total_passed + num_passed
-        num_tests, num_passed = self.qp_file_test(seq_list)
-        total_tests = total_tests + num_tests
-        total_passed = total_passed + num_passed
-        num_tests, num_passed = self.enc_struct_test(seq_list)
-        total_tests = total_tests + num_tests
-        total_passed = total_passed + num_passed
-        num_tests, num_passed = self.unpacked_test(seq_list)
-        total_tests = total_tests + num_tests
-        total_passed = total_passed + num_passed
-        num_tests, num_passed = self.dlf_test(seq_list)
-        total_tests = total_tests + num_tests
-        total_passed = total_passed + num_passed
-        num_tests, num_passed = self.sao_test(seq_list)
-        total_tests = total_tests + num_tests
-        total_passed = total_passed + num_passed
-        num_tests, num_passed = self.constrained_intra_test(seq_list)
-        total_tests = total_tests + num_tests
-        total_passed = total_passed + num_passed
-        num_tests, num_passed = self.scene_change_test(seq_list)
-        total_tests = total_tests + num_tests
-        total_passed = total_passed + num_passed
-        num_tests, num_passed = self.me_hme_test(seq_list)
-        total_tests = total_tests + num_tests
-        total_passed = total_passed + num_passed
+        skipped_jobs = []
+        if JOURNAL_MODE != 0 and DEBUG_MODE == 0:
+            self.journal = EB_Journal(JOURNAL_FILE, JOURNAL_SYNC_INTERVAL, JOURNAL_MODE == 2)
+        self.run_seed = self.get_run_seed()
+        if self.journal is not None:
+            self.journal.write({'event': 'resume' if self.journal.resumed else 'run', 'seed': self.run_seed})
+        if GOLDEN_MODE != 0:
+            if numpy is None:
+                print ("numpy not found, digests will be recorded and compared without PSNR")
+            self.load_golden_db()
+        if RESULTS_DB_MODE == 1:
+            if sqlite3 is None:
+                print ("sqlite3 not found, results will not be stored")
+            elif DEBUG_MODE == 0:
+                self.results_db = EB_ResultsDB(RESULTS_DB_FILE, RESULTS_DB_BATCH)
+                self.results_db.start_run(self.get_build_hash(), socket.gethostname(), self.get_cpu_info()[0], multiprocessing.cpu_count(), self.get_host_memory(), TEST_CONFIGURATION)
+        if DASHBOARD_MODE == 1:
+            self.dashboard = EB_Dashboard(DASHBOARD_REFRESH_INTERVAL)
+            self.dashboard.start()
+        if VALIDATION_TIME_BUDGET > 0:
+            # A plan is needed up front to schedule the jobs within the budget
+            total_tests, total_passed, skipped_jobs = self.run_planned_test(seq_list, VALIDATION_TIME_BUDGET)
+        else:
+            # Built up front as well so the dashboard knows the frames of the whole run
+            total_tests, total_passed = self.run_sequential_test(seq_list)
+        if self.dashboard is not None:
+            self.dashboard.stop()
+            self.dashboard = None
+        self.save_history()
+        if self.artifact_store is not None:
+            self.artifact_store.close()
+        if self.results_db is not None:
+            self.results_db.close()
+            self.results_db = None
+            self.run_trend_report()
+        if GOLDEN_MODE != 0:
+            if GOLDEN_MODE == 1:
+                self.save_golden_db()
+            self.write_golden_summary('Golden_Results')
         finish_time = time.time()
-        if total_tests == 0 and total_passed == 0:
-            print ("No tests were ran.. Exiting...", file=open(file_name + '.txt', 'a'))
-            print ("---------------------------------------------------------", file=open(file_name + '.txt', 'a'))
-            return
-        print ("Total Number of Tests: " + str(total_tests), file=open(file_name + '.txt', 'a'))
-        print ("Total Passed: " + str(total_passed), file=open(file_name + '.txt', 'a'))
-        print ("Percentage Passed: " + str(float(total_passed)/float(total_tests)*100) + "%", file=open(file_name + '.txt', 'a'))
-        print ("Time Elapsed: " + self.get_time(finish_time - start_time), file=open(file_name + '.txt', 'a'))
-        print ("---------------------------------------------------------", file=open(file_name + '.txt', 'a'))
+        resumed_jobs = []
+        if self.journal is not None:
+            # Jobs that finished before the restart count towards the totals
+            resumed_jobs = list(self.journal.finished_jobs.values())
+            for num_tests, num_passed in resumed_jobs:
+                total_tests = total_tests + num_tests
+                total_passed = total_passed + num_passed
+            self.journal.close()
+            self.journal = None
+        self.close_test_logs()
+        with open(file_name + '.txt', 'a') as results_file:
+            if total_tests == 0 and total_passed == 0:
+                print ("No tests were ran.. Exiting...", file=results_file)
+            else:
+                print ("Total Number of Tests: " + str(total_tests), file=results_file)
+                print ("Total Passed: " + str(total_passed), file=results_file)
+                print ("Percentage Passed: " + str(float(total_passed)/float(total_tests)*100) + "%", file=results_file)
+                print ("Time Elapsed: " + self.get_time(finish_time - start_time), file=results_file)
+            if len(resumed_jobs) != 0:
+                print ("Resumed: " + str(len(resumed_jobs)) + " jobs finished before the restart", file=results_file)
+            if VALIDATION_TIME_BUDGET > 0:
+                # Coverage gaps left by the time budget
+                print ("Time Budget: " + self.get_time(VALIDATION_TIME_BUDGET), file=results_file)
+                print ("Skipped Jobs: " + str(len(skipped_jobs)), file=results_file)
+                for job, cost in skipped_jobs:
+                    for encode in job['encodes']:
+                        print ("    " + encode['name'] + " (predicted " + str(round(cost, 1)) + "s)", file=results_file)
+            print ("---------------------------------------------------------", file=results_file)
         
     def show_speed_test_instructions(self):
-        print ("To run speed test:", file=open('Running_Speed_Test.txt', 'w'))
-        print ("1. Run shell script (Run in \"sudo\" mode in Linux)", file=open('Running_Speed_Test.txt', 'a'))
-        print ("Note: Running it from a shell script minimizes use of CPU cycles from Python", file=open('Running_Speed_Test.txt', 'a'))
+        with open('Running_Speed_Test.txt', 'w') as instructions_file:
+            print ("To run speed test:", file=instructions_file)
+            print ("1. Run shell script (Run in \"sudo\" mode in Linux)", file=instructions_file)
+            print ("Note: Running it from a shell script minimizes use of CPU cycles from Python", file=instructions_file)
     
     # Set number of frames for speed test
     def get_num_channels(self, enc_mode, enc_params):
@@ -952,11 +2719,23 @@ class EB_Test(object):
         print("To run speed test, read \"Running_Speed_Test.txt\"")
         print("---------------------------------------------------------\n")
         self.show_speed_test_instructions()
-        enc_params = self.get_default_params().copy()
         if platform == WINDOWS_PLATFORM_STR:
-            print("", file=open('speed_script.bat', 'w'))
+            script_name = 'speed_script.bat'
         else:
-            print("", file=open('speed_script.bat', 'w'))
+            script_name = 'speed_script.sh'
+        speed_encodes = self.get_speed_encodes(seq_dict)
+        with open(script_name, 'w') as script_file:
+            print("", file=script_file)
+            for encode in speed_encodes:
+                print (encode['cmd'])
+                print(encode['cmd'], file=script_file)
+        if DASHBOARD_MODE == 1:
+            self.monitor_speed_test(speed_encodes)
+
+    # Encodes of the Speed Test sequences and enc modes, with the channels each runs
+    def get_speed_encodes(self, seq_dict):
+        enc_params = self.get_default_params().copy()
+        speed_encodes = []
         for OQ in SQ_OQ_COMBINATION:
             for seq in seq_dict:
                 enc_params.update(self.get_stream_info(seq['name']))
@@ -982,21 +2761,1398 @@ class EB_Test(object):
                         quality_mode = '_OQ'
                     if VBR == 0:
                         enc_params.update({'enc_mode': enc_mode, 'qp': iter_list, 'rc': 0, 'tune': OQ})
-                        cmd = self.get_enc_cmd(enc_params, seq['name'], 'Speed_Test_M' + str(enc_mode) + '_' + seq['name'] + quality_mode + '_Q' + str(iter_list), num_channels)
+                        bitstream_name = 'Speed_Test_M' + str(enc_mode) + '_' + seq['name'] + quality_mode + '_Q' + str(iter_list)
                     else:
                         enc_params.update({'enc_mode': enc_mode, 'tbr': iter_list, 'rc': 1, 'tune': OQ})
-                        cmd = self.get_enc_cmd(enc_params, seq['name'], 'Speed_Test_M' + str(enc_mode) + '_' + seq['name'] + quality_mode + '_TBR' + str(iter_list), num_channels)
-                    print (cmd)
-                    if platform == WINDOWS_PLATFORM_STR:
-                        print(cmd, file=open('speed_script.bat', 'a'))
+                        bitstream_name = 'Speed_Test_M' + str(enc_mode) + '_' + seq['name'] + quality_mode + '_TBR' + str(iter_list)
+                    speed_encodes.append({'name'          : bitstream_name,
+                                          'cmd'           : self.get_enc_cmd(enc_params, seq['name'], bitstream_name, num_channels),
+                                          'seq_name'      : seq['name'],
+                                          'enc_params'    : enc_params.copy(),
+                                          'bitstream_dir' : enc_params['bitstream_dir'],
+                                          'enc_mode'      : enc_mode,
+                                          'frames'        : int(enc_params['frame_to_be_encoded']),
+                                          'channels'      : num_channels,
+                                          })
+        return speed_encodes
+
+    # Show the progress of the speed script encodes, the script itself runs outside of the harness
+    def monitor_speed_test(self, speed_encodes):
+        print("Monitoring speed test outputs, start the speed script in another terminal (Ctrl+C to stop)")
+        dashboard = EB_Dashboard(DASHBOARD_REFRESH_INTERVAL)
+        plan_frames = 0
+        for encode in speed_encodes:
+            # Progress counter of the encoder counts the frames of all channels
+            num_frames = encode['frames']*encode['channels']
+            dashboard.add_encode(encode['name'], encode['bitstream_dir'] + slash + encode['name'] + '.txt', num_frames, True)
+            plan_frames = plan_frames + num_frames
+        dashboard.set_plan(plan_frames)
+        dashboard.start()
+        try:
+            while not dashboard.is_finished():
+                time.sleep(DASHBOARD_REFRESH_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+        dashboard.stop()
+
+    # Rate control of a sequence entry of a benchmark test, returns the rate part of the test name or None if the entry has neither or both of "qp" and "tbr"
+    def set_rate_params(self, seq, enc_params):
+        if ('qp' in seq) == ('tbr' in seq):
+            print("Please have either \"qp\" or \"tbr\" for each sequence")
+            return None
+        if 'qp' in seq:
+            enc_params.pop('tbr', None)
+            enc_params.update({'qp': seq['qp'], 'rc': 0})
+            return '_Q' + str(seq['qp'])
+        enc_params.update({'tbr': seq['tbr'], 'rc': 1})
+        return '_TBR' + str(seq['tbr'])
+
+    # Start the results file of a benchmark test with its settings and the header of its table
+    def start_results_table(self, results_file, settings, header):
+        print ("---------------------------------------------------------", file=results_file)
+        for line in settings:
+            print (line, file=results_file)
+        print ("---------------------------------------------------------", file=results_file)
+        print (header, file=results_file)
+
+## ----------- ASM BENCHMARK TEST ------------ ##
+    # Parse the per channel summary the encoder prints at the end of an encode
+    def get_enc_summary(self, output_file):
+        summary = {}
+        if not os.path.exists(output_file):
+            return summary
+        with open(output_file, 'rb') as in_file:
+            lines = in_file.read().decode('latin-1').replace('\b', ' ').splitlines()
+        channel = 0
+        for index in range(len(lines)):
+            tokens = lines[index].split()
+            if len(tokens) == 0:
+                continue
+            if tokens[0] == 'SUMMARY' and 'Channel' in tokens:
+                channel = int(tokens[tokens.index('Channel') + 1])
+                summary.setdefault(channel, {})
+                # Header line, then: frames, frame rate, byte count and bitrate
+                if index + 2 < len(lines):
+                    values = lines[index + 2].split()
+                    if len(values) >= 5:
+                        summary[channel].update({'frames': int(values[0]), 'byte_count': float(values[3]), 'bitrate': float(values[4])})
+            elif tokens[0] == 'Channel' and len(tokens) == 2 and tokens[1].isdigit():
+                channel = int(tokens[1])
+                summary.setdefault(channel, {})
+            elif lines[index].startswith('Average Speed:') and channel in summary:
+                summary[channel]['fps'] = float(tokens[2])
+            elif lines[index].startswith('Average Latency:') and channel in summary:
+                summary[channel]['avg_latency'] = float(tokens[2])
+            elif lines[index].startswith('Max Latency:') and channel in summary:
+                summary[channel]['max_latency'] = float(tokens[2])
+        return summary
+
+    def get_cpu_info(self):
+        cpu_flags = []
+        cpu_name = platform
+        if os.path.exists('/proc/cpuinfo'):
+            with open('/proc/cpuinfo', 'r') as cpuinfo_file:
+                for line in cpuinfo_file:
+                    if line.startswith('flags') and len(cpu_flags) == 0:
+                        cpu_flags = line.split(':', 1)[1].split()
+                    elif line.startswith('model name') and cpu_name == platform:
+                        cpu_name = line.split(':', 1)[1].strip()
+        return cpu_name, cpu_flags
+
+    # Total memory in MB, None where /proc/meminfo is not available
+    def get_host_memory(self):
+        if not os.path.exists('/proc/meminfo'):
+            return None
+        with open('/proc/meminfo', 'r') as meminfo_file:
+            for line in meminfo_file:
+                if line.startswith('MemTotal:'):
+                    return float(line.split()[1]) / 1024
+        return None
+
+    # Kernel set the encoder dispatches to for an -asm level, same checks as GetCpuAsmType(), "" if the host cannot run it
+    def get_asm_kernels(self, asm_level, cpu_flags):
+        if asm_level == 0:
+            return 'C_DEFAULT'
+        if len(cpu_flags) == 0:
+            # No /proc/cpuinfo, let the encoder decide
+            return 'ASM'
+        if not all(flag in cpu_flags for flag in ['sse2', 'ssse3', 'sse4_1']):
+            return ''
+        if all(flag in cpu_flags for flag in ['avx512f', 'avx512dq', 'avx512cd', 'avx512bw', 'avx512vl']):
+            return 'ASM_AVX512'
+        if all(flag in cpu_flags for flag in ['avx2', 'fma', 'movbe', 'bmi1', 'bmi2', 'abm']):
+            return 'ASM_AVX2'
+        return 'ASM_SSE4_1'
+
+    # Encode each sequence and enc mode with every supported -asm level, report the speedup over C and check bit-exactness
+    def run_asm_test(self, seq_dict):
+        seq_list = []
+        for x in seq_dict:
+            seq_list.append(x['name'])
+        if self.error_check(seq_list) != 0:
+            return
+        file_name = 'ASM_Test_Results'
+        cpu_name, cpu_flags = self.get_cpu_info()
+        asm_levels = []
+        for asm_level in ASM_LEVELS:
+            kernels = self.get_asm_kernels(asm_level, cpu_flags)
+            if kernels == '':
+                print ("Skipping -asm " + str(asm_level) + ", not supported by this CPU")
+                continue
+            asm_levels.append((asm_level, kernels))
+        with open(file_name + '.txt', 'w', 1) as results_file:
+            self.start_results_table(results_file, ["Host CPU: " + cpu_name] + ["-asm " + str(asm_level) + ": " + kernels for asm_level, kernels in asm_levels],
+                                     "%-64s%6s%12s%12s%10s%10s" % ('Encode', '-asm', 'Kernels', 'fps', 'Speedup', 'Exact'))
+
+            enc_params = self.get_default_params().copy()
+            total_tests = 0
+            total_exact = 0
+            for OQ in SQ_OQ_COMBINATION:
+                for seq in seq_dict:
+                    rate_name = self.set_rate_params(seq, enc_params)
+                    if rate_name is None:
+                        continue
+                    enc_params.update(self.get_stream_info(seq['name']))
+                    if OQ == 1 and 'tbr' in seq:
+                        continue
+                    for enc_mode in SPEED_ENC_MODES:
+                        enc_params.update({'enc_mode': enc_mode, 'tune': OQ})
+                        test_name = 'ASM_Test_M' + str(enc_mode) + '_' + seq['name'] + ('_SQ' if OQ == 0 else '_OQ') + rate_name
+                        reference_fps = 0
+                        reference_name = ""
+                        for asm_level, kernels in asm_levels:
+                            enc_params.update({'asm_type': asm_level})
+                            bitstream_name = test_name + '_ASM' + str(asm_level)
+                            enc_cmd = self.get_enc_cmd(enc_params, seq['name'], bitstream_name)
+                            print ("Running Test: " + bitstream_name)
+                            if DEBUG_MODE != 0:
+                                print (enc_cmd)
+                                continue
+                            exit_code = subprocess.call(enc_cmd, shell = True)
+                            summary = self.get_enc_summary(enc_params['bitstream_dir'] + slash + bitstream_name + '.txt')
+                            fps = summary.get(1, {}).get('fps', 0)
+                            if exit_code != 0 or fps == 0:
+                                print ("%-64s%6d%12s%12s" % (bitstream_name[-64:], asm_level, kernels, 'Enc Error'), file=results_file)
+                                continue
+                            if reference_name == "":
+                                # First level that ran is the reference, normally C_DEFAULT
+                                reference_fps = fps
+                                reference_name = bitstream_name
+                                exact = '-'
+                            else:
+                                total_tests = total_tests + 1
+                                if filecmp.cmp(enc_params['bitstream_dir'] + slash + reference_name + '.265', enc_params['bitstream_dir'] + slash + bitstream_name + '.265'):
+                                    exact = 'Yes'
+                                    total_exact = total_exact + 1
+                                else:
+                                    exact = 'No'
+                            print ("%-64s%6d%12s%12.2f%9.2fx%10s" % (bitstream_name[-64:], asm_level, kernels, fps, fps/reference_fps, exact), file=results_file)
+            print ("---------------------------------------------------------", file=results_file)
+            print ("Bit-exact against reference: " + str(total_exact) + "/" + str(total_tests), file=results_file)
+            print ("---------------------------------------------------------", file=results_file)
+
+## ---------- KERNEL BENCHMARK TEST ---------- ##
+    # Load the kernel shim from the encoder folder, building it first if needed
+    def get_kernel_shim(self):
+        shim_path = self.encoder_path + slash + KERNEL_SHIM_NAME + ('.dll' if platform == WINDOWS_PLATFORM_STR else '.so')
+        if not os.path.exists(shim_path):
+            if platform != LINUX_PLATFORM_STR:
+                print ("Cannot find " + KERNEL_SHIM_NAME + ".dll. Please build SVT_KernelShim.c against the encoder libraries and place it in the folder \"" + self.encoder_path + "\"")
+                return None
+            if self.build_kernel_shim(shim_path) != 0:
+                return None
+        try:
+            shim = ctypes.CDLL(os.path.abspath(shim_path))
+        except OSError as error:
+            print ("Cannot load " + shim_path + ": " + str(error))
+            return None
+
+        u32 = ctypes.c_uint32
+        ptr = ctypes.c_void_p
+        shim.KernelShimAsmTypes.restype = u32
+        shim.KernelShimAsmTypes.argtypes = []
+        shim.KernelShimSad.restype = u32
+        shim.KernelShimSad.argtypes = [u32, ptr, u32, ptr, u32, u32, u32, u32]
+        shim.KernelShimTransform.restype = None
+        shim.KernelShimTransform.argtypes = [u32, u32, ptr, u32, ptr, u32, ptr, u32, u32]
+        shim.KernelShimInvTransform.restype = None
+        shim.KernelShimInvTransform.argtypes = [u32, u32, ptr, u32, ptr, u32, ptr, u32, u32]
+        shim.KernelShimInterpolation.restype = None
+        shim.KernelShimInterpolation.argtypes = [u32, u32, ptr, u32, ptr, u32, u32, u32, ptr, u32, u32]
+        shim.KernelShimDeblockLuma.restype = None
+        shim.KernelShimDeblockLuma.argtypes = [u32, ptr, u32, u32, ctypes.c_int32, ctypes.c_int32, u32]
+        shim.KernelShimSaoBo.restype = None
+        shim.KernelShimSaoBo.argtypes = [u32, ptr, u32, u32, ptr, u32, u32, u32]
+        return shim
+
+    # Link the shim with the encoder objects and the kernel libraries of an existing CMake build
+    def build_kernel_shim(self, shim_path):
+        # The source tree and the build are found from the shim source, wherever the harness is started from
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        source_path = os.path.join(script_dir, KERNEL_SOURCE_PATH)
+        build_path = os.path.join(script_dir, KERNEL_BUILD_PATH)
+        codec_objects = glob.glob(build_path + slash + 'Source/Lib/Codec/CMakeFiles/SvtHevcEnc.dir/*.o')
+        lib_dir = ''
+        for root, dirs, files in os.walk(build_path):
+            if 'libC_DEFAULT.a' in files:
+                lib_dir = root
+                break
+        if len(codec_objects) == 0 or lib_dir == '':
+            print ("Cannot find the encoder build in \"" + build_path + "\". Please build the encoder (Build/linux/build.sh release) or set KERNEL_BUILD_PATH")
+            return -1
+        include_dirs = ['API', 'Lib/Codec', 'Lib/C_DEFAULT', 'Lib/ASM_SSE2', 'Lib/ASM_SSSE3', 'Lib/ASM_SSE4_1', 'Lib/ASM_AVX2']
+        shim_source = script_dir + slash + 'SVT_KernelShim.c'
+        build_cmd = 'gcc -shared -fPIC -O2 -flto -march=native -o ' + shim_path
+        for include_dir in include_dirs:
+            build_cmd += ' -I' + source_path + slash + 'Source' + slash + include_dir
+        build_cmd += ' ' + shim_source + ' ' + ' '.join(sorted(codec_objects))
+        build_cmd += ' -L' + lib_dir + ' -Wl,--start-group -lC_DEFAULT -lASM_SSE2 -lASM_SSSE3 -lASM_SSE4_1 -lASM_AVX2 -Wl,--end-group -lpthread -lm'
+        print ("Building " + shim_path)
+        if DEBUG_MODE != 0:
+            print (build_cmd)
+        exit_code = subprocess.call(build_cmd, shell = True)
+        if exit_code != 0:
+            print ("Failed to build " + shim_path)
+            if os.path.exists(shim_path):
+                os.remove(shim_path)
+        return exit_code
+
+    # Zeroed buffer aligned to 64 bytes, some ASM kernels use aligned loads
+    def get_kernel_buffer(self, size, dtype):
+        itemsize = numpy.dtype(dtype).itemsize
+        raw = numpy.zeros(size * itemsize + 64, dtype = numpy.uint8)
+        offset = -raw.ctypes.data % 64
+        return raw[offset:offset + size * itemsize].view(dtype)
+
+    def get_kernel_copy(self, array):
+        buffer = self.get_kernel_buffer(array.size, array.dtype)
+        buffer[:] = array
+        return buffer
+
+    def get_pointer(self, array, offset = 0):
+        return ctypes.c_void_p(array.ctypes.data + offset * array.itemsize)
+
+    # Each case: kernel and block names, pixels per call, input generator and shim call returning the output to compare
+    def get_kernel_cases(self, shim):
+        cases = []
+
+        # SAD (ME search), reference at an unaligned search position
+        for width, height in [(4, 8), (8, 8), (16, 16), (24, 32), (32, 32), (48, 64), (64, 64)]:
+            def get_inputs(rng, width = width, height = height):
+                src = self.get_kernel_buffer(128 * (height + 8), numpy.uint8)
+                ref = self.get_kernel_buffer(128 * (height + 8), numpy.uint8)
+                src[:] = rng.randint(0, 256, src.size)
+                ref[:] = rng.randint(0, 256, ref.size)
+                return [src, ref]
+            def call(asm_type, arrays, iterations, width = width, height = height):
+                return shim.KernelShimSad(asm_type, self.get_pointer(arrays[0]), 128, self.get_pointer(arrays[1], 3), 128, width, height, iterations)
+            cases.append({'kernel': 'SAD', 'block': str(width) + 'x' + str(height), 'pixels': width * height, 'get_inputs': get_inputs, 'call': call})
+
+        # Forward and inverse transforms, 8 bit residuals with the LCU stride used by the encoder
+        for transform_idx, size, name in [(0, 32, ''), (1, 16, ''), (2, 8, ''), (3, 4, ''), (4, 4, ' DST')]:
+            def get_inputs(rng, size = size):
+                residual = self.get_kernel_buffer(64 * 64, numpy.int16)
+                coefficients = self.get_kernel_buffer(64 * 64, numpy.int16)
+                inner_array = self.get_kernel_buffer(64 * 64, numpy.int16)
+                residual.reshape(64, 64)[:size, :size] = rng.randint(-255, 256, (size, size))
+                return [residual, coefficients, inner_array]
+            def call(asm_type, arrays, iterations, transform_idx = transform_idx):
+                shim.KernelShimTransform(asm_type, transform_idx, self.get_pointer(arrays[0]), 64, self.get_pointer(arrays[1]), 64, self.get_pointer(arrays[2]), 0, iterations)
+                return arrays[1]
+            cases.append({'kernel': 'Transform' + name, 'block': str(size) + 'x' + str(size), 'pixels': size * size, 'get_inputs': get_inputs, 'call': call})
+
+        for transform_idx, size, name in [(0, 32, ''), (1, 16, ''), (2, 8, ''), (3, 4, ''), (4, 4, ' DST')]:
+            # Coefficients of a random residual block through the C forward transform, so the input range matches the encoder
+            def get_inputs(rng, transform_idx = transform_idx, size = size):
+                residual = self.get_kernel_buffer(64 * 64, numpy.int16)
+                coefficients = self.get_kernel_buffer(64 * 64, numpy.int16)
+                inner_array = self.get_kernel_buffer(64 * 64, numpy.int16)
+                residual.reshape(64, 64)[:size, :size] = rng.randint(-255, 256, (size, size))
+                shim.KernelShimTransform(0, transform_idx, self.get_pointer(residual), 64, self.get_pointer(coefficients), 64, self.get_pointer(inner_array), 0, 1)
+                residual[:] = 0
+                return [coefficients, residual, inner_array]
+            def call(asm_type, arrays, iterations, transform_idx = transform_idx):
+                shim.KernelShimInvTransform(asm_type, transform_idx, self.get_pointer(arrays[0]), 64, self.get_pointer(arrays[1]), 64, self.get_pointer(arrays[2]), 0, iterations)
+                return arrays[1]
+            cases.append({'kernel': 'InvTransform' + name, 'block': str(size) + 'x' + str(size), 'pixels': size * size, 'get_inputs': get_inputs, 'call': call})
+
+        # Luma interpolation, the reference has a margin for the filter taps
+        for filter_idx, frac_pos, name in [(0, 0, 'IF Copy'), (1, 1, 'IF H 1/4'), (1, 2, 'IF H 1/2'), (1, 3, 'IF H 3/4'), (2, 1, 'IF V 1/4'), (2, 2, 'IF V 1/2'), (2, 3, 'IF V 3/4')]:
+            for size in [8, 16, 32, 64]:
+                def get_inputs(rng):
+                    ref = self.get_kernel_buffer(160 * 96, numpy.uint8)
+                    dst = self.get_kernel_buffer(64 * 64, numpy.uint8)
+                    temp_buf = self.get_kernel_buffer(160 * 96 * 2, numpy.uint8)
+                    ref[:] = rng.randint(0, 256, ref.size)
+                    return [ref, dst, temp_buf]
+                def call(asm_type, arrays, iterations, filter_idx = filter_idx, frac_pos = frac_pos, size = size):
+                    shim.KernelShimInterpolation(asm_type, filter_idx, self.get_pointer(arrays[0], 16 * 160 + 16), 160, self.get_pointer(arrays[1]), 64, size, size, self.get_pointer(arrays[2]), frac_pos, iterations)
+                    return arrays[1]
+                cases.append({'kernel': name, 'block': str(size) + 'x' + str(size), 'pixels': size * size, 'get_inputs': get_inputs, 'call': call})
+
+        # Luma deblocking of one 4 sample edge (8x4 samples around it), a smooth step so the filter decisions are exercised
+        for is_vertical, name in [(1, 'DLF Luma V'), (0, 'DLF Luma H')]:
+            for tc, beta in [(1, 18), (4, 38), (10, 64)]:
+                def get_inputs(rng, is_vertical = is_vertical):
+                    block = self.get_kernel_buffer(32 * 16, numpy.uint8)
+                    samples = numpy.zeros((16, 32), dtype = numpy.int32)
+                    samples[:, :] = rng.randint(16, 236)
+                    if is_vertical:
+                        samples[:, 8:] += rng.randint(-16, 17)
+                    else:
+                        samples[8:, :] += rng.randint(-16, 17)
+                    samples += rng.randint(0, 3, samples.shape)
+                    block.reshape(16, 32)[:, :] = numpy.clip(samples, 0, 255)
+                    return [block]
+                def call(asm_type, arrays, iterations, is_vertical = is_vertical, tc = tc, beta = beta):
+                    shim.KernelShimDeblockLuma(asm_type, self.get_pointer(arrays[0], 8 if is_vertical else 8 * 32), 32, is_vertical, tc, beta, iterations)
+                    return arrays[0]
+                cases.append({'kernel': name, 'block': 'tc' + str(tc) + ' b' + str(beta), 'pixels': 32, 'get_inputs': get_inputs, 'call': call})
+
+        # SAO band offset of a full LCU
+        for size in [16, 32, 64]:
+            def get_inputs(rng):
+                recon = self.get_kernel_buffer(64 * 64, numpy.uint8)
+                sao_offset = self.get_kernel_buffer(16, numpy.int8)
+                band_position = self.get_kernel_buffer(1, numpy.uint32)
+                recon[:] = rng.randint(0, 256, recon.size)
+                sao_offset[:4] = rng.randint(-7, 8, 4)
+                band_position[0] = rng.randint(0, 29)
+                return [recon, sao_offset, band_position]
+            def call(asm_type, arrays, iterations, size = size):
+                shim.KernelShimSaoBo(asm_type, self.get_pointer(arrays[0]), 64, int(arrays[2][0]), self.get_pointer(arrays[1]), size, size, iterations)
+                return arrays[0]
+            cases.append({'kernel': 'SAO BO', 'block': str(size) + 'x' + str(size), 'pixels': size * size, 'get_inputs': get_inputs, 'call': call})
+
+        return cases
+
+    # Best ns per call over 3 measurements of at least KERNEL_MIN_TIME / 3 each
+    def time_kernel(self, case, inputs, asm_type):
+        iterations = 1
+        while True:
+            arrays = [self.get_kernel_copy(x) for x in inputs]
+            start_time = time.time()
+            case['call'](asm_type, arrays, iterations)
+            elapsed = time.time() - start_time
+            if elapsed >= KERNEL_MIN_TIME / 3 or iterations >= 1 << 24:
+                break
+            iterations = iterations * 2 if elapsed <= 0 else min(1 << 24, max(iterations * 2, int(iterations * KERNEL_MIN_TIME / 3 / elapsed * 1.2)))
+        ns_per_call = elapsed * 1e9 / iterations
+        for repeat in range(2):
+            arrays = [self.get_kernel_copy(x) for x in inputs]
+            start_time = time.time()
+            case['call'](asm_type, arrays, iterations)
+            ns_per_call = min(ns_per_call, (time.time() - start_time) * 1e9 / iterations)
+        return ns_per_call
+
+    def load_kernel_results(self):
+        if os.path.exists(KERNEL_RESULTS_FILE):
+            with open(KERNEL_RESULTS_FILE, 'r') as results_file:
+                return json.load(results_file)
+        return []
+
+    def save_kernel_results(self, kernel_results):
+        with open(KERNEL_RESULTS_FILE + '.tmp', 'w') as results_file:
+            json.dump(kernel_results, results_file, indent = 1)
+        if os.path.exists(KERNEL_RESULTS_FILE):
+            os.remove(KERNEL_RESULTS_FILE)
+        os.rename(KERNEL_RESULTS_FILE + '.tmp', KERNEL_RESULTS_FILE)
+
+    # Time every kernel with the C_DEFAULT and ASM table entries, check bit-exactness against C and flag regressions against the previous run
+    def run_kernel_test(self):
+        if numpy is None:
+            print ("Kernel Benchmark Test requires numpy")
+            return
+        shim = self.get_kernel_shim()
+        if shim is None:
+            return
+        file_name = 'Kernel_Test_Results'
+        cpu_name, cpu_flags = self.get_cpu_info()
+        implementations = [(0, 'C_DEFAULT')]
+        # The ASM table entries go up to AVX2 (SAD)
+        if len(cpu_flags) == 0 or 'avx2' in cpu_flags:
+            implementations.append((1, 'ASM'))
+        else:
+            print ("Skipping the ASM kernels, AVX2 is not supported by this CPU")
+        implementations = implementations[:shim.KernelShimAsmTypes()]
+
+        kernel_results = self.load_kernel_results()
+        previous_results = {}
+        for run in kernel_results:
+            if run['cpu'] == cpu_name:
+                previous_results = dict(((x['kernel'], x['block'], x['impl']), x['ns']) for x in run['results'])
+        with open(self.encoder_path + slash + KERNEL_SHIM_NAME + ('.dll' if platform == WINDOWS_PLATFORM_STR else '.so'), 'rb') as shim_file:
+            build = hashlib.sha256(shim_file.read()).hexdigest()[:16]
+
+        with open(file_name + '.txt', 'w', 1) as results_file:
+            print ("---------------------------------------------------------", file=results_file)
+            print ("Host CPU: " + cpu_name, file=results_file)
+            print ("Shim Build: " + build, file=results_file)
+            print ("---------------------------------------------------------", file=results_file)
+            print ("%-18s%-12s%-12s%12s%12s%10s%8s%10s" % ('Kernel', 'Block', 'Impl', 'ns/call', 'Mpixel/s', 'Speedup', 'Exact', 'Change'), file=results_file)
+
+            rng = numpy.random.RandomState(KERNEL_SEED)
+            results = []
+            total_tests = 0
+            total_exact = 0
+            regressions = []
+            for case in self.get_kernel_cases(shim):
+                print ("Running Kernel: " + case['kernel'] + ' ' + case['block'])
+                trial_inputs = [case['get_inputs'](rng) for trial in range(KERNEL_EXACT_TRIALS)]
+                reference_outputs = []
+                reference_ns = 0
+                for asm_type, impl in implementations:
+                    outputs = []
+                    for inputs in trial_inputs:
+                        output = case['call'](asm_type, [self.get_kernel_copy(x) for x in inputs], 1)
+                        outputs.append(output.copy() if isinstance(output, numpy.ndarray) else output)
+                    ns_per_call = self.time_kernel(case, trial_inputs[0], asm_type)
+                    if asm_type == 0:
+                        reference_outputs = outputs
+                        reference_ns = ns_per_call
+                        exact = '-'
+                    else:
+                        total_tests = total_tests + 1
+                        if all(numpy.array_equal(x, y) for x, y in zip(reference_outputs, outputs)):
+                            exact = 'Yes'
+                            total_exact = total_exact + 1
+                        else:
+                            exact = 'No'
+                    change = ''
+                    key = (case['kernel'], case['block'], impl)
+                    if key in previous_results:
+                        ratio = ns_per_call / previous_results[key] - 1
+                        change = "%+.0f%%" % (ratio * 100)
+                        if ratio >= KERNEL_REGRESSION_THRESHOLD:
+                            regressions.append(case['kernel'] + ' ' + case['block'] + ' ' + impl + ' ' + change)
+                    print ("%-18s%-12s%-12s%12.1f%12.1f%9.2fx%8s%10s" % (case['kernel'], case['block'], impl, ns_per_call, case['pixels'] * 1e3 / ns_per_call, reference_ns / ns_per_call, exact, change), file=results_file)
+                    results.append({'kernel': case['kernel'], 'block': case['block'], 'impl': impl, 'ns': ns_per_call, 'exact': exact})
+
+            kernel_results.append({'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'cpu': cpu_name, 'build': build, 'seed': KERNEL_SEED, 'results': results})
+            self.save_kernel_results(kernel_results)
+
+            print ("---------------------------------------------------------", file=results_file)
+            print ("Bit-exact against C_DEFAULT: " + str(total_exact) + "/" + str(total_tests), file=results_file)
+            if len(regressions) > 0:
+                print ("Slower than the previous run (>= " + str(int(KERNEL_REGRESSION_THRESHOLD * 100)) + "%):", file=results_file)
+                for regression in regressions:
+                    print ("    " + regression, file=results_file)
+            print ("---------------------------------------------------------", file=results_file)
+
+## ---------------- LIVE TEST ---------------- ##
+    # Run an encode with its output piped to the harness, timestamp every update of the progress counter
+    # and keep a copy of the output in the .txt file. Returns the exit code and the output time of each frame
+    def run_live_encode(self, enc_cmd, output_file):
+        enc_cmd = enc_cmd[:enc_cmd.rfind(' > ')]
+        frame_times = []
+        with open(output_file, 'wb') as out_file:
+            process = subprocess.Popen(enc_cmd, shell = True, stdout = subprocess.PIPE)
+            pending = b''
+            while True:
+                data = os.read(process.stdout.fileno(), 4096)
+                if not data:
+                    break
+                read_time = time.time()
+                out_file.write(data)
+                # The counter is printed as 9 backspaces followed by the frame count on 9 characters
+                fields = (pending + data).split(b'\b')
+                pending = fields[-1]
+                for field in fields:
+                    if len(field) < 9 or not field[:9].strip().isdigit():
+                        continue
+                    count = int(field[:9])
+                    while len(frame_times) < count:
+                        frame_times.append(read_time)
+            process.stdout.close()
+            exit_code = process.wait()
+        return exit_code, frame_times
+
+    # Frames that come out later than LIVE_DEADLINE_TOLERANCE after their slot, the first output starts the schedule
+    def get_deadline_misses(self, frame_times, frame_rate):
+        misses = 0
+        max_lateness = 0
+        for index in range(len(frame_times)):
+            lateness = frame_times[index] - (frame_times[0] + index / float(frame_rate))
+            max_lateness = max(max_lateness, lateness)
+            if lateness > LIVE_DEADLINE_TOLERANCE:
+                misses = misses + 1
+        return misses, max_lateness
+
+    # Encode num_channels live channels and write one line of results, None in debug mode
+    def run_live_config(self, enc_params, seq_name, test_name, num_channels, results_file):
+        bitstream_name = test_name + '_NCH' + str(num_channels) + '_SC' + str(enc_params['speed_control'])
+        enc_cmd = self.get_enc_cmd(enc_params, seq_name, bitstream_name, num_channels)
+        print ("Running Test: " + bitstream_name)
+        if DEBUG_MODE != 0:
+            print (enc_cmd)
+            return None
+        output_file = enc_params['bitstream_dir'] + slash + bitstream_name + '.txt'
+        exit_code, frame_times = self.run_live_encode(enc_cmd, output_file)
+        summary = self.get_enc_summary(output_file)
+        frame_rate = int(enc_params['frame_rate'])
+        # The progress counter counts the frames of all channels
+        misses, max_lateness = self.get_deadline_misses(frame_times, frame_rate * num_channels)
+        total_frames = enc_params['frame_to_be_encoded'] * num_channels
+        result = {'exit_code': exit_code,
+                  'fps': min([summary[x].get('fps', 0) for x in summary] or [0]),
+                  'avg_latency': sum([summary[x].get('avg_latency', 0) for x in summary]) / max(len(summary), 1),
+                  'max_latency': max([summary[x].get('max_latency', 0) for x in summary] or [0]),
+                  'misses': misses + total_frames - len(frame_times),
+                  'max_lateness': max_lateness}
+        result['real_time'] = (exit_code == 0 and len(summary) == num_channels and result['misses'] <= LIVE_MAX_MISS_RATIO * total_frames)
+        if exit_code != 0:
+            print ("%-64s%5d%7s%12s" % (bitstream_name[-64:], num_channels, 'On' if enc_params['speed_control'] else 'Off', 'Enc Error'), file=results_file)
+        else:
+            print ("%-64s%5d%7s%9.2f%8d%10.0f%10.0f%10.3f%9s%5s" % (bitstream_name[-64:], num_channels, 'On' if enc_params['speed_control'] else 'Off', result['fps'], frame_rate,
+                   result['avg_latency'], result['max_latency'], max_lateness, str(result['misses']) + '/' + str(total_frames), 'Yes' if result['real_time'] else 'No'), file=results_file)
+        return result
+
+    # Densest channel count that still holds real time without speed control, doubling then bisecting
+    # results holds the channel counts already run (real time or not)
+    def find_live_density(self, enc_params, seq_name, test_name, results_file, results):
+        enc_params.update({'speed_control': 0})
+        def holds_real_time(num_channels):
+            if num_channels not in results:
+                result = self.run_live_config(enc_params, seq_name, test_name, num_channels, results_file)
+                results[num_channels] = result is not None and result['real_time']
+            return results[num_channels]
+
+        low = 0
+        high = LIVE_MAX_CHANNELS + 1
+        num_channels = 1
+        while num_channels <= LIVE_MAX_CHANNELS:
+            if not holds_real_time(num_channels):
+                high = num_channels
+                break
+            low = num_channels
+            if num_channels == LIVE_MAX_CHANNELS:
+                break
+            num_channels = min(num_channels * 2, LIVE_MAX_CHANNELS)
+        while high - low > 1:
+            num_channels = (low + high) // 2
+            if holds_real_time(num_channels):
+                low = num_channels
+            else:
+                high = num_channels
+        return low
+
+    # Run each sequence live at its nominal frame rate with speed control off and on, then find the densest -nch per enc mode
+    def run_live_test(self, seq_dict):
+        seq_list = []
+        for x in seq_dict:
+            seq_list.append(x['name'])
+        if self.error_check(seq_list) != 0:
+            return
+        file_name = 'Live_Test_Results'
+        cpu_name, cpu_flags = self.get_cpu_info()
+        with open(file_name + '.txt', 'w', 1) as results_file:
+            self.start_results_table(results_file, ["Host CPU: " + cpu_name,
+                                                 "Frames per channel: " + str(LIVE_NUM_FRAMES) + ", deadline tolerance: " + str(LIVE_DEADLINE_TOLERANCE) + "s, latency mode: " + str(LIVE_LATENCY_MODE)],
+                                     "%-64s%5s%7s%9s%8s%10s%10s%10s%9s%5s" % ('Encode', '-nch', 'Speed', 'fps', 'Target', 'Avg Lat', 'Max Lat', 'Late(s)', 'Misses', 'RT'))
+
+            enc_params = self.get_default_params().copy()
+            enc_params.update({'frame_to_be_encoded': LIVE_NUM_FRAMES, 'tune': 0})
+            densities = []
+            for seq in seq_dict:
+                rate_name = self.set_rate_params(seq, enc_params)
+                if rate_name is None:
+                    continue
+                enc_params.update(self.get_stream_info(seq['name']))
+                enc_params.update({'injector': 1, 'injector_frame_rate': int(enc_params['frame_rate']), 'latency_mode': LIVE_LATENCY_MODE})
+                for enc_mode in LIVE_ENC_MODES:
+                    enc_params.update({'enc_mode': enc_mode})
+                    test_name = 'Live_Test_M' + str(enc_mode) + '_' + seq['name'] + rate_name
+                    density_results = {}
+                    for speed_control in LIVE_SPEED_CONTROL:
+                        enc_params.update({'speed_control': speed_control})
+                        result = self.run_live_config(enc_params, seq['name'], test_name, 1, results_file)
+                        if result is not None and speed_control == 0:
+                            density_results[1] = result['real_time']
+                    if DEBUG_MODE == 0:
+                        densities.append((seq['name'], enc_mode, self.find_live_density(enc_params, seq['name'], test_name, results_file, density_results)))
+
+            print ("---------------------------------------------------------", file=results_file)
+            print ("Densest real time -nch (speed control off):", file=results_file)
+            for seq in seq_list:
+                seq_densities = [x for x in densities if x[0] == seq]
+                if len(seq_densities) == 0:
+                    continue
+                for seq_name, enc_mode, num_channels in seq_densities:
+                    print ("    %-60s -encMode %2d: %s" % (seq_name[-60:], enc_mode, str(num_channels) if num_channels > 0 else 'not real time'), file=results_file)
+                # Most channels, then the lowest (best quality) enc mode
+                best = max(seq_densities, key = lambda x: (x[2], -x[1]))
+                if best[2] > 0:
+                    print ("    %-60s Densest: -nch %d at -encMode %d" % (seq[-60:], best[2], best[1]), file=results_file)
+            print ("---------------------------------------------------------", file=results_file)
+
+## -------------- SYNTHETIC TEST ------------- ##
+    # Sequence name of a synthetic sequence, in the format get_stream_info parses
+    def get_synthetic_name(self, seq):
+        seq_name = 'Synthetic_' + str(seq['width']) + 'x' + str(seq['height']) + '_' + str(seq['bit_depth']) + 'bit_' + str(seq['frame_rate']) + 'Hz_P420'
+        if seq['bit_depth'] > 8 and seq.get('packed', 0) == 1:
+            seq_name = seq_name + '_2bitspacked'
+        return seq_name
+
+    # Open a named pipe for writing once the encoder opened it for reading, None if the encoder exits first
+    def open_fifo(self, fifo_path, process):
+        import fcntl
+        fifo_fd = None
+        # Opening for writing fails until there is a reader
+        while fifo_fd is None and process.poll() is None:
+            try:
+                fifo_fd = os.open(fifo_path, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError:
+                time.sleep(0.01)
+        if fifo_fd is None:
+            return None
+        fcntl.fcntl(fifo_fd, fcntl.F_SETFL, fcntl.fcntl(fifo_fd, fcntl.F_GETFL) & ~os.O_NONBLOCK)
+        return os.fdopen(fifo_fd, 'wb')
+
+    # Stream SYNTH_NUM_FRAMES synthetic frames into the encoder through its stdin or a named pipe
+    # Returns the exit code, whether every frame was written and the encode time
+    def run_synthetic_encode(self, source, enc_params, bitstream_name):
+        if SYNTH_TRANSPORT == 1:
+            fifo_path = enc_params['yuv_dir'] + slash + bitstream_name + '.yuv'
+            enc_cmd = self.get_enc_cmd(enc_params, bitstream_name, bitstream_name)
+        else:
+            enc_cmd = self.get_enc_cmd(enc_params, 'stdin', bitstream_name)
+        print ("Running Test: " + bitstream_name)
+        if DEBUG_MODE != 0:
+            print (enc_cmd)
+            return 0, True, 0
+        start_time = time.time()
+        if SYNTH_TRANSPORT == 1:
+            if os.path.exists(fifo_path):
+                os.remove(fifo_path)
+            os.mkfifo(fifo_path)
+            process = subprocess.Popen(enc_cmd, shell = True)
+            in_file = self.open_fifo(fifo_path, process)
+            if in_file is None:
+                os.remove(fifo_path)
+                return process.wait(), False, time.time() - start_time
+        else:
+            process = subprocess.Popen(enc_cmd, shell = True, stdin = subprocess.PIPE)
+            in_file = process.stdin
+        streamed = source.write_frames(in_file, SYNTH_NUM_FRAMES)
+        exit_code = process.wait()
+        elapsed = time.time() - start_time
+        if SYNTH_TRANSPORT == 1:
+            os.remove(fifo_path)
+        return exit_code, streamed, elapsed
+
+    # Check the generator keeps up with each sequence frame rate, then encode every sequence twice with the same seed
+    def run_synthetic_test(self, seq_dict):
+        if numpy is None:
+            print ("The Synthetic Test requires numpy")
+            return
+        if SYNTH_TRANSPORT == 1 and platform == WINDOWS_PLATFORM_STR:
+            print ("Named pipe transport is only supported on Linux, please use SYNTH_TRANSPORT = 0")
+            return
+        if self.error_check([]) != 0:
+            return
+        file_name = 'Synthetic_Test_Results'
+        with open(file_name + '.txt', 'w', 1) as results_file:
+            self.start_results_table(results_file, ["Seed: " + str(SYNTH_SEED) + ", frames: " + str(SYNTH_NUM_FRAMES) + ", scene length: " + str(SYNTH_SCENE_LENGTH) + ", transport: " + ('named pipe' if SYNTH_TRANSPORT == 1 else 'stdin')],
+                                     "%-72s%10s%8s%5s%10s%7s" % ('Encode', 'Gen fps', 'Target', 'RT', 'Enc fps', 'Exact'))
+
+            enc_params = self.get_default_params().copy()
+            enc_params.update({'frame_to_be_encoded': SYNTH_NUM_FRAMES})
+            total_tests = 0
+            total_exact = 0
+            for seq in seq_dict:
+                rate_name = self.set_rate_params(seq, enc_params)
+                if rate_name is None:
+                    continue
+                seq_name = self.get_synthetic_name(seq)
+                enc_params.update(self.get_stream_info(seq_name))
+                enc_params.update({'width': seq['width'], 'height': seq['height']})
+                source = EB_SyntheticSource(seq['width'], seq['height'], seq['bit_depth'], enc_params['compressed_ten_bit_format'], SYNTH_SEED)
+                generation_fps = source.get_generation_fps(min(SYNTH_NUM_FRAMES, 2 * seq['frame_rate']))
+                for enc_mode in SYNTH_ENC_MODES:
+                    enc_params.update({'enc_mode': enc_mode})
+                    test_name = 'Synthetic_Test_M' + str(enc_mode) + '_' + seq_name + rate_name
+                    runs = []
+                    for run in range(2):
+                        bitstream_name = test_name + '_Run' + str(run + 1)
+                        runs.append((bitstream_name,) + self.run_synthetic_encode(source, enc_params, bitstream_name))
+                    if DEBUG_MODE != 0:
+                        continue
+                    total_tests = total_tests + 1
+                    if any(x[1] != 0 or not x[2] for x in runs):
+                        exact = 'Error'
+                    elif filecmp.cmp(enc_params['bitstream_dir'] + slash + runs[0][0] + '.265', enc_params['bitstream_dir'] + slash + runs[1][0] + '.265', shallow = False):
+                        exact = 'Yes'
+                        total_exact = total_exact + 1
+                    else:
+                        exact = 'No'
+                    encode_fps = "%.2f" % (SYNTH_NUM_FRAMES / runs[0][3]) if exact != 'Error' and runs[0][3] > 0 else '-'
+                    print ("%-72s%10.1f%8d%5s%10s%7s" % (test_name[-72:], generation_fps, seq['frame_rate'], 'Yes' if generation_fps >= seq['frame_rate'] else 'No', encode_fps, exact), file=results_file)
+
+            print ("---------------------------------------------------------", file=results_file)
+            print ("Run to run exact: " + str(total_exact) + "/" + str(total_tests), file=results_file)
+            print ("---------------------------------------------------------", file=results_file)
+
+## ---------------- SOAK TEST ---------------- ##
+    # Resident memory in MB, thread count and open file descriptors of a process, None once it is gone
+    def get_process_sample(self, pid):
+        try:
+            with open('/proc/' + str(pid) + '/status') as status_file:
+                status = dict(line.split(':', 1) for line in status_file if ':' in line)
+            rss = int(status['VmRSS'].split()[0]) / 1024.0
+            threads = int(status['Threads'])
+            fds = len(os.listdir('/proc/' + str(pid) + '/fd'))
+        except (IOError, OSError, KeyError, ValueError):
+            return None
+        return rss, threads, fds
+
+    # Copy the encoder output to output_file without the progress counter (it would grow by ~18 bytes per frame)
+    # and keep the latest frame count in progress
+    def read_soak_output(self, process, output_file, progress):
+        with open(output_file, 'wb') as out_file:
+            pending = b''
+            while True:
+                data = os.read(process.stdout.fileno(), 4096)
+                if not data:
+                    break
+                # The counter is printed as 9 backspaces followed by the frame count on 9 characters
+                fields = (pending + data).split(b'\b')
+                pending = fields[-1]
+                for field in fields[:-1]:
+                    if len(field) >= 9 and field[:9].strip().isdigit():
+                        progress['frames'] = int(field[:9])
+                        out_file.write(field[9:])
+                    else:
+                        out_file.write(field)
+            out_file.write(pending)
+        process.stdout.close()
+
+    # Average adjacent samples so the series covers the whole run in SOAK_MAX_SAMPLES entries
+    def compact_soak_samples(self, samples):
+        compacted = []
+        for index in range(0, len(samples) - 1, 2):
+            compacted.append(tuple((x + y) / 2.0 for x, y in zip(samples[index], samples[index + 1])))
+        if len(samples) % 2 == 1:
+            compacted.append(samples[-1])
+        return compacted
+
+    # Least squares slope of y over x
+    def get_slope(self, points):
+        if len(points) < 2:
+            return 0
+        mean_x = sum(x for x, y in points) / float(len(points))
+        mean_y = sum(y for x, y in points) / float(len(points))
+        sxx = sum((x - mean_x) ** 2 for x, y in points)
+        if sxx == 0:
+            return 0
+        return sum((x - mean_x) * (y - mean_y) for x, y in points) / sxx
+
+    # Run an encode until it finishes or its time runs out, sampling it from /proc
+    # Returns the exit code, whether it was stopped and the series of (seconds, RSS MB, threads, fds, fps)
+    def run_soak_encode(self, enc_params, seq, bitstream_name, num_channels):
+        synthetic = 'name' not in seq
+        if synthetic:
+            fifo_names = [bitstream_name + '_' + str(channel) for channel in range(num_channels)]
+            yuv_name = fifo_names
+        else:
+            yuv_name = seq['name']
+        # Run without a shell so the pid is the encoder
+        enc_args = self.get_enc_args(enc_params, yuv_name, bitstream_name, num_channels)
+        print ("Running Test: " + bitstream_name)
+        if DEBUG_MODE != 0:
+            print (' '.join(enc_args))
+            return None
+        if synthetic:
+            for fifo_name in fifo_names:
+                fifo_path = enc_params['yuv_dir'] + slash + fifo_name + '.yuv'
+                if os.path.exists(fifo_path):
+                    os.remove(fifo_path)
+                os.mkfifo(fifo_path)
+        output_file = enc_params['bitstream_dir'] + slash + bitstream_name + '.txt'
+        process = subprocess.Popen(enc_args, stdout = subprocess.PIPE)
+        progress = {'frames': 0}
+        reader_thread = threading.Thread(target = self.read_soak_output, args = (process, output_file, progress))
+        reader_thread.daemon = True
+        reader_thread.start()
+        writer_threads = []
+        if synthetic:
+            for channel in range(num_channels):
+                in_file = self.open_fifo(enc_params['yuv_dir'] + slash + fifo_names[channel] + '.yuv', process)
+                if in_file is None:
+                    break
+                source = EB_SyntheticSource(seq['width'], seq['height'], seq['bit_depth'], enc_params['compressed_ten_bit_format'], SYNTH_SEED + channel)
+                writer_thread = threading.Thread(target = source.write_frames, args = (in_file, enc_params['frame_to_be_encoded']))
+                writer_thread.daemon = True
+                writer_thread.start()
+                writer_threads.append(writer_thread)
+
+        # Paced encodes end by themselves, give them twice the duration before calling them stuck
+        end_time = time.time() + (SOAK_DURATION * 2 if SOAK_INJECTOR == 1 else SOAK_DURATION)
+        start_time = time.time()
+        interval = SOAK_SAMPLE_INTERVAL
+        next_time = start_time + interval
+        last_time = start_time
+        last_frames = 0
+        samples = []
+        stopped = False
+        while process.poll() is None:
+            now = time.time()
+            if now >= end_time:
+                process.terminate()
+                stopped = True
+                break
+            if now >= next_time:
+                sample = self.get_process_sample(process.pid)
+                if sample is not None:
+                    frames = progress['frames']
+                    samples.append((now - start_time,) + sample + ((frames - last_frames) / (now - last_time),))
+                    last_time = now
+                    last_frames = frames
+                if len(samples) >= SOAK_MAX_SAMPLES:
+                    samples = self.compact_soak_samples(samples)
+                    interval = interval * 2
+                next_time = next_time + interval
+            time.sleep(min(0.5, max(0, next_time - time.time())))
+        exit_code = process.wait()
+        reader_thread.join()
+        for writer_thread in writer_threads:
+            writer_thread.join()
+        if synthetic:
+            for fifo_name in fifo_names:
+                os.remove(enc_params['yuv_dir'] + slash + fifo_name + '.yuv')
+        return exit_code, stopped, samples
+
+    # Trends after the warm up: memory growth per hour, thread and file descriptor growth over the run,
+    # fps lost per hour relative to the mean. Returns the values and the reasons for a failure
+    def get_soak_verdict(self, exit_code, stopped, samples):
+        failures = []
+        if stopped and SOAK_INJECTOR == 1:
+            failures.append('did not finish')
+        elif exit_code != 0 and not stopped:
+            failures.append('exit code ' + str(exit_code))
+        trend_samples = [x for x in samples if x[0] >= SOAK_WARMUP * SOAK_DURATION]
+        verdict = {'rss': samples[-1][1] if samples else 0, 'rss_growth': 0, 'threads': 0, 'fds': 0, 'fps': 0, 'fps_drift': 0}
+        if len(trend_samples) < 4:
+            failures.append('too few samples')
+            return verdict, failures
+        span = trend_samples[-1][0] - trend_samples[0][0]
+        verdict['rss_growth'] = self.get_slope([(x[0], x[1]) for x in trend_samples]) * 3600
+        verdict['threads'] = self.get_slope([(x[0], x[2]) for x in trend_samples]) * span
+        verdict['fds'] = self.get_slope([(x[0], x[3]) for x in trend_samples]) * span
+        verdict['fps'] = sum(x[4] for x in trend_samples) / len(trend_samples)
+        if verdict['fps'] > 0:
+            verdict['fps_drift'] = self.get_slope([(x[0], x[4]) for x in trend_samples]) * 3600 / verdict['fps']
+        if verdict['rss_growth'] > SOAK_MAX_RSS_GROWTH:
+            failures.append('memory +%.1f MB/h' % verdict['rss_growth'])
+        if verdict['threads'] >= 1:
+            failures.append('threads +%.1f' % verdict['threads'])
+        if verdict['fds'] >= 1:
+            failures.append('file descriptors +%.1f' % verdict['fds'])
+        if -verdict['fps_drift'] > SOAK_MAX_FPS_DRIFT:
+            failures.append('fps %.1f%%/h' % (verdict['fps_drift'] * 100))
+        return verdict, failures
+
+    # Encode every config for SOAK_DURATION and give a verdict on its memory, threads, file descriptors and fps trends
+    def run_soak_test(self, seq_dict):
+        if platform == WINDOWS_PLATFORM_STR:
+            print ("The Soak Test samples the encoder from /proc and is only supported on Linux")
+            return
+        if self.error_check([x['name'] for x in seq_dict if 'name' in x]) != 0:
+            return
+        if numpy is None and any('name' not in x for x in seq_dict):
+            print ("Synthetic soak inputs require numpy")
+            return
+        file_name = 'Soak_Test_Results'
+        with open(file_name + '.txt', 'w', 1) as results_file:
+            self.start_results_table(results_file, ["Duration: " + self.get_time(SOAK_DURATION) + ", " + ('paced (-inj)' if SOAK_INJECTOR == 1 else 'unpaced') + ", warm up: " + str(int(SOAK_WARMUP * 100)) + "%",
+                                                 "Limits: memory " + str(SOAK_MAX_RSS_GROWTH) + " MB/h, fps drift " + str(SOAK_MAX_FPS_DRIFT * 100) + "%/h, no thread or file descriptor growth"],
+                                     "%-64s%5s%9s%10s%10s%9s%6s%9s%9s%8s" % ('Encode', '-nch', 'Samples', 'RSS MB', 'MB/h', 'Threads', 'FDs', 'fps', 'Drift/h', 'Result'))
+
+            series = {}
+            if os.path.exists(SOAK_SERIES_FILE):
+                with open(SOAK_SERIES_FILE) as series_file:
+                    series = json.load(series_file)
+            for seq in seq_dict:
+                enc_params = self.get_default_params().copy()
+                rate_name = self.set_rate_params(seq, enc_params)
+                if rate_name is None:
+                    continue
+                seq_name = seq['name'] if 'name' in seq else self.get_synthetic_name(seq)
+                enc_params.update(self.get_stream_info(seq_name))
+                if 'name' not in seq:
+                    enc_params.update({'width': seq['width'], 'height': seq['height']})
+                enc_params.update({'enc_mode': seq.get('enc_mode', 9)})
+                if SOAK_INJECTOR == 1:
+                    enc_params.update({'injector': 1, 'injector_frame_rate': int(enc_params['frame_rate']), 'frame_to_be_encoded': SOAK_DURATION * int(enc_params['frame_rate'])})
+                else:
+                    # Looped until SOAK_DURATION runs out
+                    enc_params.update({'frame_to_be_encoded': 2 ** 31 - 1})
+                num_channels = seq.get('nch', 1)
+                bitstream_name = 'Soak_Test_M' + str(enc_params['enc_mode']) + '_' + seq_name + rate_name + '_NCH' + str(num_channels)
+                result = self.run_soak_encode(enc_params, seq, bitstream_name, num_channels)
+                if result is None:
+                    continue
+                exit_code, stopped, samples = result
+                verdict, failures = self.get_soak_verdict(exit_code, stopped, samples)
+                print ("%-64s%5d%9d%10.1f%10.2f%9.1f%6.1f%9.2f%8.1f%%%8s" % (bitstream_name[-64:], num_channels, len(samples), verdict['rss'], verdict['rss_growth'], verdict['threads'], verdict['fds'],
+                       verdict['fps'], verdict['fps_drift'] * 100, 'FAIL' if failures else 'PASS'), file=results_file)
+                for failure in failures:
+                    print ("    " + failure, file=results_file)
+                series[bitstream_name] = {'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                                          'columns': ['seconds', 'rss_mb', 'threads', 'fds', 'fps'],
+                                          'samples': [[round(x, 2) for x in sample] for sample in samples],
+                                          'passed': len(failures) == 0}
+                with open(SOAK_SERIES_FILE, 'w') as series_file:
+                    json.dump(series, series_file)
+            print ("---------------------------------------------------------", file=results_file)
+
+## ------------ CHUNKED ENCODING TEST -------------- ##
+    # Bytes per frame of an input file
+    def get_frame_size(self, width, height, bit_depth, compressed_ten_bit_format):
+        if bit_depth > 8 and compressed_ten_bit_format == 1:
+            return width * height * 3 // 2 + width * height * 3 // 8
+        return width * height * 3 // 2 * (1 if bit_depth == 8 else 2)
+
+    # Y, U and V planes of a frame as int32 arrays, 2bitspacked frames are unpacked
+    def read_yuv_frame(self, yuv_map, frame_index, width, height, bit_depth, compressed_ten_bit_format):
+        frame_size = self.get_frame_size(width, height, bit_depth, compressed_ten_bit_format)
+        frame = yuv_map[frame_index * frame_size:(frame_index + 1) * frame_size]
+        sizes = [width * height, width * height // 4, width * height // 4]
+        shapes = [(height, width), (height // 2, width // 2), (height // 2, width // 2)]
+        if bit_depth > 8 and compressed_ten_bit_format == 1:
+            msb = frame[:sum(sizes)].astype(numpy.int32)
+            lsb = frame[sum(sizes):]
+            lsb = numpy.stack(((lsb >> 6) & 3, (lsb >> 4) & 3, (lsb >> 2) & 3, lsb & 3), axis = 1).reshape(-1)
+            samples = (msb << 2) | lsb
+        elif bit_depth > 8:
+            samples = frame.view('<u2').astype(numpy.int32)
+        else:
+            samples = frame.astype(numpy.int32)
+        planes = []
+        offset = 0
+        for size, shape in zip(sizes, shapes):
+            planes.append(samples[offset:offset + size].reshape(shape))
+            offset = offset + size
+        return planes
+
+    # Average Y and YUV (6:1:1) PSNR of a recon against its source, None without numpy, a complete recon or enough source frames
+    # (the encoder rewinds a source shorter than the encode, e.g. with the random dimensions of width_height_test)
+    def get_psnr(self, yuv_file, recon_file, num_frames, width, height, bit_depth, compressed_ten_bit_format):
+        if numpy is None or not os.path.exists(recon_file) or not os.path.exists(yuv_file):
+            return None
+        if os.path.getsize(recon_file) < num_frames * self.get_frame_size(width, height, bit_depth, 0):
+            return None
+        if os.path.getsize(yuv_file) < num_frames * self.get_frame_size(width, height, bit_depth, compressed_ten_bit_format):
+            return None
+        source = numpy.memmap(yuv_file, dtype = numpy.uint8, mode = 'r')
+        recon = numpy.memmap(recon_file, dtype = numpy.uint8, mode = 'r')
+        peak = float(((1 << bit_depth) - 1) ** 2)
+        total_y = 0
+        total_yuv = 0
+        for frame_index in range(num_frames):
+            source_planes = self.read_yuv_frame(source, frame_index, width, height, bit_depth, compressed_ten_bit_format)
+            recon_planes = self.read_yuv_frame(recon, frame_index, width, height, bit_depth, 0)
+            psnr = []
+            for source_plane, recon_plane in zip(source_planes, recon_planes):
+                mse = numpy.mean((source_plane - recon_plane).astype(numpy.float64) ** 2)
+                psnr.append(100.0 if mse == 0 else 10 * math.log10(peak / mse))
+            total_y = total_y + psnr[0]
+            total_yuv = total_yuv + (6 * psnr[0] + psnr[1] + psnr[2]) / 8
+        return total_y / num_frames, total_yuv / num_frames
+
+    # Annex B NAL units of a bitstream, each with its start code
+    def get_nal_units(self, bitstream):
+        starts = []
+        position = bitstream.find(b'\x00\x00\x01')
+        while position != -1:
+            # A 4 byte start code owns the zero in front of it
+            starts.append(position - 1 if position > 0 and bitstream[position - 1:position] == b'\x00' else position)
+            position = bitstream.find(b'\x00\x00\x01', position + 3)
+        return [bitstream[start:end] for start, end in zip(starts, starts[1:] + [len(bitstream)])]
+
+    # Concatenate the chunk bitstreams, a VPS/SPS/PPS (NAL types 32/33/34) identical to the last one of its type is dropped.
+    # Returns the number of parameter sets dropped and whether every chunk starts with an IDR (NAL types 19/20)
+    def stitch_bitstreams(self, chunk_files, output_file):
+        last_parameter_sets = {}
+        dropped = 0
+        closed_gops = True
+        with open(output_file, 'wb') as out_file:
+            for chunk_file in chunk_files:
+                with open(chunk_file, 'rb') as in_file:
+                    nal_units = self.get_nal_units(in_file.read())
+                first_picture = True
+                for nal_unit in nal_units:
+                    payload = nal_unit.lstrip(b'\x00')[1:]
+                    if len(payload) == 0:
+                        continue
+                    nal_type = (bytearray(payload[:1])[0] >> 1) & 0x3f
+                    if nal_type in [32, 33, 34]:
+                        parameter_set = payload.rstrip(b'\x00')
+                        if last_parameter_sets.get(nal_type) == parameter_set:
+                            dropped = dropped + 1
+                            continue
+                        last_parameter_sets[nal_type] = parameter_set
+                    elif nal_type < 32 and first_picture:
+                        first_picture = False
+                        closed_gops = closed_gops and nal_type in [19, 20]
+                    out_file.write(nal_unit)
+        return dropped, closed_gops
+
+    # Write size bytes of the input starting at offset to the encoder stdin
+    def feed_chunk(self, yuv_file, offset, size, out_file):
+        try:
+            with open(yuv_file, 'rb') as in_file:
+                in_file.seek(offset)
+                while size > 0:
+                    data = in_file.read(min(size, 1 << 22))
+                    if not data:
+                        break
+                    out_file.write(data)
+                    size = size - len(data)
+            out_file.close()
+        except (IOError, OSError):
+            pass
+
+    # Encode the chunks CHUNK_JOBS at a time. In VBR each chunk gets the rate that keeps the stream on the global -tbr budget,
+    # given the bytes of the chunks already done (chunks still running are counted at their own rate)
+    # Returns the wall time, or None if a chunk failed
+    def run_chunks(self, enc_params, seq_name, chunks):
+        frame_size = self.get_frame_size(enc_params['width'], enc_params['height'], enc_params['encoder_bit_depth'], enc_params['compressed_ten_bit_format'])
+        frame_rate = float(enc_params['frame_rate'])
+        total_frames = sum(x['frames'] for x in chunks)
+        budget = 'tbr' in enc_params and enc_params['rc'] == 1
+        yuv_file = enc_params['yuv_dir'] + slash + seq_name + '.yuv'
+        running = []
+        failed = False
+        start_time = time.time()
+        for chunk in chunks + [None]:
+            # Start the next chunk once a slot is free, finish the running ones after the last
+            while len(running) > 0 and (chunk is None or len(running) >= CHUNK_JOBS):
+                for process_chunk in list(running):
+                    if process_chunk['process'].poll() is not None:
+                        running.remove(process_chunk)
+                        process_chunk['feeder'].join()
+                        failed = failed or process_chunk['process'].returncode != 0
+                        bitstream_file = enc_params['bitstream_dir'] + slash + process_chunk['name'] + '.265'
+                        process_chunk['bits'] = os.path.getsize(bitstream_file) * 8 if os.path.exists(bitstream_file) else 0
+                        process_chunk['done'] = True
+                time.sleep(0.01)
+            if chunk is None:
+                break
+            chunk_params = enc_params.copy()
+            chunk_params.update({'frame_to_be_encoded': chunk['frames'], 'recon_file': chunk['recon']})
+            if budget:
+                spent = sum(x['bits'] if x.get('done') else x['tbr'] * x['frames'] / frame_rate for x in chunks[:chunk['index']])
+                remaining_frames = total_frames - sum(x['frames'] for x in chunks[:chunk['index']])
+                tbr = (enc_params['tbr'] * total_frames / frame_rate - spent) * frame_rate / remaining_frames
+                chunk_params['tbr'] = int(min(max(tbr, enc_params['tbr'] * 0.5), enc_params['tbr'] * 2))
+            chunk['tbr'] = chunk_params.get('tbr', 0)
+            enc_cmd = self.get_enc_cmd(chunk_params, 'stdin', chunk['name'])
+            print ("Running Test: " + chunk['name'])
+            if DEBUG_MODE != 0:
+                print (enc_cmd)
+                continue
+            chunk['process'] = subprocess.Popen(enc_cmd, shell = True, stdin = subprocess.PIPE)
+            chunk['feeder'] = threading.Thread(target = self.feed_chunk, args = (yuv_file, chunk['start'] * frame_size, chunk['frames'] * frame_size, chunk['process'].stdin))
+            chunk['feeder'].daemon = True
+            chunk['feeder'].start()
+            running.append(chunk)
+        if DEBUG_MODE != 0 or failed:
+            return None
+        return time.time() - start_time
+
+    # Compare a single instance encode of each sequence with the chunked encode: wall time, size and PSNR
+    def run_chunked_test(self, seq_dict):
+        seq_list = [x['name'] for x in seq_dict]
+        if self.error_check(seq_list) != 0:
+            return
+        if numpy is None:
+            print ("numpy not found, PSNR will not be reported")
+        logical_processors = CHUNK_LP if CHUNK_LP != 0 else max(1, multiprocessing.cpu_count() // CHUNK_JOBS)
+        file_name = 'Chunked_Test_Results'
+        with open(file_name + '.txt', 'w', 1) as results_file:
+            self.start_results_table(results_file, ["Closed GOPs per chunk: " + str(CHUNK_GOPS) + ", parallel chunks: " + str(CHUNK_JOBS) + ", -lp per chunk: " + str(logical_processors)],
+                                     "%-64s%7s%7s%10s%10s%9s%8s%9s%9s%8s%7s" % ('Encode', 'Frames', 'Chunks', 'Single s', 'Chunked s', 'Speedup', 'Size', 'Y PSNR', 'Chunked', 'dYUV', 'IDR'))
+
+            for seq in seq_dict:
+                enc_params = self.get_default_params().copy()
+                rate_name = self.set_rate_params(seq, enc_params)
+                if rate_name is None:
+                    continue
+                enc_params.update(self.get_stream_info(seq['name']))
+                # Every GOP starts with an IDR so any GOP boundary can start a chunk
+                enc_params.update({'IntraRefreshType': 2})
+                yuv_file = enc_params['yuv_dir'] + slash + seq['name'] + '.yuv'
+                num_frames = os.path.getsize(yuv_file) // self.get_frame_size(enc_params['width'], enc_params['height'], enc_params['encoder_bit_depth'], enc_params['compressed_ten_bit_format'])
+                if CHUNK_NUM_FRAMES != 0:
+                    num_frames = min(num_frames, CHUNK_NUM_FRAMES)
+                enc_params.update({'frame_to_be_encoded': num_frames})
+                chunk_frames = CHUNK_GOPS * (enc_params['intra_period'] + 1)
+                for enc_mode in CHUNK_ENC_MODES:
+                    enc_params.update({'enc_mode': enc_mode})
+                    test_name = 'Chunked_Test_M' + str(enc_mode) + '_' + seq['name'] + rate_name
+                    bitstream_dir = enc_params['bitstream_dir']
+                    single_name = test_name + '_Single'
+                    single_params = enc_params.copy()
+                    single_params['recon_file'] = bitstream_dir + slash + single_name + '_recon.yuv'
+                    enc_cmd = self.get_enc_cmd(single_params, seq['name'], single_name)
+                    print ("Running Test: " + single_name)
+                    if DEBUG_MODE != 0:
+                        print (enc_cmd)
+                    start_time = time.time()
+                    exit_code = subprocess.call(enc_cmd, shell = True) if DEBUG_MODE == 0 else 0
+                    single_time = time.time() - start_time
+
+                    chunks = []
+                    for start in range(0, num_frames, chunk_frames):
+                        chunk_name = test_name + '_Chunk' + str(len(chunks))
+                        chunks.append({'index': len(chunks), 'name': chunk_name, 'start': start, 'frames': min(chunk_frames, num_frames - start),
+                                       'recon': bitstream_dir + slash + chunk_name + '_recon.yuv'})
+                    enc_params.update({'logical_processors': logical_processors})
+                    chunked_time = self.run_chunks(enc_params, seq['name'], chunks)
+                    del enc_params['logical_processors']
+                    if DEBUG_MODE != 0:
+                        continue
+                    if exit_code != 0 or chunked_time is None:
+                        print ("%-64s%7d%7d%12s" % (test_name[-64:], num_frames, len(chunks), 'Enc Error'), file=results_file)
                     else:
-                        print(cmd, file=open('speed_script.sh', 'a'))
-                    
+                        chunked_name = test_name + '_Chunked'
+                        dropped, closed_gops = self.stitch_bitstreams([bitstream_dir + slash + x['name'] + '.265' for x in chunks], bitstream_dir + slash + chunked_name + '.265')
+                        chunked_recon = bitstream_dir + slash + chunked_name + '_recon.yuv'
+                        with open(chunked_recon, 'wb') as out_file:
+                            for chunk in chunks:
+                                if os.path.exists(chunk['recon']):
+                                    with open(chunk['recon'], 'rb') as in_file:
+                                        shutil.copyfileobj(in_file, out_file)
+                        stream_info = (num_frames, enc_params['width'], enc_params['height'], enc_params['encoder_bit_depth'], enc_params['compressed_ten_bit_format'])
+                        single_psnr = self.get_psnr(yuv_file, single_params['recon_file'], *stream_info)
+                        chunked_psnr = self.get_psnr(yuv_file, chunked_recon, *stream_info)
+                        single_size = os.path.getsize(bitstream_dir + slash + single_name + '.265')
+                        chunked_size = os.path.getsize(bitstream_dir + slash + chunked_name + '.265')
+                        if single_psnr is not None and chunked_psnr is not None:
+                            psnr = "%9.2f%9.2f%+8.2f" % (single_psnr[0], chunked_psnr[0], chunked_psnr[1] - single_psnr[1])
+                        else:
+                            psnr = "%9s%9s%8s" % ('-', '-', '-')
+                        print ("%-64s%7d%7d%10.1f%10.1f%8.2fx%+7.1f%%%s%7s" % (test_name[-64:], num_frames, len(chunks), single_time, chunked_time, single_time / max(chunked_time, 1e-6),
+                               (chunked_size / float(max(single_size, 1)) - 1) * 100, psnr, 'Yes' if closed_gops else 'No'), file=results_file)
+                        os.remove(chunked_recon)
+                        for chunk in chunks:
+                            if os.path.exists(bitstream_dir + slash + chunk['name'] + '.265'):
+                                os.remove(bitstream_dir + slash + chunk['name'] + '.265')
+                    for recon_file in [single_params['recon_file']] + [x['recon'] for x in chunks]:
+                        if os.path.exists(recon_file):
+                            os.remove(recon_file)
+            print ("---------------------------------------------------------", file=results_file)
+
+## ---------------- TIMED SPEED TEST ---------------- ##
+    # Run the Speed Test encodes from the harness one at a time, so their CPU time and max RSS are measured as well.
+    # With RESULTS_DB_MODE = 1 they are stored for the capacity planner
+    def run_timed_speed_test(self, seq_dict):
+        seq_list = []
+        for x in seq_dict:
+            seq_list.append(x['name'])
+        if self.error_check(seq_list) != 0:
+            return
+        file_name = 'Timed_Speed_Test_Results'
+        cpu_name = self.get_cpu_info()[0]
+        if RESULTS_DB_MODE == 1:
+            if sqlite3 is None:
+                print ("sqlite3 not found, results will not be stored")
+            elif DEBUG_MODE == 0:
+                self.results_db = EB_ResultsDB(RESULTS_DB_FILE, RESULTS_DB_BATCH)
+                self.results_db.start_run(self.get_build_hash(), socket.gethostname(), cpu_name, multiprocessing.cpu_count(), self.get_host_memory(), TEST_CONFIGURATION)
+        with open(file_name + '.txt', 'w', 1) as results_file:
+            self.start_results_table(results_file, ["Host CPU: " + cpu_name, "Logical processors: " + str(multiprocessing.cpu_count())],
+                                     "%-64s%10s%10s%14s%14s" % ('Encode', 'Channels', 'fps', 'CPU s/frame', 'Max RSS (MB)'))
+            for encode in self.get_speed_encodes(seq_dict):
+                print ("Running Test: " + encode['name'])
+                if DEBUG_MODE != 0:
+                    print (encode['cmd'])
+                    continue
+                start_time = time.time()
+                exit_code, cpu_time, max_rss = self.wait_process(subprocess.Popen(encode['cmd'], shell = True))
+                # Like a batch, each channel is stored with its share of the CPU time and the max RSS of the whole instance
+                channel_cpu_time = cpu_time / encode['channels'] if cpu_time is not None else None
+                self.record_result('Speed_Test', encode, exit_code, exit_code == 0, time.time() - start_time, channel_cpu_time, max_rss, encode['channels'])
+                fps = self.get_enc_summary(encode['bitstream_dir'] + slash + encode['name'] + '.txt').get(1, {}).get('fps', 0)
+                if exit_code != 0 or fps == 0:
+                    print ("%-64s%10d%10s" % (encode['name'][-64:], encode['channels'], 'Enc Error'), file=results_file)
+                    continue
+                cpu_per_frame = '-' if channel_cpu_time is None else "%.3f" % (channel_cpu_time / encode['frames'])
+                print ("%-64s%10d%10.2f%14s%14s" % (encode['name'][-64:], encode['channels'], fps, cpu_per_frame, '-' if max_rss is None else "%.0f" % max_rss), file=results_file)
+            print ("---------------------------------------------------------", file=results_file)
+        if self.results_db is not None:
+            self.results_db.close()
+            self.results_db = None
+
+## ---------------- TREND REPORT ---------------- ##
+    # Configs whose fps regressed across the runs stored in the results database, and since which build
+    def run_trend_report(self):
+        if sqlite3 is None:
+            print ("The Trend Report requires sqlite3")
+            return
+        if not os.path.exists(RESULTS_DB_FILE):
+            print ("Cannot find " + RESULTS_DB_FILE + ", run the Validation Test with RESULTS_DB_MODE = 1 first")
+            return
+        results_db = EB_ResultsDB(RESULTS_DB_FILE, RESULTS_DB_BATCH)
+        regressions = results_db.get_regressions(TREND_MIN_DROP, TREND_MIN_T, TREND_MIN_SEGMENT, TREND_MAX_SAMPLES)
+        num_runs, num_builds = results_db.connection.execute('SELECT COUNT(*), COUNT(DISTINCT build) FROM runs').fetchone()
+        results_db.close()
+        file_name = 'Trend_Results'
+        with open(file_name + '.txt', 'w') as results_file:
+            print ("---------------------------------------------------------", file=results_file)
+            print ("Results database: " + RESULTS_DB_FILE + " (" + str(num_runs) + " runs, " + str(num_builds) + " builds)", file=results_file)
+            print ("Regression: fps drop of " + str(TREND_MIN_DROP * 100) + "% or more at a change point, Welch t >= " + str(TREND_MIN_T) + ", last " + str(TREND_MAX_SAMPLES) + " results per config", file=results_file)
+            print ("---------------------------------------------------------", file=results_file)
+            if len(regressions) == 0:
+                print ("No regressions found", file=results_file)
+            else:
+                print ("%-64s%-14s%5s%6s%9s%9s%8s%8s%18s%21s" % ('Encode', 'Host', '-nch', 'Jobs', 'fps', 'Now', 'Drop', 'Runs', 'Since Build', 'Since'), file=results_file)
+                for regression in regressions:
+                    print ("%-64s%-14s%5d%6d%9.2f%9.2f%7.1f%%%8d%18s%21s" % (regression['name'][-64:], regression['host'][:13], regression['channels'], regression['jobs'],
+                           regression['fps_before'], regression['fps_after'], regression['drop'] * 100, regression['samples'], regression['since_build'][:16],
+                           time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(regression['since_time']))), file=results_file)
+            print ("---------------------------------------------------------", file=results_file)
+
+## -------------- CAPACITY PLANNER -------------- ##
+    def get_capacity_planner(self):
+        if numpy is None or sqlite3 is None:
+            print ("The Capacity Planner requires numpy and sqlite3")
+            return None
+        if not os.path.exists(RESULTS_DB_FILE):
+            print ("Cannot find " + RESULTS_DB_FILE + ", run the Timed Speed Test or Validation Test with RESULTS_DB_MODE = 1 first")
+            return None
+        results_db = EB_ResultsDB(RESULTS_DB_FILE, RESULTS_DB_BATCH)
+        rows = results_db.get_capacity_rows()
+        results_db.close()
+        return EB_CapacityPlanner(rows, CAPACITY_MIN_SAMPLES)
+
+    def get_mix_name(self, entry):
+        return "%dx%d@%g %dbit M%d %s %s" % (entry['width'], entry['height'], entry['frame_rate'], entry['bit_depth'], entry['enc_mode'],
+                                             ['SQ', 'OQ', 'VMAF'][entry.get('tune', 0)], ['CQP', 'VBR'][entry.get('rc', 0)])
+
+    # Mix entry of the command line: WxH@fps:8bit|10bit:M<enc_mode>:SQ|OQ|VMAF:CQP|VBR[:share]
+    def parse_mix_entry(self, argument):
+        tokens = argument.split(':')
+        if len(tokens) not in [5, 6]:
+            return None
+        try:
+            resolution, frame_rate = tokens[0].lower().split('@')
+            width, height = resolution.split('x')
+            entry = {'width': int(width), 'height': int(height), 'frame_rate': float(frame_rate), 'bit_depth': int(tokens[1].lower().replace('bit', '')),
+                     'enc_mode': int(tokens[2].upper().lstrip('M')), 'tune': ['SQ', 'OQ', 'VMAF'].index(tokens[3].upper()),
+                     'rc': ['CQP', 'VBR'].index(tokens[4].upper()), 'share': float(tokens[5]) if len(tokens) == 6 else 1}
+        except ValueError:
+            return None
+        return entry
+
+    # Answer and model quality for a mix on every host class (or one), as lines
+    def get_capacity_lines(self, planner, mix, host_class):
+        lines = ["Mix: " + ', '.join(self.get_mix_name(entry) + ' x' + str(entry.get('share', 1)) for entry in mix)]
+        host_classes = sorted(planner.models) if host_class is None else [host_class]
+        for host_class in host_classes:
+            lines.append("---------------------------------------------------------")
+            if host_class not in planner.models:
+                lines.append("Host class: " + host_class + ", no results")
+                continue
+            model = planner.models[host_class]
+            memory = str(int(model['memory'])) + " MB" if model['memory'] is not None else "unknown memory"
+            lines.append("Host class: " + host_class + " (" + str(model['samples']) + " results, " + memory + ")")
+            for target in planner.targets:
+                if target in model['fits']:
+                    fit = model['fits'][target]
+                    # Typical error of a single prediction
+                    lines.append("    %-4s model: R2 %.3f, +-%.0f%%, %d results" % (target, fit['r2'], (math.exp(math.sqrt(fit['variance'])) - 1) * 100, fit['samples']))
+                else:
+                    lines.append("    %-4s model: fewer than %d results" % (target, CAPACITY_MIN_SAMPLES))
+            capacity = planner.get_capacity(host_class, mix, CAPACITY_CPU_UTILIZATION, CAPACITY_MEMORY_UTILIZATION, CAPACITY_CONFIDENCE)
+            if 'error' in capacity:
+                lines.append("    Max real-time channels: unknown, " + capacity['error'])
+                continue
+            for entry in capacity['entries']:
+                predictions = entry['predictions']
+                lines.append("    %-36s%8.1f fps%9.4f CPU s/frame%8.0f MB" % (self.get_mix_name(entry), predictions['fps'][0], predictions['cpu'][0], predictions['rss'][0]))
+            lines.append("    Max real-time channels: %d (%d - %d), limited by %s" % (capacity['channels'], capacity['lower'], capacity['upper'], capacity['limit']))
+            if capacity['extrapolated']:
+                lines.append("    Extrapolated: the results never varied part of this mix (resolution, channels, -lp, ...), the bounds do not cover it")
+        return lines
+
+    # Fit the models and report the capacity for CAPACITY_MIX and the configs to measure with targeted speed runs
+    def run_capacity_report(self):
+        planner = self.get_capacity_planner()
+        if planner is None:
+            return
+        file_name = 'Capacity_Results'
+        with open(file_name + '.txt', 'w') as results_file:
+            print ("---------------------------------------------------------", file=results_file)
+            print ("Results database: " + RESULTS_DB_FILE + ", bounds: " + str(CAPACITY_CONFIDENCE) + " standard errors, CPU utilization " + str(int(CAPACITY_CPU_UTILIZATION * 100)) +
+                   "%, memory utilization " + str(int(CAPACITY_MEMORY_UTILIZATION * 100)) + "%", file=results_file)
+            for line in self.get_capacity_lines(planner, CAPACITY_MIX, CAPACITY_HOST_CLASS):
+                print (line, file=results_file)
+            print ("---------------------------------------------------------", file=results_file)
+            poor_predictions = planner.get_poor_predictions(CAPACITY_MAX_ERROR)
+            if len(poor_predictions) == 0:
+                print ("Every config is within " + str(int(CAPACITY_MAX_ERROR * 100)) + "% of its predictions", file=results_file)
+            else:
+                print ("Targeted speed runs with the Timed Speed Test (configs off their prediction by more than " + str(int(CAPACITY_MAX_ERROR * 100)) + "%):", file=results_file)
+                print ("%-64s%-30s%7s%8s%9s" % ('Encode', 'Host Class', 'Model', 'Runs', 'Error'), file=results_file)
+                for poor_prediction in poor_predictions:
+                    print ("%-64s%-30s%7s%8d%8.0f%%" % (poor_prediction['name'][-64:], poor_prediction['host_class'][-29:], poor_prediction['target'], poor_prediction['samples'],
+                           poor_prediction['error'] * 100 * (1 if poor_prediction['direction'] == 'under' else -1)), file=results_file)
+            print ("---------------------------------------------------------", file=results_file)
+
+    # Command line query: capacity <mix entry> ... [host=<host class>], printed to the console
+    def run_capacity_query(self, arguments):
+        mix = []
+        host_class = None
+        for argument in arguments:
+            if argument.startswith('host='):
+                host_class = argument[len('host='):]
+                continue
+            entry = self.parse_mix_entry(argument)
+            if entry is None:
+                print ("Cannot parse " + argument + ", expected WxH@fps:8bit|10bit:M<enc_mode>:SQ|OQ|VMAF:CQP|VBR[:share]")
+                return
+            mix.append(entry)
+        if len(mix) == 0:
+            mix = CAPACITY_MIX
+        planner = self.get_capacity_planner()
+        if planner is None:
+            return
+        if host_class is None and len(planner.models) != 0:
+            # This host when it is in the database, otherwise every host class
+            cpu_name = self.get_cpu_info()[0]
+            local_class = planner.get_host_class(cpu_name, multiprocessing.cpu_count())
+            host_class = local_class if local_class in planner.models else None
+        for line in self.get_capacity_lines(planner, mix, host_class):
+            print (line)
+
 ##----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------##
-small_test = EB_Test(ENC_PATH, BIN_PATH, YUV_PATH)
-if TEST_CONFIGURATION == 0:
-    small_test.run_validation_test(VALIDATION_TEST_SEQUENCES)
-elif TEST_CONFIGURATION == 1:
-    small_test.run_speed_test(SPEED_TEST_SEQUENCES)
+# The helpers can be imported without running a test
+if __name__ == '__main__' and len(sys.argv) > 1 and sys.argv[1] == 'capacity':
+    EB_Test(ENC_PATH, BIN_PATH, YUV_PATH, True).run_capacity_query(sys.argv[2:])
+elif __name__ == '__main__':
+    small_test = EB_Test(ENC_PATH, BIN_PATH, YUV_PATH)
+    if TEST_CONFIGURATION == 0:
+        small_test.run_validation_test(VALIDATION_TEST_SEQUENCES)
+    elif TEST_CONFIGURATION == 1:
+        small_test.run_speed_test(SPEED_TEST_SEQUENCES)
+    elif TEST_CONFIGURATION == 2:
+        small_test.run_asm_test(SPEED_TEST_SEQUENCES)
+    elif TEST_CONFIGURATION == 3:
+        small_test.run_kernel_test()
+    elif TEST_CONFIGURATION == 4:
+        small_test.run_live_test(SPEED_TEST_SEQUENCES)
+    elif TEST_CONFIGURATION == 5:
+        small_test.run_synthetic_test(SYNTH_TEST_SEQUENCES)
+    elif TEST_CONFIGURATION == 6:
+        small_test.run_soak_test(SOAK_TEST_SEQUENCES)
+    elif TEST_CONFIGURATION == 7:
+        small_test.run_chunked_test(CHUNK_TEST_SEQUENCES)
+    elif TEST_CONFIGURATION == 8:
+        small_test.run_trend_report()
+    elif TEST_CONFIGURATION == 9:
+        small_test.run_capacity_report()
+    elif TEST_CONFIGURATION == 10:
+        small_test.run_timed_speed_test(SPEED_TEST_SEQUENCES)
 
 
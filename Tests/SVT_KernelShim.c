@@ -0,0 +1,161 @@
+/*
+* Copyright(c) 2018 Intel Corporation
+* SPDX - License - Identifier: BSD - 2 - Clause - Patent
+*/
+
+/***************************************
+* Kernel Shim
+*   Thin wrappers around the encoder kernel function tables, used by
+*   SVT_FunctionalTests.py (Kernel Benchmark Test) through ctypes.
+*   asmType selects the table row : 0 - C_DEFAULT, 1 - ASM
+*   Each wrapper calls the kernel iterations times so the ctypes call
+*   overhead is not part of the measured time per call.
+***************************************/
+#include "EbDefinitions.h"
+#include "EbComputeSAD.h"
+#include "EbTransforms.h"
+#include "EbAvcStyleMcp.h"
+#include "EbDeblockingFilter.h"
+#include "EbSampleAdaptiveOffset.h"
+
+#ifdef _WIN32
+#define EB_SHIM_API __declspec(dllexport)
+#else
+#define EB_SHIM_API __attribute__ ((visibility ("default")))
+#endif
+
+EB_SHIM_API EB_U32 KernelShimAsmTypes(void)
+{
+    return EB_ASM_TYPE_TOTAL;
+}
+
+/***************************************
+* SAD (ME search)
+***************************************/
+EB_SHIM_API EB_U32 KernelShimSad(
+    EB_U32                   asmType,
+    EB_U8                   *src,
+    EB_U32                   srcStride,
+    EB_U8                   *ref,
+    EB_U32                   refStride,
+    EB_U32                   width,
+    EB_U32                   height,
+    EB_U32                   iterations)
+{
+    EB_U32 sad = 0;
+    EB_U32 iter;
+
+    for (iter = 0; iter < iterations; ++iter) {
+        sad = NxMSadKernel_funcPtrArray[asmType][width >> 3](src, srcStride, ref, refStride, height, width);
+    }
+
+    return sad;
+}
+
+/***************************************
+* Forward Transforms
+*   transformIdx : 0 - 32x32, 1 - 16x16, 2 - 8x8, 3 - 4x4, 4 - DST 4x4
+***************************************/
+EB_SHIM_API void KernelShimTransform(
+    EB_U32                   asmType,
+    EB_U32                   transformIdx,
+    EB_S16                  *residual,
+    EB_U32                   srcStride,
+    EB_S16                  *transformCoefficients,
+    EB_U32                   dstStride,
+    EB_S16                  *transformInnerArrayPtr,
+    EB_U32                   bitIncrement,
+    EB_U32                   iterations)
+{
+    EB_U32 iter;
+
+    for (iter = 0; iter < iterations; ++iter) {
+        transformFunctionTableEncode0[asmType][transformIdx](residual, srcStride, transformCoefficients, dstStride, transformInnerArrayPtr, bitIncrement);
+    }
+}
+
+/***************************************
+* Inverse Transforms
+*   transformIdx : 0 - 32x32, 1 - 16x16, 2 - 8x8, 3 - 4x4, 4 - DST 4x4
+***************************************/
+EB_SHIM_API void KernelShimInvTransform(
+    EB_U32                   asmType,
+    EB_U32                   transformIdx,
+    EB_S16                  *transformCoefficients,
+    EB_U32                   srcStride,
+    EB_S16                  *residual,
+    EB_U32                   dstStride,
+    EB_S16                  *transformInnerArrayPtr,
+    EB_U32                   bitIncrement,
+    EB_U32                   iterations)
+{
+    EB_U32 iter;
+
+    for (iter = 0; iter < iterations; ++iter) {
+        invTransformFunctionTableEncode[asmType][transformIdx](transformCoefficients, srcStride, residual, dstStride, transformInnerArrayPtr, bitIncrement);
+    }
+}
+
+/***************************************
+* Interpolation
+*   filterIdx : 0 - copy, 1 - horizontal, 2 - vertical
+***************************************/
+EB_SHIM_API void KernelShimInterpolation(
+    EB_U32                   asmType,
+    EB_U32                   filterIdx,
+    EB_BYTE                  refPic,
+    EB_U32                   srcStride,
+    EB_BYTE                  dst,
+    EB_U32                   dstStride,
+    EB_U32                   puWidth,
+    EB_U32                   puHeight,
+    EB_BYTE                  tempBuf,
+    EB_U32                   fracPos,
+    EB_U32                   iterations)
+{
+    EB_U32 iter;
+
+    for (iter = 0; iter < iterations; ++iter) {
+        AvcStyleUniPredLumaIFFunctionPtrArray[asmType][filterIdx](refPic, srcStride, dst, dstStride, puWidth, puHeight, tempBuf, fracPos);
+    }
+}
+
+/***************************************
+* Luma Deblocking (4 sample edge)
+***************************************/
+EB_SHIM_API void KernelShimDeblockLuma(
+    EB_U32                   asmType,
+    EB_BYTE                  edgeStartSample,
+    EB_U32                   reconLumaPicStride,
+    EB_U32                   isVerticalEdge,
+    EB_S32                   tc,
+    EB_S32                   beta,
+    EB_U32                   iterations)
+{
+    EB_U32 iter;
+
+    for (iter = 0; iter < iterations; ++iter) {
+        Luma4SampleEdgeDLFCore_Table[asmType](edgeStartSample, reconLumaPicStride, (EB_BOOL)isVerticalEdge, tc, beta);
+    }
+}
+
+/***************************************
+* SAO Band Offset
+*   Uses the full width kernel (lcuWidth multiple of 16)
+***************************************/
+EB_SHIM_API void KernelShimSaoBo(
+    EB_U32                   asmType,
+    EB_U8                   *reconSamplePtr,
+    EB_U32                   reconStride,
+    EB_U32                   bandPosition,
+    EB_S8                   *saoOffset,
+    EB_U32                   lcuWidth,
+    EB_U32                   lcuHeight,
+    EB_U32                   iterations)
+{
+    EB_U32 iter;
+
+    for (iter = 0; iter < iterations; ++iter) {
+        SaoFunctionTableBo[asmType][1](reconSamplePtr, reconStride, bandPosition, saoOffset, lcuHeight, lcuWidth);
+    }
+}
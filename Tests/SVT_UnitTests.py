@@ -0,0 +1,311 @@
+# Checks of the bitstream, recon, encoder output, artifact store and results database helpers of SVT_FunctionalTests.py on small handcrafted inputs
+# Run from the Tests folder: python -m unittest SVT_UnitTests
+from __future__ import print_function
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from SVT_FunctionalTests import EB_Test, EB_ResultsDB, EB_ArtifactStore
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+# NAL units with 2 byte headers: type << 1, then layer 0 and temporal id 1. Slices carry first_slice_segment_in_pic_flag in the top bit of their third byte
+VPS = b'\x00\x00\x00\x01\x40\x01\x0c\x01'
+SPS = b'\x00\x00\x01\x42\x01\x01\x01'
+PPS = b'\x00\x00\x01\x44\x01\xc1'
+AUD = b'\x00\x00\x01\x46\x01\x50'
+IDR = b'\x00\x00\x01\x26\x01\xaf\x11\x22'
+TRAIL = b'\x00\x00\x01\x02\x01\xd0\x33'
+TRAIL_SEGMENT = b'\x00\x00\x01\x02\x01\x40\x44\x55'
+
+def get_helpers():
+    # The helpers do not use the folders and settings of the constructor
+    return EB_Test.__new__(EB_Test)
+
+class NalUnitTests(unittest.TestCase):
+    def test_start_codes(self):
+        helpers = get_helpers()
+        self.assertEqual(helpers.get_nal_units(VPS + SPS + PPS + IDR), [VPS, SPS, PPS, IDR])
+
+    def test_trailing_zeros(self):
+        # Only the zero in front of 00 00 01 belongs to the start code, the others stay with the previous unit
+        helpers = get_helpers()
+        self.assertEqual(helpers.get_nal_units(IDR + b'\x00\x00' + b'\x00' + TRAIL), [IDR + b'\x00\x00', b'\x00' + TRAIL])
+
+    def test_no_start_code(self):
+        self.assertEqual(get_helpers().get_nal_units(b'\x01\x02\x03'), [])
+
+    def test_frame_sizes(self):
+        helpers = get_helpers()
+        bitstream = VPS + SPS + PPS + IDR + TRAIL + TRAIL_SEGMENT + AUD + TRAIL
+        self.assertEqual(helpers.get_frame_sizes(bitstream), [len(VPS + SPS + PPS + IDR), len(TRAIL + TRAIL_SEGMENT), len(AUD + TRAIL)])
+
+    def test_frame_sizes_parameter_sets(self):
+        # Parameter sets in front of a picture belong to it, not to the picture before
+        helpers = get_helpers()
+        bitstream = VPS + SPS + PPS + IDR + VPS + SPS + PPS + IDR
+        self.assertEqual(helpers.get_frame_sizes(bitstream), [len(VPS + SPS + PPS + IDR)] * 2)
+
+class StitchTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def stitch(self, chunks):
+        chunk_files = []
+        for index in range(len(chunks)):
+            chunk_files.append(os.path.join(self.folder, 'chunk' + str(index) + '.265'))
+            with open(chunk_files[-1], 'wb') as chunk_file:
+                chunk_file.write(chunks[index])
+        output_file = os.path.join(self.folder, 'stitched.265')
+        dropped, closed_gops = get_helpers().stitch_bitstreams(chunk_files, output_file)
+        with open(output_file, 'rb') as stitched_file:
+            return dropped, closed_gops, stitched_file.read()
+
+    def test_repeated_parameter_sets(self):
+        chunk = VPS + SPS + PPS + IDR + TRAIL
+        self.assertEqual(self.stitch([chunk, chunk]), (3, True, chunk + IDR + TRAIL))
+
+    def test_changed_parameter_set(self):
+        other_pps = b'\x00\x00\x01\x44\x01\xc3'
+        dropped, closed_gops, stitched = self.stitch([VPS + SPS + PPS + IDR, VPS + SPS + other_pps + IDR])
+        self.assertEqual((dropped, closed_gops), (2, True))
+        self.assertEqual(stitched, VPS + SPS + PPS + IDR + other_pps + IDR)
+
+    def test_open_chunk(self):
+        dropped, closed_gops, stitched = self.stitch([VPS + SPS + PPS + IDR, VPS + SPS + PPS + TRAIL])
+        self.assertFalse(closed_gops)
+
+@unittest.skipIf(numpy is None, "requires numpy")
+class PsnrTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def write_frames(self, name, frames, dtype):
+        file_name = os.path.join(self.folder, name)
+        numpy.concatenate([numpy.asarray(frame, dtype = dtype) for frame in frames]).tofile(file_name)
+        return file_name
+
+    def test_8bit(self):
+        # 4x4 frames: one luma sample off by 4 in the first frame gives a luma MSE of 1
+        source = [[100] * 24, [50] * 24]
+        recon = [[104] + [100] * 23, [50] * 24]
+        yuv_file = self.write_frames('source.yuv', source, numpy.uint8)
+        recon_file = self.write_frames('recon.yuv', recon, numpy.uint8)
+        y_psnr, yuv_psnr = get_helpers().get_psnr(yuv_file, recon_file, 2, 4, 4, 8, 0)
+        first_y = 10 * numpy.log10(255.0 ** 2)
+        self.assertAlmostEqual(y_psnr, (first_y + 100.0) / 2)
+        self.assertAlmostEqual(yuv_psnr, ((6 * first_y + 200.0) / 8 + 100.0) / 2)
+
+    def test_10bit(self):
+        source = [[400] * 24]
+        recon = [[400] * 16 + [402] * 4 + [400] * 4]
+        yuv_file = self.write_frames('source.yuv', source, '<u2')
+        recon_file = self.write_frames('recon.yuv', recon, '<u2')
+        y_psnr, yuv_psnr = get_helpers().get_psnr(yuv_file, recon_file, 1, 4, 4, 10, 0)
+        self.assertAlmostEqual(y_psnr, 100.0)
+        self.assertAlmostEqual(yuv_psnr, (600.0 + 10 * numpy.log10(1023.0 ** 2 / 4) + 100.0) / 8)
+
+    def test_incomplete_recon(self):
+        yuv_file = self.write_frames('source.yuv', [[100] * 24] * 2, numpy.uint8)
+        recon_file = self.write_frames('recon.yuv', [[100] * 24], numpy.uint8)
+        self.assertIsNone(get_helpers().get_psnr(yuv_file, recon_file, 2, 4, 4, 8, 0))
+
+    def test_short_source(self):
+        yuv_file = self.write_frames('source.yuv', [[100] * 24], numpy.uint8)
+        recon_file = self.write_frames('recon.yuv', [[100] * 24] * 2, numpy.uint8)
+        self.assertIsNone(get_helpers().get_psnr(yuv_file, recon_file, 2, 4, 4, 8, 0))
+
+class BatchOutputTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def get_summary(self, channel, frames):
+        return ('\nSUMMARY --------------------------------- Channel ' + str(channel) + '  --------------------------------\n'
+                'Total Frames\t\tFrame Rate\t\tByte Count\t\tBitrate\n'
+                '%12d\t\t60.00 fps\t\t      1000\t\t100.00 kbps\n' % frames)
+
+    def get_speed(self, channel):
+        return '\nChannel ' + str(channel) + '\nAverage Speed:\t\t12.50 fps\nAverage Latency:\t80 ms\nMax Latency:\t\t95 ms\n'
+
+    def split(self, text, num_channels):
+        batch_output = os.path.join(self.folder, 'batch.txt')
+        with open(batch_output, 'wb') as out_file:
+            out_file.write(text.encode('latin-1'))
+        encodes = [{'bitstream_dir': self.folder, 'name': 'encode' + str(index + 1)} for index in range(num_channels)]
+        finished = get_helpers().split_batch_output(batch_output, encodes)
+        outputs = []
+        for encode in encodes:
+            with open(os.path.join(self.folder, encode['name'] + '.txt'), 'r') as in_file:
+                outputs.append(in_file.read())
+        return finished, outputs
+
+    def test_channels(self):
+        text = ('SVT [version]:\tSVT-HEVC Encoder Lib v1.4.3\n' + '\b' * 9 + '%9d' % 10 + '\b' * 9 + '%9d' % 20 + '\n' +
+                self.get_summary(1, 10) + self.get_summary(2, 10) + '\n' + self.get_speed(1) + self.get_speed(2) + 'Encoder finished\n')
+        finished, outputs = self.split(text, 2)
+        self.assertEqual(finished, [True, True])
+        # The second channel reads like a single run numbered as channel 1
+        self.assertEqual([line for line in outputs[1].splitlines() if line], [line for line in outputs[0].splitlines() if line])
+        self.assertIn('SVT-HEVC Encoder Lib', outputs[1])
+        self.assertIn('Channel 1\nAverage Speed:', outputs[1])
+        self.assertNotIn('Channel 2', outputs[1])
+        self.assertNotIn('\b', outputs[0])
+        # Both channels have the same summary, get_enc_summary reads it back as channel 1
+        summary = get_helpers().get_enc_summary(os.path.join(self.folder, 'encode2.txt'))
+        self.assertEqual(summary[1]['frames'], 10)
+        self.assertEqual(summary[1]['fps'], 12.5)
+
+    def test_unfinished_channel(self):
+        text = (self.get_summary(1, 10) + self.get_summary(2, 4) + '\n' + self.get_speed(1) +
+                '\nChannel 2 Encoding Interrupted\nEncoder finished\n')
+        finished, outputs = self.split(text, 2)
+        self.assertEqual(finished, [True, False])
+        self.assertIn('Channel 1 Encoding Interrupted', outputs[1])
+        self.assertNotIn('Average Speed', outputs[1])
+
+    def test_missing_output(self):
+        encodes = [{'bitstream_dir': self.folder, 'name': 'encode1'}]
+        self.assertEqual(get_helpers().split_batch_output(os.path.join(self.folder, 'missing.txt'), encodes), [False])
+
+class ChangePointTests(unittest.TestCase):
+    def find_change_point(self, values, min_segment):
+        return EB_ResultsDB.__new__(EB_ResultsDB).find_change_point(values, min_segment)
+
+    def test_step(self):
+        self.assertEqual(self.find_change_point([10.0] * 6 + [8.0] * 4, 3), (6, 10.0, 8.0, float('inf')))
+
+    def test_noisy_step(self):
+        split, mean_before, mean_after, t_value = self.find_change_point([10.1, 9.9, 10.2, 9.8, 10.0, 8.1, 7.9, 8.0, 8.2, 7.8], 3)
+        self.assertEqual(split, 5)
+        self.assertAlmostEqual(mean_before, 10.0)
+        self.assertAlmostEqual(mean_after, 8.0)
+        self.assertGreater(t_value, 10)
+
+    def test_flat(self):
+        split, mean_before, mean_after, t_value = self.find_change_point([5.0] * 8, 2)
+        self.assertEqual((mean_before, mean_after, t_value), (5.0, 5.0, 0.0))
+
+    def test_noise_only(self):
+        self.assertLess(self.find_change_point([10.0, 10.3, 9.7, 10.1, 9.9, 10.2, 9.8, 10.0], 3)[3], 4.0)
+
+    def test_min_segment(self):
+        # The step is too close to the end for the segments to be long enough
+        self.assertEqual(self.find_change_point([10.0] * 8 + [8.0], 2)[0], 7)
+        self.assertIsNone(self.find_change_point([10.0, 8.0, 8.0], 2))
+
+@unittest.skipIf(sqlite3 is None, "requires sqlite3")
+class RegressionTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.results_db = EB_ResultsDB(os.path.join(self.folder, 'results.db'), 4)
+
+    def tearDown(self):
+        self.results_db.close()
+        shutil.rmtree(self.folder)
+
+    def add_series(self, config_hash, fps_values, builds):
+        for index in range(len(fps_values)):
+            self.results_db.add_result({'time': float(index), 'name': config_hash, 'config_hash': config_hash, 'build': builds[index], 'host': 'host',
+                                        'channels': 1, 'jobs': 1, 'passed': 1, 'fps': fps_values[index]})
+
+    def test_regression(self):
+        self.add_series('slower', [20.1, 19.9, 20.2, 19.8, 15.0, 15.1, 14.9, 15.0], ['a'] * 4 + ['b'] * 4)
+        self.add_series('steady', [20.0, 20.2, 19.8, 20.1, 20.0, 19.9, 20.1, 20.0], ['a'] * 4 + ['b'] * 4)
+        regressions = self.results_db.get_regressions(0.05, 4.0, 3, 100)
+        self.assertEqual([regression['config_hash'] for regression in regressions], ['slower'])
+        self.assertEqual(regressions[0]['since_build'], 'b')
+        self.assertAlmostEqual(regressions[0]['drop'], 0.25)
+
+    def test_capacity_rows_single_job(self):
+        self.results_db.start_run('a', 'host', 'cpu', 8, 16384, 0)
+        for name, jobs in [('single', 1), ('shared', 4)]:
+            self.results_db.add_result({'time': 0.0, 'name': name, 'config_hash': name, 'build': 'a', 'host': 'host', 'enc_mode': 9, 'width': 1920,
+                                        'height': 1080, 'frames': 10, 'channels': 2, 'jobs': jobs, 'passed': 1, 'fps': 30.0, 'cpu_time': 5.0, 'params': '{}'})
+        rows = self.results_db.get_capacity_rows()
+        self.assertEqual([row['name'] for row in rows], ['single'])
+        # Without a recorded tune the encoder default SQ applies, the CPU time is already the share of the channel
+        self.assertEqual(rows[0]['config']['tune'], 0)
+        self.assertAlmostEqual(rows[0]['cpu'], 0.5)
+
+class CommandTests(unittest.TestCase):
+    # Same tokens as the original string building, which left two spaces between the arguments
+    enc_params = {'encoder_dir': 'enc', 'yuv_dir': 'yuv', 'bitstream_dir': 'bits', 'width': 416, 'height': 240, 'encoder_bit_depth': 8, 'frame_rate': 60,
+                  'intra_period': -1, 'frame_to_be_encoded': 20, 'enc_mode': 9, 'qp': 32, 'rc': 0, 'HmeLevel0SearchAreaInWidth': [8, 8]}
+
+    def test_single_channel(self):
+        enc_cmd = get_helpers().get_enc_cmd(self.enc_params, 'seq', 'name')
+        self.assertEqual(enc_cmd.replace(os.sep, '/').split(' ', 1)[1],
+                         '-i yuv/seq.yuv -b bits/name.265 -errlog bits/name.errlog -w 416 -h 240 -bit-depth 8 -fps 60 -intra-period -1 -n 20 '
+                         '-encMode 9 -q 32 -rc 0 -hme-l0-w 8 8 > bits/name.txt')
+
+    def test_channels(self):
+        helpers = get_helpers()
+        enc_cmd = helpers.get_enc_cmd(self.enc_params, 'seq', 'name', 2)
+        self.assertEqual(enc_cmd.replace(os.sep, '/').split(' ', 1)[1],
+                         '-nch 2 -i yuv/seq.yuv yuv/seq.yuv -b bits/name.265 bits/name_1.265 -errlog bits/name.errlog bits/name_1.errlog -w 416 416 -h 240 240 '
+                         '-bit-depth 8 8 -fps 60 60 -intra-period -1 -1 -n 20 20 -encMode 9 9 -q 32 32 -rc 0 0 -hme-l0-w 8 8 8 8 > bits/name.txt')
+        # The arguments run without a shell are the same, without the output redirection
+        self.assertEqual(helpers.get_enc_args(self.enc_params, 'seq', 'name', 2), enc_cmd.split(' > ')[0].split(' '))
+
+class HistoryTests(unittest.TestCase):
+    def test_random_conds(self):
+        # Random dimensions of width_height_test map to one signature and parameter hash, fixed ones keep theirs
+        helpers = get_helpers()
+        enc_params = {'enc_mode': 3, 'width': 640, 'height': 480}
+        other_params = dict(enc_params, width = 800)
+        self.assertEqual(helpers.get_job_signature('width_height_test', 'seq', enc_params, 0, 0, {'width': 640, 'height': 480}),
+                         helpers.get_job_signature('width_height_test', 'seq', other_params, 0, 0, {'width': 800, 'height': 480}))
+        self.assertEqual(helpers.get_params_hash({'enc_params': enc_params, 'random_conds': ['width', 'height']}),
+                         helpers.get_params_hash({'enc_params': other_params, 'random_conds': ['width', 'height']}))
+        self.assertNotEqual(helpers.get_params_hash({'enc_params': enc_params}), helpers.get_params_hash({'enc_params': other_params}))
+
+    def test_series_config(self):
+        # An fps series spans runs that drew other QPs, fixed parameters still split it
+        helpers = get_helpers()
+        encode = {'seq_name': 'seq', 'enc_params': {'enc_mode': 3, 'qp': 30, 'rc': 0}, 'random_conds': ['qp', 'tbr', 'qp_file_name']}
+        other_qp = dict(encode, enc_params = dict(encode['enc_params'], qp = 40))
+        other_mode = dict(encode, enc_params = dict(encode['enc_params'], enc_mode = 5))
+        self.assertEqual(helpers.get_series_config(encode), helpers.get_series_config(other_qp))
+        self.assertNotEqual(helpers.get_series_config(encode), helpers.get_series_config(other_mode))
+
+class ArtifactStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.store = EB_ArtifactStore(os.path.join(self.folder, 'store'), 1 << 20)
+        with open(os.path.join(self.folder, 'a.265'), 'wb') as out_file:
+            out_file.write(VPS + SPS + PPS + IDR)
+        self.store.store(self.folder, 'a', True)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_lookup_saved_at_close(self):
+        # Lookups only touch the index in memory, it is written once at close
+        os.utime(self.store.index_file, (0, 0))
+        self.assertNotEqual(self.store.get_hash('a'), '')
+        self.assertEqual(os.path.getmtime(self.store.index_file), 0)
+        self.store.close()
+        self.assertNotEqual(os.path.getmtime(self.store.index_file), 0)
+
+if __name__ == '__main__':
+    unittest.main()